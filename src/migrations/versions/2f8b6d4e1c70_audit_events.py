@@ -0,0 +1,65 @@
+"""audit events
+
+Revision ID: 2f8b6d4e1c70
+Revises: 9a4c2f7e5b18
+Create Date: 2026-10-20 10:41:26.904813
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "2f8b6d4e1c70"
+down_revision: Union[str, Sequence[str], None] = "9a4c2f7e5b18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Месячные секции создаются приложением по мере надобности
+    op.execute(sa.schema.CreateSequence(sa.Sequence("audit_events_id_seq")))
+    op.create_table(
+        "audit_events",
+        sa.Column(
+            "id",
+            sa.BigInteger(),
+            server_default=sa.text("nextval('audit_events_id_seq')"),
+            nullable=False,
+        ),
+        sa.Column("occurred_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("file_id", sa.Integer(), nullable=False),
+        sa.Column("action", sa.String(length=16), nullable=False),
+        postgresql_partition_by="RANGE (occurred_at)",
+    )
+    op.create_index(
+        "ix_audit_events_occurred_at_id",
+        "audit_events",
+        ["occurred_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_audit_events_user_id_occurred_at",
+        "audit_events",
+        ["user_id", "occurred_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_audit_events_file_id_occurred_at",
+        "audit_events",
+        ["file_id", "occurred_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_audit_events_file_id_occurred_at", table_name="audit_events"
+    )
+    op.drop_index(
+        "ix_audit_events_user_id_occurred_at", table_name="audit_events"
+    )
+    op.drop_index("ix_audit_events_occurred_at_id", table_name="audit_events")
+    op.drop_table("audit_events")
+    op.execute(sa.schema.DropSequence(sa.Sequence("audit_events_id_seq")))
@@ -0,0 +1,58 @@
+"""files full-text search
+
+Revision ID: 3b1f9c2a7d45
+Revises: 6727b10d3bf4
+Create Date: 2026-10-19 10:12:03.114520
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "3b1f9c2a7d45"
+down_revision: Union[str, Sequence[str], None] = "6727b10d3bf4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        "files",
+        sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True),
+    )
+    op.execute(
+        """
+        UPDATE files SET search_vector =
+            setweight(to_tsvector('simple', filename), 'A')
+            || setweight(
+                to_tsvector('simple', coalesce(metadata->>'title', '')), 'B'
+            )
+            || setweight(
+                to_tsvector('simple', coalesce(metadata->>'author', '')), 'C'
+            )
+        """
+    )
+    op.create_index(
+        "ix_files_search_vector",
+        "files",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_files_filename_trgm",
+        "files",
+        ["filename"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"filename": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_filename_trgm", table_name="files")
+    op.drop_index("ix_files_search_vector", table_name="files")
+    op.drop_column("files", "search_vector")
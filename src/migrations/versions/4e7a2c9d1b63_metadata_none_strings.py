@@ -0,0 +1,37 @@
+"""metadata none strings
+
+Revision ID: 4e7a2c9d1b63
+Revises: 2f8b6d4e1c70
+Create Date: 2026-10-21 09:12:47.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "4e7a2c9d1b63"
+down_revision: Union[str, Sequence[str], None] = "2f8b6d4e1c70"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Поля, куда извлекатель PDF записывал строку "None" вместо null
+KEYS = ("author", "title", "producer", "created")
+
+
+def upgrade() -> None:
+    # Значения обнуляются, а extractor_version сбрасывается, чтобы
+    # reextract_metadata пересобрал search_vector этих строк
+    # без слова "none"
+    for table in ("files", "file_versions"):
+        for key in KEYS:
+            op.execute(
+                f"UPDATE {table} SET metadata = "
+                f"jsonb_set(metadata, '{{{key}}}', 'null'::jsonb) "
+                f"|| '{{\"extractor_version\": 0}}'::jsonb "
+                f"WHERE metadata->>'{key}' = 'None'"
+            )
+
+
+def downgrade() -> None:
+    # Обнулённые значения не восстанавливаются: "None" не было данными
+    pass
@@ -0,0 +1,26 @@
+"""files codec
+
+Revision ID: 5d93b0e8c1f6
+Revises: c4a7e1f03b28
+Create Date: 2026-10-19 14:21:09.640275
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "5d93b0e8c1f6"
+down_revision: Union[str, Sequence[str], None] = "c4a7e1f03b28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "files", sa.Column("codec", sa.String(length=16), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("files", "codec")
@@ -0,0 +1,48 @@
+"""files checksums and scrub state
+
+Revision ID: 7c2e9b4f1d05
+Revises: d3f58a1c7b92
+Create Date: 2026-10-19 21:02:51.663210
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "7c2e9b4f1d05"
+down_revision: Union[str, Sequence[str], None] = "d3f58a1c7b92"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "files", sa.Column("sha256", sa.String(length=64), nullable=True)
+    )
+    op.add_column(
+        "files", sa.Column("etag", sa.String(length=80), nullable=True)
+    )
+    op.add_column(
+        "files",
+        sa.Column("verified_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.add_column(
+        "files",
+        sa.Column("corrupted_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_files_corrupted_at",
+        "files",
+        ["corrupted_at"],
+        unique=False,
+        postgresql_where=sa.text("corrupted_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_corrupted_at", table_name="files")
+    op.drop_column("files", "corrupted_at")
+    op.drop_column("files", "verified_at")
+    op.drop_column("files", "etag")
+    op.drop_column("files", "sha256")
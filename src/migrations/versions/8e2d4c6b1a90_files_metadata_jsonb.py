@@ -0,0 +1,105 @@
+"""files metadata jsonb
+
+Revision ID: 8e2d4c6b1a90
+Revises: 3b1f9c2a7d45
+Create Date: 2026-10-19 11:40:27.508113
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "8e2d4c6b1a90"
+down_revision: Union[str, Sequence[str], None] = "3b1f9c2a7d45"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "files",
+        "metadata",
+        type_=postgresql.JSONB(),
+        existing_type=sa.JSON(),
+        existing_nullable=True,
+        postgresql_using="metadata::jsonb",
+    )
+    op.add_column(
+        "files",
+        sa.Column("content_type", sa.String(length=255), nullable=True),
+    )
+    op.execute(
+        """
+        UPDATE files SET content_type = CASE
+            WHEN lower(filename) LIKE '%.pdf' THEN 'application/pdf'
+            WHEN lower(filename) LIKE '%.doc' THEN 'application/msword'
+            WHEN lower(filename) LIKE '%.docx' THEN
+                'application/vnd.openxmlformats-officedocument'
+                '.wordprocessingml.document'
+        END
+        """
+    )
+    op.add_column(
+        "files",
+        sa.Column(
+            "meta_pages",
+            sa.Integer(),
+            sa.Computed(
+                "CASE WHEN metadata->>'pages' ~ '^[0-9]+$' "
+                "THEN (metadata->>'pages')::integer END",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    for key in ("author", "title", "created"):
+        op.add_column(
+            "files",
+            sa.Column(
+                f"meta_{key}",
+                sa.Text(),
+                sa.Computed(f"metadata->>'{key}'", persisted=True),
+                nullable=True,
+            ),
+        )
+    op.create_index(
+        "ix_files_metadata",
+        "files",
+        ["metadata"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"metadata": "jsonb_path_ops"},
+    )
+    for column in (
+        "content_type",
+        "meta_pages",
+        "meta_author",
+        "meta_title",
+        "meta_created",
+    ):
+        op.create_index(
+            op.f(f"ix_files_{column}"), "files", [column], unique=False
+        )
+
+
+def downgrade() -> None:
+    for column in (
+        "meta_created",
+        "meta_title",
+        "meta_author",
+        "meta_pages",
+        "content_type",
+    ):
+        op.drop_index(op.f(f"ix_files_{column}"), table_name="files")
+        op.drop_column("files", column)
+    op.drop_index("ix_files_metadata", table_name="files")
+    op.alter_column(
+        "files",
+        "metadata",
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=True,
+        postgresql_using="metadata::json",
+    )
@@ -0,0 +1,68 @@
+"""file versions
+
+Revision ID: 9a4c2f7e5b18
+Revises: 7c2e9b4f1d05
+Create Date: 2026-10-19 22:14:07.318442
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "9a4c2f7e5b18"
+down_revision: Union[str, Sequence[str], None] = "7c2e9b4f1d05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "files",
+        sa.Column(
+            "version", sa.Integer(), server_default="1", nullable=False
+        ),
+    )
+    op.create_table(
+        "file_versions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("file_id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("object_key", sa.String(length=1024), nullable=False),
+        sa.Column("shard", sa.String(length=64), nullable=False),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=True),
+        sa.Column("codec", sa.String(length=16), nullable=True),
+        sa.Column("content_type", sa.String(length=255), nullable=True),
+        sa.Column("sha256", sa.String(length=64), nullable=True),
+        sa.Column("etag", sa.String(length=80), nullable=True),
+        sa.Column(
+            "metadata",
+            postgresql.JSONB(astext_type=sa.Text()),
+            nullable=True,
+        ),
+        sa.Column(
+            "archived_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["file_id"], ["files.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("file_id", "version", name="uq_file_versions"),
+        sa.UniqueConstraint("object_key"),
+    )
+    op.execute(
+        "CREATE INDEX ix_file_versions_object_key_c "
+        'ON file_versions (object_key COLLATE "C")'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_file_versions_object_key_c", table_name="file_versions"
+    )
+    op.drop_table("file_versions")
+    op.drop_column("files", "version")
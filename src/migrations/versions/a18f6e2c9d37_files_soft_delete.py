@@ -0,0 +1,43 @@
+"""files soft delete
+
+Revision ID: a18f6e2c9d37
+Revises: 5d93b0e8c1f6
+Create Date: 2026-10-19 15:02:44.218903
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "a18f6e2c9d37"
+down_revision: Union[str, Sequence[str], None] = "5d93b0e8c1f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "files",
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_files_live_owner_id",
+        "files",
+        ["owner_id", "id"],
+        unique=False,
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    op.create_index(
+        "ix_files_deleted_at",
+        "files",
+        ["deleted_at"],
+        unique=False,
+        postgresql_where=sa.text("deleted_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_deleted_at", table_name="files")
+    op.drop_index("ix_files_live_owner_id", table_name="files")
+    op.drop_column("files", "deleted_at")
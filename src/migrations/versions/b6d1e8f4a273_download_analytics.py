@@ -0,0 +1,82 @@
+"""download analytics
+
+Revision ID: b6d1e8f4a273
+Revises: f29a4d8e6c13
+Create Date: 2026-10-19 19:32:08.514927
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "b6d1e8f4a273"
+down_revision: Union[str, Sequence[str], None] = "f29a4d8e6c13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Месячные секции создаются приложением по мере надобности
+    op.create_table(
+        "download_events",
+        sa.Column("occurred_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("file_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("department_id", sa.Integer(), nullable=True),
+        sa.Column("bytes", sa.BigInteger(), nullable=False),
+        postgresql_partition_by="RANGE (occurred_at)",
+    )
+    op.create_table(
+        "download_file_daily",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("file_id", sa.Integer(), nullable=False),
+        sa.Column("department_id", sa.Integer(), nullable=False),
+        sa.Column("downloads", sa.Integer(), nullable=False),
+        sa.Column("bytes", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "file_id", "department_id"),
+    )
+    op.create_index(
+        "ix_download_file_daily_department_day",
+        "download_file_daily",
+        ["department_id", "day"],
+        unique=False,
+    )
+    op.create_table(
+        "download_user_daily",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("department_id", sa.Integer(), nullable=False),
+        sa.Column("downloads", sa.Integer(), nullable=False),
+        sa.Column("bytes", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "user_id"),
+    )
+    op.create_index(
+        "ix_download_user_daily_user_day",
+        "download_user_daily",
+        ["user_id", "day"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_download_user_daily_department_day",
+        "download_user_daily",
+        ["department_id", "day"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_download_user_daily_department_day",
+        table_name="download_user_daily",
+    )
+    op.drop_index(
+        "ix_download_user_daily_user_day", table_name="download_user_daily"
+    )
+    op.drop_table("download_user_daily")
+    op.drop_index(
+        "ix_download_file_daily_department_day",
+        table_name="download_file_daily",
+    )
+    op.drop_table("download_file_daily")
+    op.drop_table("download_events")
@@ -0,0 +1,40 @@
+"""storage usage counters
+
+Revision ID: c4a7e1f03b28
+Revises: 8e2d4c6b1a90
+Create Date: 2026-10-19 13:05:41.872310
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "c4a7e1f03b28"
+down_revision: Union[str, Sequence[str], None] = "8e2d4c6b1a90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "files", sa.Column("size_bytes", sa.BigInteger(), nullable=True)
+    )
+    op.create_table(
+        "storage_usage",
+        sa.Column(
+            "scope",
+            sa.Enum("USER", "DEPARTMENT", name="usagescope"),
+            nullable=False,
+        ),
+        sa.Column("scope_id", sa.Integer(), nullable=False),
+        sa.Column("bytes_used", sa.BigInteger(), nullable=False),
+        sa.Column("files_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("scope", "scope_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("storage_usage")
+    sa.Enum(name="usagescope").drop(op.get_bind(), checkfirst=True)
+    op.drop_column("files", "size_bytes")
@@ -0,0 +1,33 @@
+"""files shard placement
+
+Revision ID: d3f58a1c7b92
+Revises: b6d1e8f4a273
+Create Date: 2026-10-19 20:14:37.201584
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "d3f58a1c7b92"
+down_revision: Union[str, Sequence[str], None] = "b6d1e8f4a273"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Существующие объекты лежат в исходном бакете — шарде default
+    op.add_column(
+        "files",
+        sa.Column(
+            "shard",
+            sa.String(length=64),
+            server_default="default",
+            nullable=False,
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("files", "shard")
@@ -0,0 +1,25 @@
+"""files object_key byte order index
+
+Revision ID: e07c5b3d2a61
+Revises: a18f6e2c9d37
+Create Date: 2026-10-19 16:18:30.905417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "e07c5b3d2a61"
+down_revision: Union[str, Sequence[str], None] = "a18f6e2c9d37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        'CREATE INDEX ix_files_object_key_c ON files (object_key COLLATE "C")'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_object_key_c", table_name="files")
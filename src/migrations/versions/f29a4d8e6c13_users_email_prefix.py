@@ -0,0 +1,29 @@
+"""users email prefix index
+
+Revision ID: f29a4d8e6c13
+Revises: e07c5b3d2a61
+Create Date: 2026-10-19 18:47:12.330186
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "f29a4d8e6c13"
+down_revision: Union[str, Sequence[str], None] = "e07c5b3d2a61"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_users_email_pattern",
+        "users",
+        ["email"],
+        unique=False,
+        postgresql_ops={"email": "varchar_pattern_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_email_pattern", table_name="users")
@@ -1,5 +1,13 @@
+from .admin import router as admin_router
 from .auth import router as auth_router
 from .files import router as files_router
+from .stats import router as stats_router
 from .users import router as users_router
 
-__all__ = ["auth_router", "files_router", "users_router"]
+__all__ = [
+    "admin_router",
+    "auth_router",
+    "files_router",
+    "stats_router",
+    "users_router",
+]
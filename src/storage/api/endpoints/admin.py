@@ -0,0 +1,135 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage.api.schemas.audit import AuditBufferOut, AuditPage
+from storage.core.constants import (AUDIT_ACTION_DELETE, AUDIT_ACTION_DOWNLOAD,
+                                    AUDIT_ACTION_READ, DEFAULT_PAGE_SIZE,
+                                    ERR_FORBIDDEN, ERR_INVALID_CURSOR,
+                                    ERR_NOT_FOUND, MAX_PAGE_SIZE)
+from storage.core.db import get_session
+from storage.core.pagination import decode_cursor, encode_cursor
+from storage.core.security import get_current_user
+from storage.db.models.audit import audit_events
+from storage.db.models.user import User, UserRole
+from storage.services import audit
+from storage.services.profiling import Trace, get_profile, list_profiles
+
+router = APIRouter()
+
+
+def _require_admin(current_user: User = Depends(get_current_user)) -> User:
+    """
+    Доступ к разделу только для администратора.
+    """
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
+        )
+    return current_user
+
+
+def _profile_or_404(profile_id: str) -> Trace:
+    trace = get_profile(profile_id)
+    if trace is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=ERR_NOT_FOUND
+        )
+    return trace
+
+
+@router.get("/profiles")
+async def profiles(current_user=Depends(_require_admin)):
+    """
+    Сохранённые профили запросов этого процесса, новые первыми.
+
+    reason: header — запрошен заголовком X-Profile, sampled —
+    случайная выборка, slow — запрос дольше PROFILE_SLOW_MS.
+    """
+    return list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+async def profile(profile_id: str, current_user=Depends(_require_admin)):
+    """
+    Профиль запроса с деревом интервалов SQL и MinIO.
+    """
+    trace = _profile_or_404(profile_id)
+    return {**trace.summary(), "spans": trace.tree()}
+
+
+@router.get("/profiles/{profile_id}/folded", response_class=PlainTextResponse)
+async def profile_folded(
+    profile_id: str, current_user=Depends(_require_admin)
+):
+    """
+    Профиль в свёрнутом формате стеков для flamegraph.pl и speedscope.
+    """
+    return _profile_or_404(profile_id).folded()
+
+
+@router.get("/audit", response_model=AuditPage)
+async def audit_log(
+    user_id: Optional[int] = None,
+    file_id: Optional[int] = None,
+    action: Optional[
+        Literal[AUDIT_ACTION_READ, AUDIT_ACTION_DOWNLOAD, AUDIT_ACTION_DELETE]
+    ] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(_require_admin),
+):
+    """
+    Журнал доступа к файлам, новые события первыми.
+
+    Пагинация по курсору из (occurred_at, id); границы since/until
+    ограничивают просматриваемые месячные секции. События попадают
+    в журнал пачками, поэтому последние секунды могут ещё
+    отсутствовать.
+    """
+    ev = audit_events.c
+    q = select(audit_events)
+    if user_id is not None:
+        q = q.where(ev.user_id == user_id)
+    if file_id is not None:
+        q = q.where(ev.file_id == file_id)
+    if action is not None:
+        q = q.where(ev.action == action)
+    if since is not None:
+        q = q.where(ev.occurred_at >= since)
+    if until is not None:
+        q = q.where(ev.occurred_at < until)
+    if cursor is not None:
+        last_at, last_id = decode_cursor(cursor, 2)
+        try:
+            last_at = datetime.fromisoformat(last_at)
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=ERR_INVALID_CURSOR,
+            )
+        q = q.where(tuple_(ev.occurred_at, ev.id) < tuple_(last_at, last_id))
+    q = q.order_by(ev.occurred_at.desc(), ev.id.desc()).limit(limit)
+    rows = (await session.execute(q)).mappings().all()
+    next_cursor = (
+        encode_cursor(rows[-1]["occurred_at"].isoformat(), rows[-1]["id"])
+        if len(rows) == limit
+        else None
+    )
+    return AuditPage(items=rows, next_cursor=next_cursor)
+
+
+@router.get("/audit/buffer", response_model=AuditBufferOut)
+async def audit_buffer(current_user=Depends(_require_admin)):
+    """
+    Буфер журнала доступа этого процесса: сколько событий ждёт
+    сброса, сколько записано и сколько потеряно при переполнении.
+    """
+    return audit.buffer_stats()
@@ -1,31 +1,63 @@
-import secrets
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
 from io import BytesIO
 from typing import Optional
 
+from anyio import CancelScope
 from fastapi import APIRouter, Depends
 from fastapi import File as FileUpload
-from fastapi import Form, HTTPException, UploadFile, status
-from fastapi.responses import StreamingResponse
-from sqlalchemy import and_, or_, select
+from fastapi import Form, Header, HTTPException, Query, UploadFile, status
+from fastapi.responses import Response, StreamingResponse
+from minio.error import S3Error
+from sqlalchemy import and_, func, or_, select, true, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool
 
+from storage.api.schemas.file import (FileCopyIn, FileInfoBatchIn,
+                                      FileMetadataFilter, FileVersionIn)
 from storage.core.config import settings
-from storage.core.constants import (BYTES_IN_MB, DOWNLOADS_INCREMENT,
+from storage.core.constants import (AUDIT_ACTION_DELETE, AUDIT_ACTION_DOWNLOAD,
+                                    AUDIT_ACTION_READ, BYTES_IN_MB, CODEC_ZSTD,
+                                    DEFAULT_PAGE_SIZE, DOWNLOADS_INCREMENT,
                                     ERR_FILE_TOO_LARGE, ERR_FORBIDDEN,
-                                    ERR_NOT_FOUND, ERR_TYPE_NOT_ALLOWED,
+                                    ERR_NOT_FOUND, ERR_PREVIEW_NOT_READY,
+                                    ERR_QUOTA_EXCEEDED, ERR_RESTORE_EXPIRED,
+                                    ERR_TYPE_NOT_ALLOWED, ERR_UPLOAD_CORRUPTED,
                                     ERR_VISIBILITY_NOT_ALLOWED,
-                                    OBJECT_KEY_RANDOM_BYTES,
-                                    ROLE_ALLOWED_TYPES,
+                                    EXPORT_FORMAT_NDJSON, EXPORT_FORMATS,
+                                    FILE_EVENT_DELETED,
+                                    FILE_EVENTS_HEARTBEAT_SECONDS,
+                                    MAX_PAGE_SIZE, MIME_EVENT_STREAM,
+                                    MIME_TEXT_UTF8, ROLE_ALLOWED_TYPES,
                                     ROLE_ALLOWED_VISIBILITY, ROLE_MAX_SIZE_MB,
-                                    STREAM_CHUNK_SIZE, Role, Visibility)
+                                    SEARCH_QUERY_MAX_LENGTH,
+                                    SEARCH_QUERY_MIN_LENGTH, STREAM_CHUNK_SIZE,
+                                    UPLOAD_PART_SIZE, Role, Visibility)
 from storage.core.db import get_session
+from storage.core.pagination import decode_cursor, encode_cursor
 from storage.core.security import get_current_user
-from storage.db.models.file import File, FileVisibility
+from storage.db.models.file import File, FileVersion, FileVisibility
 from storage.db.models.user import User
-from storage.services.s3 import ensure_bucket, get_client
-from storage.services.tasks import extract_metadata_task
+from storage.services import audit, events
+from storage.services.admission import admit
+from storage.services.analytics import record_download
+from storage.services.compression import (accepts_encoding, choose_codec,
+                                          decode_bytes, decode_iter,
+                                          encode_stream)
+from storage.services.export import export_select, stream_export
+from storage.services.integrity import ChecksumReader, EtagReader
+from storage.services.preview import copy_preview, preview_key
+from storage.services.s3 import (ensure_bucket, get_shard, make_object_key,
+                                 place)
+from storage.services.search import (apply_metadata_filters,
+                                     build_search_query, build_search_vector)
+from storage.services.tasks import enqueue_metadata_task
+from storage.services.usage import add_usage, has_quota
+from storage.services.versions import (archive_current, copy_object,
+                                       versions_size)
 
 router = APIRouter()
 
@@ -38,6 +70,157 @@ def _visibility_enum(v: Visibility) -> FileVisibility:
     return FileVisibility(v.value)
 
 
+def _apply_access_filter(q, current_user: User, department_id=None):
+    """
+    Ограничение выборки файлов по роли и уровню видимости.
+
+    Ожидает запрос, в котором files уже соединена с users
+    по владельцу. Удалённые файлы исключаются всегда.
+    Для MANAGER/ADMIN учитывает department_id.
+    """
+    role = _role_from_user(current_user)
+    q = q.where(File.deleted_at.is_(None))
+    if role == Role.MANAGER:
+        q = q.where(
+            or_(
+                File.visibility == FileVisibility.PUBLIC,
+                File.visibility == FileVisibility.DEPARTMENT,
+                and_(
+                    File.visibility == FileVisibility.PRIVATE,
+                    File.owner_id == current_user.id,
+                ),
+            )
+        )
+    elif role != Role.ADMIN:
+        q = q.where(
+            or_(
+                File.visibility == FileVisibility.PUBLIC,
+                and_(
+                    File.visibility == FileVisibility.DEPARTMENT,
+                    User.department_id == current_user.department_id,
+                ),
+                and_(
+                    File.visibility == FileVisibility.PRIVATE,
+                    File.owner_id == current_user.id,
+                ),
+            )
+        )
+    if department_id is not None and role in {Role.MANAGER, Role.ADMIN}:
+        q = q.where(User.department_id == department_id)
+    return q
+
+
+async def _get_readable_file(
+    session: AsyncSession, file_id: int, current_user: User
+) -> File:
+    """
+    Неудалённый файл с владельцем и проверкой права его читать.
+    """
+    q = await session.execute(
+        select(File)
+        .options(selectinload(File.owner))
+        .where(File.id == file_id, File.deleted_at.is_(None))
+    )
+    f = q.scalar_one_or_none()
+    if not f:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=ERR_NOT_FOUND
+        )
+    role = _role_from_user(current_user)
+    if (
+        f.visibility == FileVisibility.PRIVATE
+        and f.owner_id != current_user.id
+        and role != Role.ADMIN
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
+        )
+    if f.visibility == FileVisibility.DEPARTMENT:
+        if role == Role.USER and (
+            not f.owner or f.owner.department_id != current_user.department_id
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
+            )
+    return f
+
+
+async def _get_version(
+    session: AsyncSession, f: File, version: int
+) -> FileVersion:
+    q = await session.execute(
+        select(FileVersion).where(
+            FileVersion.file_id == f.id, FileVersion.version == version
+        )
+    )
+    v = q.scalar_one_or_none()
+    if not v:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=ERR_NOT_FOUND
+        )
+    return v
+
+
+def _read_access_clause(current_user: User):
+    """
+    Условие права читать файл для выборки files, соединённой с users.
+
+    Повторяет проверки _get_readable_file, чтобы пакетная выборка
+    отвечала так же, как запросы по одному файлу.
+    """
+    role = _role_from_user(current_user)
+    if role == Role.ADMIN:
+        return true()
+    own = File.owner_id == current_user.id
+    if role == Role.MANAGER:
+        return or_(File.visibility != FileVisibility.PRIVATE, own)
+    return or_(
+        File.visibility == FileVisibility.PUBLIC,
+        and_(File.visibility == FileVisibility.PRIVATE, own),
+        and_(
+            File.visibility == FileVisibility.DEPARTMENT,
+            User.department_id.is_not_distinct_from(
+                current_user.department_id
+            ),
+        ),
+    )
+
+
+def _file_info(f: File) -> dict:
+    return {
+        "id": f.id,
+        "filename": f.filename,
+        "visibility": f.visibility.value,
+        "metadata": f.metadata_,
+        "downloads_count": f.downloads_count,
+        "version": f.version,
+        "sha256": f.sha256,
+        "verified_at": f.verified_at,
+        "corrupted": f.corrupted_at is not None,
+    }
+
+
+def _check_delete_access(f: File, current_user: User) -> None:
+    """
+    Проверка права удалять, восстанавливать файл и публиковать
+    его новые версии.
+    """
+    role = _role_from_user(current_user)
+    if role == Role.USER and f.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
+        )
+    if (
+        role == Role.MANAGER
+        and getattr(f, "owner", None)
+        and getattr(f.owner, "department_id", None)
+        != current_user.department_id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
+        )
+
+
 @router.post("/upload", status_code=status.HTTP_201_CREATED)
 async def upload_file(
     visibility: Visibility = Form(...),
@@ -49,8 +232,12 @@ async def upload_file(
     Загрузка файла в хранилище с учётом роли и уровня видимости.
 
     Принимает multipart/form-data: файл и значение видимости.
-    Проверяет ограничения роли по типу и размеру, сохраняет в S3,
-    создаёт запись в БД и запускает задачу извлечения метаданных.
+    Проверяет ограничения роли по типу, размеру и квоте, сохраняет
+    в шард S3, выбранный по ключу или отделу (при включённом сжатии —
+    через zstd), сверяя ETag ответа с посчитанным при передаче,
+    сохраняет SHA-256 содержимого, создаёт запись в БД,
+    обновляет счётчики занятого места и запускает задачу
+    извлечения метаданных.
     """
     role = _role_from_user(current_user)
     if visibility not in ROLE_ALLOWED_VISIBILITY[role]:
@@ -70,29 +257,76 @@ async def upload_file(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=ERR_FILE_TOO_LARGE,
         )
-    object_key = f"{current_user.id}/{secrets.token_urlsafe(OBJECT_KEY_RANDOM_BYTES)}_{file.filename}" # noqa
-    ensure_bucket()
-    client = get_client()
-    data_stream = BytesIO(chunk)
-    client.put_object(
-        bucket_name=settings.MINIO_BUCKET_NAME,
-        object_name=object_key,
-        data=data_stream,
-        length=len(chunk),
-        content_type=file.content_type,
-    )
+    if not await has_quota(session, current_user, len(chunk)):
+        raise HTTPException(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail=ERR_QUOTA_EXCEEDED,
+        )
+    object_key = make_object_key(current_user.id, file.filename)
+    shard = get_shard(place(object_key, current_user.department_id))
+    await asyncio.to_thread(ensure_bucket, shard)
+    codec = choose_codec(chunk) if settings.STORAGE_COMPRESSION else None
+    length = len(chunk) if codec is None else -1
+    part_size = 0 if codec is None else UPLOAD_PART_SIZE
+    slot = await admit(current_user, len(chunk))
+    try:
+        checksum = ChecksumReader(slot.reader(BytesIO(chunk)))
+        data_stream = EtagReader(
+            encode_stream(checksum, codec), length, part_size
+        )
+        result = await asyncio.to_thread(
+            shard.client.put_object,
+            bucket_name=shard.bucket,
+            object_name=object_key,
+            data=data_stream,
+            length=length,
+            content_type=file.content_type,
+            part_size=part_size,
+        )
+    finally:
+        await slot.release()
+    if result.etag != data_stream.etag():
+        await asyncio.to_thread(
+            shard.client.remove_object, shard.bucket, object_key
+        )
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=ERR_UPLOAD_CORRUPTED,
+        )
     db_file = File(
         filename=file.filename,
         object_key=object_key,
+        shard=shard.name,
         owner_id=current_user.id,
         visibility=_visibility_enum(visibility),
+        size_bytes=len(chunk),
+        codec=codec,
+        content_type=file.content_type,
+        sha256=checksum.hexdigest(),
+        etag=result.etag,
         metadata_=None,
         downloads_count=0,
+        search_vector=build_search_vector(file.filename, None),
     )
     session.add(db_file)
+    if not await add_usage(session, current_user, len(chunk)):
+        await session.rollback()
+        await asyncio.to_thread(
+            shard.client.remove_object, shard.bucket, object_key
+        )
+        raise HTTPException(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail=ERR_QUOTA_EXCEEDED,
+        )
     await session.commit()
     await session.refresh(db_file)
-    extract_metadata_task.delay(object_key, file.content_type)
+    enqueue_metadata_task(
+        object_key,
+        file.content_type,
+        codec=codec,
+        size=len(chunk),
+        shard=shard.name,
+    )
     return {
         "id": db_file.id,
         "filename": db_file.filename,
@@ -101,6 +335,191 @@ async def upload_file(
     }
 
 
+@router.get("/search")
+async def search_files(
+    q: str = Query(
+        ...,
+        min_length=SEARCH_QUERY_MIN_LENGTH,
+        max_length=SEARCH_QUERY_MAX_LENGTH,
+    ),
+    department_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Полнотекстовый поиск по имени файла и метаданным.
+
+    Ищет по tsvector (имя, заголовок, автор, текст) и по триграммам
+    имени файла. Результаты ранжированы по релевантности, доступ
+    ограничивается так же, как в списке файлов. Пагинация по курсору.
+    """
+    tsquery = build_search_query(q)
+    rank = func.ts_rank(File.search_vector, tsquery) + func.similarity(
+        File.filename, q
+    )
+    stmt = (
+        select(
+            File.id,
+            File.filename,
+            File.visibility,
+            File.metadata_,
+            rank.label("rank"),
+        )
+        .join(User, File.owner_id == User.id)
+        .where(
+            or_(
+                File.search_vector.op("@@")(tsquery),
+                File.filename.op("%")(q),
+            )
+        )
+    )
+    stmt = _apply_access_filter(stmt, current_user, department_id)
+    if cursor is not None:
+        last_rank, last_id = decode_cursor(cursor, 2)
+        stmt = stmt.where(tuple_(rank, File.id) < tuple_(last_rank, last_id))
+    stmt = stmt.order_by(rank.desc(), File.id.desc()).limit(limit)
+    rows = (await session.execute(stmt)).all()
+    next_cursor = (
+        encode_cursor(rows[-1].rank, rows[-1].id)
+        if len(rows) == limit
+        else None
+    )
+    return {
+        "items": [
+            {
+                "id": x.id,
+                "filename": x.filename,
+                "visibility": x.visibility.value,
+                "metadata": x.metadata_,
+                "rank": x.rank,
+            }
+            for x in rows
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.post("/info:batch")
+async def get_files_info(
+    body: FileInfoBatchIn,
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Информация о нескольких файлах одним запросом.
+
+    Права проверяются одним SQL-запросом для всего набора id.
+    Ответ содержит элемент на каждый уникальный id в порядке запроса:
+    status 200 с полями как у GET /files/{file_id}, либо 403/404
+    с detail, как ответил бы запрос по одному файлу.
+    """
+    ids = list(dict.fromkeys(body.ids))
+    rows = (
+        await session.execute(
+            select(File, _read_access_clause(current_user).label("allowed"))
+            .join(User, File.owner_id == User.id)
+            .where(File.id.in_(ids), File.deleted_at.is_(None))
+        )
+    ).all()
+    found = {f.id: (f, allowed) for f, allowed in rows}
+    items = []
+    for file_id in ids:
+        if file_id not in found:
+            items.append(
+                {
+                    "id": file_id,
+                    "status": status.HTTP_404_NOT_FOUND,
+                    "detail": ERR_NOT_FOUND,
+                }
+            )
+            continue
+        f, allowed = found[file_id]
+        if not allowed:
+            items.append(
+                {
+                    "id": file_id,
+                    "status": status.HTTP_403_FORBIDDEN,
+                    "detail": ERR_FORBIDDEN,
+                }
+            )
+            continue
+        audit.record(AUDIT_ACTION_READ, f.id, current_user)
+        items.append(
+            {"id": file_id, "status": status.HTTP_200_OK, **_file_info(f)}
+        )
+    return {"items": items}
+
+
+@router.get("/export")
+async def export_files(
+    fmt: str = Query(
+        EXPORT_FORMAT_NDJSON,
+        alias="format",
+        pattern=f"^({'|'.join(EXPORT_FORMATS)})$",
+    ),
+    department_id: Optional[int] = None,
+    filters: FileMetadataFilter = Depends(),
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Потоковая выгрузка доступных файлов в NDJSON или CSV.
+
+    Доступ и фильтры такие же, как у списка файлов. Колонки: размер,
+    владелец и его отдел, скачивания, версия, SHA-256 и метаданные.
+    Строки читаются из серверного курсора и кодируются пачками,
+    поэтому выгрузка всего хранилища не держит его в памяти.
+    """
+    q = _apply_access_filter(export_select(), current_user, department_id)
+    q = apply_metadata_filters(q, filters).order_by(File.id)
+    # Соединение с БД из зависимости не нужно: поток откроет своё
+    await session.close()
+    return StreamingResponse(
+        stream_export(q, fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="files.{fmt}"'
+        },
+    )
+
+
+@router.get("/events")
+async def file_events(
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Поток Server-Sent Events об изменениях файлов пользователя.
+
+    События: metadata_ready, metadata_failed, deleted; данные —
+    JSON с file_id и временем. Соединение поддерживается пингами,
+    пропущенные при обрыве события не повторяются.
+    """
+    user_id = current_user.id
+    # Соединение с БД не должно удерживаться на время подписки
+    await session.close()
+
+    async def _stream():
+        async with events.subscribe(user_id) as queue:
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), FILE_EVENTS_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        _stream(),
+        media_type=MIME_EVENT_STREAM,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{file_id}")
 async def get_file_info(
     file_id: int,
@@ -110,146 +529,470 @@ async def get_file_info(
     """
     Получение информации о файле по ID.
 
-    Возвращает базовые сведения и извлечённые метаданные.
+    Возвращает базовые сведения, извлечённые метаданные,
+    контрольную сумму SHA-256 и результат последней проверки
+    целостности.
     Применяются проверки доступа по видимости и ролям.
     """
+    f = await _get_readable_file(session, file_id, current_user)
+    audit.record(AUDIT_ACTION_READ, f.id, current_user)
+    return _file_info(f)
+
+
+@router.get("/{file_id}/download")
+async def download_file(
+    file_id: int,
+    version: Optional[int] = Query(None, ge=1),
+    accept_encoding: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Скачивание файла по ID со стримингом и проверкой прав доступа.
+
+    Увеличивает счётчик скачиваний и возвращает поток ответа
+    с корректными заголовками для загрузки. Сжатые объекты
+    распаковываются на лету либо отдаются как есть
+    с Content-Encoding, если клиент его поддерживает. Число
+    одновременных скачиваний и скорость ограничиваются по роли.
+    По умолчанию отдаётся последняя версия, предыдущую можно
+    запросить параметром version.
+    """
+    f = await _get_readable_file(session, file_id, current_user)
+    source = f
+    if version is not None and version != f.version:
+        source = await _get_version(session, f, version)
+    slot = await admit(current_user, source.size_bytes or 0)
+    obj = None
+    try:
+        shard = get_shard(source.shard)
+        obj = await asyncio.to_thread(
+            shard.client.get_object, shard.bucket, source.object_key
+        )
+        headers = {
+            "Content-Disposition": f'attachment; filename="{f.filename}"'
+        }
+        if accepts_encoding(accept_encoding, source.codec):
+            headers["Content-Encoding"] = source.codec
+            codec = None
+        else:
+            codec = source.codec
+
+        async def _iter():
+            # Слот освобождается и здесь: при обрыве соединения
+            # Starlette не запускает фоновую задачу ответа
+            try:
+                async for chunk in iterate_in_threadpool(
+                    slot.throttle(decode_iter(obj, codec, STREAM_CHUNK_SIZE))
+                ):
+                    yield chunk
+            finally:
+                obj.close()
+                obj.release_conn()
+                with CancelScope(shield=True):
+                    await slot.release()
+
+        f.downloads_count += DOWNLOADS_INCREMENT
+        await session.commit()
+        record_download(f, current_user)
+        audit.record(AUDIT_ACTION_DOWNLOAD, f.id, current_user)
+        return StreamingResponse(
+            _iter(),
+            media_type="application/octet-stream",
+            headers=headers,
+            background=BackgroundTask(slot.release),
+        )
+    except BaseException:
+        if obj is not None:
+            obj.close()
+            obj.release_conn()
+        await slot.release()
+        raise
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+@router.get("/{file_id}/preview")
+async def preview_file(
+    file_id: int,
+    version: Optional[int] = Query(None, ge=1),
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Начало текста документа для предпросмотра без скачивания файла.
+
+    Текст сохраняется при извлечении метаданных сжатым отдельным
+    объектом; если клиент принимает zstd, он отдаётся как есть.
+    Права доступа совпадают со скачиванием. ETag позволяет
+    повторному запросу получить 304 без чтения текста.
+    """
+    f = await _get_readable_file(session, file_id, current_user)
+    source = f
+    if version is not None and version != f.version:
+        source = await _get_version(session, f, version)
+    # Соединение с БД не держится на время обращения к MinIO
+    await session.close()
+    shard = get_shard()
+    key = preview_key(source.object_key)
+    try:
+        stat = await asyncio.to_thread(
+            shard.client.stat_object, shard.bucket, key
+        )
+    except S3Error as e:
+        if e.code != "NoSuchKey":
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=ERR_PREVIEW_NOT_READY,
+        )
+    headers = {
+        "ETag": f'"{stat.etag}"',
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    audit.record(AUDIT_ACTION_READ, f.id, current_user)
+    if _etag_matches(if_none_match, headers["ETag"]):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+        )
+    obj = await asyncio.to_thread(shard.client.get_object, shard.bucket, key)
+    try:
+        data = await asyncio.to_thread(obj.read)
+    finally:
+        obj.close()
+        obj.release_conn()
+    if accepts_encoding(accept_encoding, CODEC_ZSTD):
+        headers["Content-Encoding"] = CODEC_ZSTD
+    else:
+        data = decode_bytes(data, CODEC_ZSTD)
+    return Response(data, media_type=MIME_TEXT_UTF8, headers=headers)
+
+
+@router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_file(
+    file_id: int,
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Удаление файла по ID с учётом прав доступа.
+
+    Пользователь может удалять только свои файлы.
+    Менеджер может удалять файлы своего отдела.
+    Администратор может удалять любые файлы.
+    Файл помечается удалённым, объект в хранилище и запись
+    удаляются фоновой задачей после окончания срока хранения.
+    """
+    q = await session.execute(
+        select(File)
+        .options(selectinload(File.owner))
+        .where(File.id == file_id, File.deleted_at.is_(None))
+    )
+    f = q.scalar_one_or_none()
+    if not f:
+        return
+    _check_delete_access(f, current_user)
+    size = (f.size_bytes or 0) + await versions_size(session, f.id)
+    await add_usage(session, f.owner, -size, files=-1)
+    f.deleted_at = func.now()
+    await session.commit()
+    audit.record(AUDIT_ACTION_DELETE, f.id, current_user)
+    await events.publish(f.owner_id, f.id, FILE_EVENT_DELETED)
+    return
+
+
+@router.post("/{file_id}/restore")
+async def restore_file(
+    file_id: int,
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Восстановление удалённого файла до его окончательной очистки.
+
+    Права доступа совпадают с удалением. Место файла и его
+    предыдущих версий снова учитывается в квоте владельца.
+    Файлы старше DELETED_RETENTION_HOURS уже отданы очистке
+    и не восстанавливаются; строка блокируется, чтобы не пересечься
+    с идущей очисткой.
+    """
     q = await session.execute(
         select(File)
         .options(selectinload(File.owner))
-        .where(File.id == file_id)
+        .where(File.id == file_id, File.deleted_at.is_not(None))
+        .with_for_update(of=File)
     )
     f = q.scalar_one_or_none()
     if not f:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=ERR_NOT_FOUND
         )
-    role = _role_from_user(current_user)
-    if (
-        f.visibility == FileVisibility.PRIVATE
-        and f.owner_id != current_user.id
-        and role != Role.ADMIN
-    ):
+    _check_delete_access(f, current_user)
+    cutoff = datetime.now(timezone.utc) - timedelta(
+        hours=settings.DELETED_RETENTION_HOURS
+    )
+    if f.deleted_at < cutoff:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
+            status_code=status.HTTP_410_GONE, detail=ERR_RESTORE_EXPIRED
         )
-    if f.visibility == FileVisibility.DEPARTMENT:
-        if role == Role.USER and (
-            not f.owner or f.owner.department_id != current_user.department_id
-        ):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
-            )
+    size = (f.size_bytes or 0) + await versions_size(session, f.id)
+    if not await add_usage(session, f.owner, size):
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail=ERR_QUOTA_EXCEEDED,
+        )
+    f.deleted_at = None
+    await session.commit()
     return {
         "id": f.id,
         "filename": f.filename,
         "visibility": f.visibility.value,
-        "metadata": f.metadata_,
-        "downloads_count": f.downloads_count,
     }
 
 
-@router.get("/{file_id}/download")
-async def download_file(
+@router.post("/{file_id}/copy", status_code=status.HTTP_201_CREATED)
+async def copy_file(
     file_id: int,
+    body: FileCopyIn,
     session: AsyncSession = Depends(get_session),
     current_user=Depends(get_current_user),
 ):
     """
-    Скачивание файла по ID со стримингом и проверкой прав доступа.
+    Копия доступного файла с новой видимостью без повторной загрузки.
 
-    Увеличивает счётчик скачиваний и возвращает поток ответа
-    с корректными заголовками для загрузки.
+    Объект копируется на стороне MinIO в том же шарде, поэтому
+    байты не проходят через API. Владельцем копии становится
+    текущий пользователь; ограничения роли и квота проверяются
+    как при загрузке. Содержимое совпадает, поэтому метаданные
+    и контрольная сумма переносятся без повторного извлечения.
     """
-    q = await session.execute(
-        select(File)
-        .options(selectinload(File.owner))
-        .where(File.id == file_id)
-    )
-    f = q.scalar_one_or_none()
-    if not f:
+    f = await _get_readable_file(session, file_id, current_user)
+    role = _role_from_user(current_user)
+    if body.visibility not in ROLE_ALLOWED_VISIBILITY[role]:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=ERR_NOT_FOUND
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=ERR_VISIBILITY_NOT_ALLOWED,
         )
-    role = _role_from_user(current_user)
-    if (
-        f.visibility == FileVisibility.PRIVATE
-        and f.owner_id != current_user.id
-        and role != Role.ADMIN
-    ):
+    if f.content_type not in ROLE_ALLOWED_TYPES[role]:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=ERR_TYPE_NOT_ALLOWED,
+        )
+    size = f.size_bytes or 0
+    if size > ROLE_MAX_SIZE_MB[role] * BYTES_IN_MB:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=ERR_FILE_TOO_LARGE,
+        )
+    if not await has_quota(session, current_user, size):
+        raise HTTPException(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail=ERR_QUOTA_EXCEEDED,
+        )
+    filename = body.filename or f.filename
+    object_key = make_object_key(current_user.id, filename)
+    shard = get_shard(f.shard)
+    etag = await asyncio.to_thread(
+        copy_object, shard, f.object_key, object_key
+    )
+    db_file = File(
+        filename=filename,
+        object_key=object_key,
+        shard=shard.name,
+        owner_id=current_user.id,
+        visibility=_visibility_enum(body.visibility),
+        size_bytes=f.size_bytes,
+        codec=f.codec,
+        content_type=f.content_type,
+        sha256=f.sha256,
+        etag=etag,
+        metadata_=f.metadata_,
+        downloads_count=0,
+        search_vector=build_search_vector(filename, f.metadata_),
+    )
+    session.add(db_file)
+    if not await add_usage(session, current_user, size):
+        await session.rollback()
+        await asyncio.to_thread(
+            shard.client.remove_object, shard.bucket, object_key
+        )
+        raise HTTPException(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail=ERR_QUOTA_EXCEEDED,
         )
-    if f.visibility == FileVisibility.DEPARTMENT:
-        if role == Role.USER and (
-            not f.owner or f.owner.department_id != current_user.department_id
-        ):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
-            )
-    client = get_client()
-    obj = client.get_object(settings.MINIO_BUCKET_NAME, f.object_key)
-
-    def _iter():
-        try:
-            for chunk in obj.stream(STREAM_CHUNK_SIZE):
-                yield chunk
-        finally:
-            obj.close()
-            obj.release_conn()
-
-    f.downloads_count += DOWNLOADS_INCREMENT
     await session.commit()
-    return StreamingResponse(
-        _iter(),
-        media_type="application/octet-stream",
-        headers={
-            "Content-Disposition": f'attachment; filename="{f.filename}"'
-        },
-        background=BackgroundTask(lambda: None),
+    await session.refresh(db_file)
+    if db_file.metadata_ is None:
+        enqueue_metadata_task(
+            object_key,
+            db_file.content_type,
+            codec=db_file.codec,
+            size=size,
+            shard=shard.name,
+        )
+    else:
+        await asyncio.to_thread(copy_preview, f.object_key, object_key)
+    return {
+        "id": db_file.id,
+        "filename": db_file.filename,
+        "visibility": db_file.visibility.value,
+        "object_key": db_file.object_key,
+    }
+
+
+@router.get("/{file_id}/versions")
+async def list_versions(
+    file_id: int,
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Версии файла от последней к первой.
+
+    Доступ такой же, как к информации о файле. Удалённые
+    политикой хранения версии в списке отсутствуют.
+    """
+    f = await _get_readable_file(session, file_id, current_user)
+    q = await session.execute(
+        select(FileVersion)
+        .where(FileVersion.file_id == f.id)
+        .order_by(FileVersion.version.desc())
     )
+    current = {
+        "version": f.version,
+        "size_bytes": f.size_bytes,
+        "content_type": f.content_type,
+        "sha256": f.sha256,
+        "archived_at": None,
+        "current": True,
+    }
+    return [current] + [
+        {
+            "version": v.version,
+            "size_bytes": v.size_bytes,
+            "content_type": v.content_type,
+            "sha256": v.sha256,
+            "archived_at": v.archived_at,
+            "current": False,
+        }
+        for v in q.scalars()
+    ]
 
 
-@router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_file(
+@router.post("/{file_id}/versions", status_code=status.HTTP_201_CREATED)
+async def publish_version(
     file_id: int,
+    body: FileVersionIn,
     session: AsyncSession = Depends(get_session),
     current_user=Depends(get_current_user),
 ):
     """
-    Удаление файла по ID с учётом прав доступа.
+    Публикация новой версии файла без повторной загрузки.
 
-    Пользователь может удалять только свои файлы.
-    Менеджер может удалять файлы своего отдела.
-    Администратор может удалять любые файлы.
+    Источник — другой доступный файл (source_file_id) или
+    предыдущая версия этого файла (version). Объект источника
+    копируется на стороне MinIO в его шард, текущее содержимое
+    переходит в историю версий. Метаданные источника переносятся,
+    а если их ещё нет, ставится задача извлечения. Если содержимое
+    совпадает с текущим, новая версия не создаётся. Права — как
+    на удаление файла; место версии учитывается в квоте владельца.
     """
-    q = await session.execute(select(File).where(File.id == file_id))
-    f = q.scalar_one_or_none()
-    if not f:
-        return
-    role = _role_from_user(current_user)
-    if role == Role.USER and f.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
+    f = await _get_readable_file(session, file_id, current_user)
+    _check_delete_access(f, current_user)
+    if body.source_file_id is not None:
+        source = await _get_readable_file(
+            session, body.source_file_id, current_user
         )
-    if (
-        role == Role.MANAGER
-        and getattr(f, "owner", None)
-        and getattr(f.owner, "department_id", None)
-        != current_user.department_id
-    ):
+        role = _role_from_user(current_user)
+        if source.content_type not in ROLE_ALLOWED_TYPES[role]:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=ERR_TYPE_NOT_ALLOWED,
+            )
+        if (source.size_bytes or 0) > ROLE_MAX_SIZE_MB[role] * BYTES_IN_MB:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=ERR_FILE_TOO_LARGE,
+            )
+    else:
+        source = await _get_version(session, f, body.version)
+    if source.sha256 is not None and source.sha256 == f.sha256:
+        return {"id": f.id, "filename": f.filename, "version": f.version}
+    size = source.size_bytes or 0
+    if not await has_quota(session, f.owner, size):
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail=ERR_QUOTA_EXCEEDED,
+        )
+    object_key = make_object_key(f.owner_id, f.filename)
+    shard = get_shard(source.shard)
+    etag = await asyncio.to_thread(
+        copy_object, shard, source.object_key, object_key
+    )
+
+    async def _discard(status_code: int, detail: str):
+        await session.rollback()
+        await asyncio.to_thread(
+            shard.client.remove_object, shard.bucket, object_key
+        )
+        raise HTTPException(status_code=status_code, detail=detail)
+
+    # Копирование идёт без блокировки, номер версии выдаётся под ней
+    f = (
+        await session.execute(
+            select(File)
+            .options(selectinload(File.owner))
+            .where(File.id == file_id, File.deleted_at.is_(None))
+            .with_for_update(of=File)
+            .execution_options(populate_existing=True)
+        )
+    ).scalar_one_or_none()
+    if not f:
+        await _discard(status.HTTP_404_NOT_FOUND, ERR_NOT_FOUND)
+    session.add(archive_current(f))
+    f.object_key = object_key
+    f.shard = shard.name
+    f.size_bytes = source.size_bytes
+    f.codec = source.codec
+    f.content_type = source.content_type
+    f.sha256 = source.sha256
+    f.etag = etag
+    f.verified_at = None
+    f.corrupted_at = None
+    f.metadata_ = source.metadata_
+    f.search_vector = build_search_vector(f.filename, source.metadata_)
+    f.version += 1
+    if not await add_usage(session, f.owner, size, files=0):
+        await _discard(
+            status.HTTP_507_INSUFFICIENT_STORAGE, ERR_QUOTA_EXCEEDED
         )
-    client = get_client()
-    client.remove_object(settings.MINIO_BUCKET_NAME, f.object_key)
-    await session.delete(f)
     await session.commit()
-    return
+    if source.metadata_ is None:
+        enqueue_metadata_task(
+            object_key,
+            source.content_type,
+            codec=source.codec,
+            size=size,
+            shard=shard.name,
+        )
+    else:
+        await asyncio.to_thread(copy_preview, source.object_key, object_key)
+    return {"id": f.id, "filename": f.filename, "version": f.version}
 
 
 @router.get("/")
 async def list_files(
     department_id: Optional[int] = None,
+    filters: FileMetadataFilter = Depends(),
     session: AsyncSession = Depends(get_session),
     current_user=Depends(get_current_user),
 ):
@@ -258,44 +1001,16 @@ async def list_files(
 
     Учитывает роль и уровень видимости.
     Для MANAGER/ADMIN поддерживается фильтрация по department_id.
+    Поддерживаются фильтры по типу, автору, заголовку,
+    числу страниц и дате создания документа.
     """
-    role = _role_from_user(current_user)
     base = (
         select(File)
         .join(User, File.owner_id == User.id)
         .options(selectinload(File.owner))
     )
-
-    if role == Role.ADMIN:
-        q = base
-    elif role == Role.MANAGER:
-        q = base.where(
-            or_(
-                File.visibility == FileVisibility.PUBLIC,
-                File.visibility == FileVisibility.DEPARTMENT,
-                and_(
-                    File.visibility == FileVisibility.PRIVATE,
-                    File.owner_id == current_user.id,
-                ),
-            )
-        )
-    else:
-        q = base.where(
-            or_(
-                File.visibility == FileVisibility.PUBLIC,
-                and_(
-                    File.visibility == FileVisibility.DEPARTMENT,
-                    User.department_id == current_user.department_id,
-                ),
-                and_(
-                    File.visibility == FileVisibility.PRIVATE,
-                    File.owner_id == current_user.id,
-                ),
-            )
-        )
-
-    if department_id is not None and role in {Role.MANAGER, Role.ADMIN}:
-        q = q.where(User.department_id == department_id)
+    q = _apply_access_filter(base, current_user, department_id)
+    q = apply_metadata_filters(q, filters)
 
     rows = (await session.execute(q)).scalars().all()
     return [
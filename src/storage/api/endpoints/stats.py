@@ -0,0 +1,216 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage.api.schemas.stats import (DailyDownloadsOut, DepartmentTrendOut,
+                                       TopFileOut, UsageOut, UsageReport)
+from storage.core.constants import (DOWNLOAD_STATS_DEFAULT_DAYS,
+                                    DOWNLOAD_STATS_MAX_DAYS,
+                                    DOWNLOAD_TOP_DEFAULT_LIMIT,
+                                    DOWNLOAD_TOP_MAX_LIMIT, ERR_FORBIDDEN,
+                                    ERR_NOT_FOUND)
+from storage.core.db import get_session
+from storage.core.security import get_current_user
+from storage.db.models.download import DownloadFileDaily, DownloadUserDaily
+from storage.db.models.file import File
+from storage.db.models.usage import UsageScope
+from storage.db.models.user import User, UserRole
+from storage.services.usage import get_usage, quotas
+
+router = APIRouter()
+
+
+async def _usage_out(
+    session: AsyncSession, scope: UsageScope, scope_id: int, limit
+) -> UsageOut:
+    usage = await get_usage(session, scope, scope_id)
+    return UsageOut(
+        scope_id=scope_id,
+        bytes_used=usage.bytes_used if usage else 0,
+        files_count=usage.files_count if usage else 0,
+        quota_bytes=limit,
+    )
+
+
+async def _resolve_target(
+    session: AsyncSession, current_user: User, user_id: Optional[int]
+) -> User:
+    """
+    Пользователь, чью статистику запрашивают, с проверкой прав.
+
+    ADMIN может запросить любого пользователя,
+    MANAGER — только пользователей своего отдела.
+    """
+    if user_id is None or user_id == current_user.id:
+        return current_user
+    if current_user.role == UserRole.USER:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
+        )
+    q = await session.execute(select(User).where(User.id == user_id))
+    target = q.scalar_one_or_none()
+    if not target:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=ERR_NOT_FOUND
+        )
+    if (
+        current_user.role == UserRole.MANAGER
+        and target.department_id != current_user.department_id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
+        )
+    return target
+
+
+def _resolve_department(
+    current_user: User, department_id: Optional[int]
+) -> Optional[int]:
+    """
+    Отдел для отчётов по скачиваниям; None — все отделы.
+
+    USER отчёты по отделам недоступны, MANAGER видит только свой отдел.
+    """
+    if current_user.role == UserRole.ADMIN:
+        return department_id
+    if current_user.role == UserRole.MANAGER and department_id in (
+        None,
+        current_user.department_id,
+    ):
+        return current_user.department_id
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
+    )
+
+
+def _since(days: int) -> date:
+    return datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+
+
+@router.get("/usage", response_model=UsageReport)
+async def usage(
+    user_id: Optional[int] = None,
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Занятое место пользователя и его отдела.
+
+    Читается из агрегированных счётчиков без обхода файлов.
+    ADMIN может запросить любого пользователя,
+    MANAGER — только пользователей своего отдела.
+    """
+    target = await _resolve_target(session, current_user, user_id)
+    report = {}
+    for scope, scope_id, limit in quotas(target):
+        report[scope.value.lower()] = await _usage_out(
+            session, scope, scope_id, limit
+        )
+    return UsageReport(**report)
+
+
+@router.get("/downloads/top", response_model=list[TopFileOut])
+async def top_files(
+    days: int = Query(
+        DOWNLOAD_STATS_DEFAULT_DAYS, ge=1, le=DOWNLOAD_STATS_MAX_DAYS
+    ),
+    department_id: Optional[int] = None,
+    limit: int = Query(
+        DOWNLOAD_TOP_DEFAULT_LIMIT, ge=1, le=DOWNLOAD_TOP_MAX_LIMIT
+    ),
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Самые скачиваемые файлы за последние days дней.
+
+    department_id фильтрует по отделу скачавших. Данные берутся
+    из дневной свёртки и отстают от реальных скачиваний
+    не более чем на период её пересчёта.
+    """
+    department_id = _resolve_department(current_user, department_id)
+    downloads = func.sum(DownloadFileDaily.downloads)
+    q = (
+        select(
+            File.id.label("file_id"),
+            File.filename,
+            downloads.label("downloads"),
+            func.sum(DownloadFileDaily.bytes).label("bytes"),
+        )
+        .join(File, File.id == DownloadFileDaily.file_id)
+        .where(
+            DownloadFileDaily.day >= _since(days),
+            File.deleted_at.is_(None),
+        )
+        .group_by(File.id)
+        .order_by(downloads.desc(), File.id)
+        .limit(limit)
+    )
+    if department_id is not None:
+        q = q.where(DownloadFileDaily.department_id == department_id)
+    rows = (await session.execute(q)).all()
+    return [TopFileOut(**row._mapping) for row in rows]
+
+
+@router.get("/downloads/departments", response_model=list[DepartmentTrendOut])
+async def department_trends(
+    days: int = Query(
+        DOWNLOAD_STATS_DEFAULT_DAYS, ge=1, le=DOWNLOAD_STATS_MAX_DAYS
+    ),
+    department_id: Optional[int] = None,
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Скачивания по дням и отделам за последние days дней.
+    """
+    department_id = _resolve_department(current_user, department_id)
+    q = (
+        select(
+            DownloadUserDaily.day,
+            DownloadUserDaily.department_id,
+            func.sum(DownloadUserDaily.downloads).label("downloads"),
+            func.sum(DownloadUserDaily.bytes).label("bytes"),
+        )
+        .where(DownloadUserDaily.day >= _since(days))
+        .group_by(DownloadUserDaily.day, DownloadUserDaily.department_id)
+        .order_by(DownloadUserDaily.day, DownloadUserDaily.department_id)
+    )
+    if department_id is not None:
+        q = q.where(DownloadUserDaily.department_id == department_id)
+    rows = (await session.execute(q)).all()
+    return [DepartmentTrendOut(**row._mapping) for row in rows]
+
+
+@router.get("/downloads/users", response_model=list[DailyDownloadsOut])
+async def user_activity(
+    user_id: Optional[int] = None,
+    days: int = Query(
+        DOWNLOAD_STATS_DEFAULT_DAYS, ge=1, le=DOWNLOAD_STATS_MAX_DAYS
+    ),
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Скачивания пользователя по дням за последние days дней.
+
+    Права те же, что у /stats/usage.
+    """
+    target = await _resolve_target(session, current_user, user_id)
+    q = (
+        select(
+            DownloadUserDaily.day,
+            DownloadUserDaily.downloads,
+            DownloadUserDaily.bytes,
+        )
+        .where(
+            DownloadUserDaily.user_id == target.id,
+            DownloadUserDaily.day >= _since(days),
+        )
+        .order_by(DownloadUserDaily.day)
+    )
+    rows = (await session.execute(q)).all()
+    return [DailyDownloadsOut(**row._mapping) for row in rows]
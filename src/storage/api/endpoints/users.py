@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from storage.api.schemas.user import UpdateUserRole, UserCreate, UserOut
-from storage.core.constants import (EMAIL_ALREADY_EXISTS, ERR_FORBIDDEN,
-                                    ERR_NOT_FOUND)
+from storage.api.schemas.user import (BulkUserReport, BulkUserResult,
+                                      BulkUserStatus, UpdateUserRole,
+                                      UserCreate, UserOut, UserPage)
+from storage.core.constants import (BULK_IMPORT_CHUNK_SIZE,
+                                    BULK_IMPORT_MAX_ROWS, DEFAULT_PAGE_SIZE,
+                                    EMAIL_ALREADY_EXISTS, ERR_FORBIDDEN,
+                                    ERR_IMPORT_FORMAT,
+                                    ERR_IMPORT_TOO_MANY_ROWS, ERR_NOT_FOUND,
+                                    MAX_PAGE_SIZE, MIME_CSV, MIME_NDJSON)
 from storage.core.db import get_session
+from storage.core.pagination import decode_cursor, encode_cursor
 from storage.core.security import get_current_user, get_password_hash
 from storage.db.models.user import User, UserRole
+from storage.services.bulk_import import hash_passwords, iter_records
 
 router = APIRouter()
 
@@ -26,6 +37,27 @@ def _is_manager(u: User) -> bool:
     return u.role == UserRole.MANAGER
 
 
+def _resolve_role_and_department(
+    payload: UserCreate, current_user: User
+) -> tuple[UserRole, int | None]:
+    """
+    Роль и отдел создаваемого пользователя с учётом ограничений MANAGER.
+    """
+    role = payload.role or UserRole.USER
+    department_id = (
+        payload.department_id
+        if payload.department_id is not None
+        else current_user.department_id
+    )
+    if _is_manager(current_user):
+        if role == UserRole.ADMIN:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
+            )
+        department_id = current_user.department_id
+    return role, department_id
+
+
 @router.post("/", response_model=UserOut, status_code=status.HTTP_201_CREATED)
 async def create_user(
     payload: UserCreate,
@@ -49,18 +81,7 @@ async def create_user(
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail=EMAIL_ALREADY_EXISTS
         )
-    role = payload.role or UserRole.USER
-    department_id = (
-        payload.department_id
-        if payload.department_id is not None
-        else current_user.department_id
-    )
-    if _is_manager(current_user):
-        if role == UserRole.ADMIN:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
-            )
-        department_id = current_user.department_id
+    role, department_id = _resolve_role_and_department(payload, current_user)
     user = User(
         email=payload.email,
         hashed_password=get_password_hash(payload.password),
@@ -145,8 +166,11 @@ async def update_user_role(
     return user
 
 
-@router.get("/", response_model=list[UserOut])
+@router.get("/", response_model=UserPage)
 async def list_department_users(
+    email_prefix: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     session: AsyncSession = Depends(get_session),
     current_user=Depends(get_current_user),
 ):
@@ -154,23 +178,196 @@ async def list_department_users(
     Список пользователей.
 
     ADMIN видит всех, MANAGER — только свой отдел.
+    Поддерживается фильтр по началу email и пагинация по курсору.
     """
     if not (_is_admin(current_user) or _is_manager(current_user)):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
         )
-    if _is_admin(current_user):
-        rows = (await session.execute(select(User))).scalars().all()
-        return rows
+    q = select(User)
+    if not _is_admin(current_user):
+        q = q.where(User.department_id == current_user.department_id)
+    if email_prefix:
+        q = q.where(User.email.startswith(email_prefix, autoescape=True))
+    if cursor is not None:
+        (last_id,) = decode_cursor(cursor, 1)
+        q = q.where(User.id > last_id)
     rows = (
-        (
-            await session.execute(
-                select(User).where(
-                    User.department_id == current_user.department_id
-                )
-            )
-        )
+        (await session.execute(q.order_by(User.id).limit(limit)))
         .scalars()
         .all()
     )
-    return rows
+    next_cursor = encode_cursor(rows[-1].id) if len(rows) == limit else None
+    return UserPage(items=rows, next_cursor=next_cursor)
+
+
+async def _import_chunk(
+    session: AsyncSession,
+    chunk: list[tuple[int, UserCreate]],
+    current_user: User,
+    seen: set[str],
+) -> list[BulkUserResult]:
+    """
+    Импорт пачки строк: проверка прав и дублей, хэширование, вставка.
+
+    Конфликты email проверяются одним запросом на пачку; вставка идёт
+    одним INSERT ... ON CONFLICT DO NOTHING, поэтому гонка с параллельным
+    созданием тоже даёт конфликт, а не ошибку.
+    """
+    results: dict[int, BulkUserResult] = {}
+    pending: list[tuple[int, UserCreate, UserRole, int | None]] = []
+    for row, payload in chunk:
+        if payload.email in seen:
+            results[row] = BulkUserResult(
+                row=row,
+                email=payload.email,
+                status=BulkUserStatus.CONFLICT,
+                detail=EMAIL_ALREADY_EXISTS,
+            )
+            continue
+        seen.add(payload.email)
+        try:
+            role, department_id = _resolve_role_and_department(
+                payload, current_user
+            )
+        except HTTPException as e:
+            results[row] = BulkUserResult(
+                row=row,
+                email=payload.email,
+                status=BulkUserStatus.FORBIDDEN,
+                detail=e.detail,
+            )
+            continue
+        pending.append((row, payload, role, department_id))
+    existing = set()
+    if pending:
+        existing = set(
+            (
+                await session.execute(
+                    select(User.email).where(
+                        User.email.in_([p.email for _, p, _, _ in pending])
+                    )
+                )
+            ).scalars()
+        )
+    to_insert = [item for item in pending if item[1].email not in existing]
+    hashes = await hash_passwords([p.password for _, p, _, _ in to_insert])
+    created = {}
+    if to_insert:
+        created = dict(
+            (
+                await session.execute(
+                    insert(User)
+                    .values(
+                        [
+                            {
+                                "email": p.email,
+                                "hashed_password": hashed,
+                                "role": role,
+                                "department_id": department_id,
+                                "is_active": p.is_active,
+                            }
+                            for (_, p, role, department_id), hashed in zip(
+                                to_insert, hashes
+                            )
+                        ]
+                    )
+                    .on_conflict_do_nothing(index_elements=[User.email])
+                    .returning(User.email, User.id)
+                )
+            ).all()
+        )
+        await session.commit()
+    for row, payload, _, _ in pending:
+        user_id = created.get(payload.email)
+        results[row] = BulkUserResult(
+            row=row,
+            email=payload.email,
+            status=(
+                BulkUserStatus.CREATED
+                if user_id is not None
+                else BulkUserStatus.CONFLICT
+            ),
+            id=user_id,
+            detail=None if user_id is not None else EMAIL_ALREADY_EXISTS,
+        )
+    return [results[row] for row, _ in chunk]
+
+
+@router.post("/bulk", response_model=BulkUserReport)
+async def bulk_create_users(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Массовое создание пользователей из CSV или NDJSON.
+
+    Тело запроса читается потоково: text/csv с заголовком
+    (email,password,role,department_id,is_active) или
+    application/x-ndjson с объектом на строку. Ограничения MANAGER
+    те же, что при создании одного пользователя. Возвращает
+    результат по каждой строке. После BULK_IMPORT_MAX_ROWS строк
+    чтение прекращается: уже обработанные строки остаются в отчёте,
+    первая лишняя отмечается REJECTED, а отчёт — truncated.
+    """
+    if not (_is_admin(current_user) or _is_manager(current_user)):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=ERR_FORBIDDEN
+        )
+    content_type = request.headers.get("content-type", "")
+    if content_type.split(";")[0].strip() not in {MIME_CSV, MIME_NDJSON}:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=ERR_IMPORT_FORMAT,
+        )
+    results: list[BulkUserResult] = []
+    chunk: list[tuple[int, UserCreate]] = []
+    seen: set[str] = set()
+    row = 0
+    truncated = False
+    async for record in iter_records(request.stream(), content_type):
+        row += 1
+        if row > BULK_IMPORT_MAX_ROWS:
+            # Предыдущие пачки уже сохранены, поэтому вместо ошибки
+            # возвращается отчёт по ним
+            results.append(
+                BulkUserResult(
+                    row=row,
+                    status=BulkUserStatus.REJECTED,
+                    detail=ERR_IMPORT_TOO_MANY_ROWS,
+                )
+            )
+            truncated = True
+            break
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            chunk.append((row, UserCreate.model_validate(record)))
+        except ValueError as e:
+            results.append(
+                BulkUserResult(
+                    row=row,
+                    email=(
+                        record.get("email")
+                        if isinstance(record, dict)
+                        else None
+                    ),
+                    status=BulkUserStatus.INVALID,
+                    detail=str(e),
+                )
+            )
+            continue
+        if len(chunk) >= BULK_IMPORT_CHUNK_SIZE:
+            results += await _import_chunk(
+                session, chunk, current_user, seen
+            )
+            chunk = []
+    if chunk:
+        results += await _import_chunk(session, chunk, current_user, seen)
+    results.sort(key=lambda r: r.row)
+    return BulkUserReport(
+        created=sum(r.status == BulkUserStatus.CREATED for r in results),
+        truncated=truncated,
+        results=results,
+    )
@@ -1,8 +1,11 @@
 from fastapi import APIRouter
 
-from storage.api.endpoints import auth_router, files_router, users_router
+from storage.api.endpoints import (admin_router, auth_router, files_router,
+                                   stats_router, users_router)
 
 api_router = APIRouter()
 api_router.include_router(auth_router, prefix="/auth", tags=["Auth"])
 api_router.include_router(files_router, prefix="/files", tags=["Files"])
 api_router.include_router(users_router, prefix="/users", tags=["Users"])
+api_router.include_router(stats_router, prefix="/stats", tags=["Stats"])
+api_router.include_router(admin_router, prefix="/admin", tags=["Admin"])
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class AuditEventOut(BaseModel):
+    id: int
+    occurred_at: datetime
+    user_id: int
+    file_id: int
+    action: str
+
+
+class AuditPage(BaseModel):
+    items: list[AuditEventOut]
+    next_cursor: str | None = None
+
+
+class AuditBufferOut(BaseModel):
+    pending: int
+    flushed: int
+    dropped: int
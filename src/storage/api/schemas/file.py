@@ -0,0 +1,46 @@
+from datetime import date
+
+from pydantic import BaseModel, Field, model_validator
+
+from storage.core.constants import (ERR_VERSION_SOURCE, FILE_INFO_BATCH_MAX,
+                                    FILENAME_MAX_LENGTH, Visibility)
+
+
+class FileMetadataFilter(BaseModel):
+    """Типизированные фильтры списка файлов по извлечённым метаданным."""
+
+    content_type: str | None = None
+    author: str | None = None
+    title: str | None = None
+    pages_min: int | None = Field(default=None, ge=0)
+    pages_max: int | None = Field(default=None, ge=0)
+    created_from: date | None = None
+    created_to: date | None = None
+
+
+class FileCopyIn(BaseModel):
+    """Параметры копирования файла: новая видимость и имя."""
+
+    visibility: Visibility
+    filename: str | None = Field(
+        default=None, min_length=1, max_length=FILENAME_MAX_LENGTH
+    )
+
+
+class FileVersionIn(BaseModel):
+    """Источник новой версии: другой файл или предыдущая версия."""
+
+    source_file_id: int | None = None
+    version: int | None = Field(default=None, ge=1)
+
+    @model_validator(mode="after")
+    def _one_source(self):
+        if (self.source_file_id is None) == (self.version is None):
+            raise ValueError(ERR_VERSION_SOURCE)
+        return self
+
+
+class FileInfoBatchIn(BaseModel):
+    """Id файлов для пакетного получения информации."""
+
+    ids: list[int] = Field(min_length=1, max_length=FILE_INFO_BATCH_MAX)
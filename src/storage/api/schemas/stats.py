@@ -0,0 +1,32 @@
+from datetime import date
+
+from pydantic import BaseModel
+
+
+class UsageOut(BaseModel):
+    scope_id: int
+    bytes_used: int
+    files_count: int
+    quota_bytes: int | None = None
+
+
+class UsageReport(BaseModel):
+    user: UsageOut
+    department: UsageOut | None = None
+
+
+class TopFileOut(BaseModel):
+    file_id: int
+    filename: str
+    downloads: int
+    bytes: int
+
+
+class DailyDownloadsOut(BaseModel):
+    day: date
+    downloads: int
+    bytes: int
+
+
+class DepartmentTrendOut(DailyDownloadsOut):
+    department_id: int
@@ -1,3 +1,5 @@
+import enum
+
 from pydantic import BaseModel, EmailStr
 
 from storage.db.models.user import UserRole
@@ -24,3 +26,30 @@ class UserCreate(BaseModel):
 
 class UpdateUserRole(BaseModel):
     role: UserRole
+
+
+class UserPage(BaseModel):
+    items: list[UserOut]
+    next_cursor: str | None = None
+
+
+class BulkUserStatus(str, enum.Enum):
+    CREATED = "CREATED"
+    CONFLICT = "CONFLICT"
+    FORBIDDEN = "FORBIDDEN"
+    INVALID = "INVALID"
+    REJECTED = "REJECTED"
+
+
+class BulkUserResult(BaseModel):
+    row: int
+    email: str | None = None
+    status: BulkUserStatus
+    id: int | None = None
+    detail: str | None = None
+
+
+class BulkUserReport(BaseModel):
+    created: int
+    truncated: bool = False
+    results: list[BulkUserResult]
@@ -9,9 +9,27 @@ class Settings(BaseSettings):
     Используется для настройки:
     - Названия проекта и ключа безопасности
     - JWT (алгоритм и время жизни токена)
-    - Подключения к базе данных
-    - Брокера и бекенда Celery
-    - Хранилища MinIO (endpoint, ключи доступа, bucket)
+    - Подключения к базе данных (размер пула соединений на процесс)
+    - Брокера и бекенда Celery, Redis для ключей идемпотентности
+    - Хранилища MinIO (endpoint, ключи доступа, bucket) и дополнительных
+      шардов: MINIO_SHARDS — JSON-список {name, endpoint, bucket,
+      access_key, secret_key}, MINIO_RING — шарды для новых объектов,
+      MINIO_DEPARTMENT_SHARDS — закрепление отделов за шардами,
+      MINIO_POOL_SIZE — соединений на endpoint
+    - Квоты на хранение (лимит отдела, None — без ограничений)
+    - Сжатия объектов в хранилище (zstd)
+    - Срока хранения удалённых файлов до окончательной очистки
+    - Срока хранения сырых событий скачиваний и журнала доступа к файлам
+    - Хранения старых версий файлов (сколько оставлять на файл и сколько
+      дней, None — без ограничения по возрасту)
+    - Шины уведомлений о файлах (redis или local)
+    - Профилирования запросов (включение, доля сэмплируемых запросов,
+      порог медленного запроса в миллисекундах)
+    - Допуска передач (local или redis, бюджет байт, скорость узла)
+    - Production-сервера (storage.scripts.serve): адрес, число воркеров
+      (None — по числу CPU и памяти: SERVER_MEMORY_BUDGET_MB или лимит
+      cgroup по SERVER_WORKER_MEMORY_MB на воркер), перезапуск воркера
+      после SERVER_MAX_REQUESTS запросов, загрузка приложения до fork
     """
 
     PROJECT_NAME: str
@@ -21,15 +39,44 @@ class Settings(BaseSettings):
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     DATABASE_URL: str
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
     CELERY_BROKER_URL: str
     CELERY_RESULT_BACKEND: str
+    REDIS_URL: str | None = None
     MINIO_ENDPOINT: str
     MINIO_ROOT_USER: str
     MINIO_ROOT_PASSWORD: str
     MINIO_BUCKET_NAME: str
+    MINIO_SHARDS: list[dict[str, str]] = []
+    MINIO_RING: list[str] | None = None
+    MINIO_DEPARTMENT_SHARDS: dict[int, str] = {}
+    MINIO_POOL_SIZE: int = 10
     ADMIN_EMAIL: str
     ADMIN_PASSWORD: str
     ADMIN_DEPARTMENT_ID: int
+    DEPARTMENT_QUOTA_MB: int | None = None
+    STORAGE_COMPRESSION: bool = False
+    DELETED_RETENTION_HOURS: int = 72
+    DOWNLOAD_EVENTS_RETENTION_DAYS: int = 90
+    AUDIT_EVENTS_RETENTION_DAYS: int = 365
+    FILE_VERSIONS_KEEP: int = 10
+    FILE_VERSIONS_RETENTION_DAYS: int | None = 90
+    EVENTS_BACKEND: str = "redis"
+    PROFILING_ENABLED: bool = False
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_SLOW_MS: int = 1000
+    ADMISSION_BACKEND: str = "local"
+    ADMISSION_MAX_INFLIGHT_MB: int = 1024
+    ADMISSION_NODE_BANDWIDTH_MBPS: int | None = None
+    SERVER_BIND: str = "0.0.0.0:8000"
+    SERVER_WORKERS: int | None = None
+    SERVER_WORKER_MEMORY_MB: int = 256
+    SERVER_MEMORY_BUDGET_MB: int | None = None
+    SERVER_MAX_REQUESTS: int = 10_000
+    SERVER_MAX_REQUESTS_JITTER: int = 1_000
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_PRELOAD: bool = True
 
     model_config = SettingsConfigDict(env_file=".env", extra="allow")
 
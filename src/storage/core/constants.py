@@ -24,6 +24,14 @@ OBJECT_KEY_RANDOM_BYTES = 8
 DOWNLOADS_INCREMENT = 1
 STREAM_CHUNK_SIZE = 64 * 1024
 
+# ======================
+# Пагинация
+# ======================
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Сколько файлов можно запросить одним POST /files/info:batch
+FILE_INFO_BATCH_MAX = MAX_PAGE_SIZE
+
 # ======================
 # Аутентификация
 # ======================
@@ -40,6 +48,15 @@ ERR_FILE_TOO_LARGE = "Файл слишком большой для данной
 ERR_TYPE_NOT_ALLOWED = "Тип файла не разрешён для данной роли"
 ERR_VISIBILITY_NOT_ALLOWED = "Уровень видимости не разрешён для данной роли"
 EMAIL_ALREADY_EXISTS = "Пользователь с таким email уже существует"
+ERR_INVALID_CURSOR = "Некорректный курсор пагинации"
+ERR_QUOTA_EXCEEDED = "Превышена квота на хранение"
+ERR_UPLOAD_CORRUPTED = "Файл повреждён при сохранении, повторите загрузку"
+ERR_TOO_MANY_TRANSFERS = "Слишком много одновременных передач"
+ERR_IMPORT_FORMAT = "Ожидается text/csv или application/x-ndjson"
+ERR_IMPORT_TOO_MANY_ROWS = "Слишком много строк в одном импорте"
+ERR_VERSION_SOURCE = "Укажите ровно один источник: source_file_id или version"
+ERR_RESTORE_EXPIRED = "Срок восстановления файла истёк"
+ERR_PREVIEW_NOT_READY = "Предпросмотр для файла ещё не готов или недоступен"
 
 # ======================
 # MIME-типы документов
@@ -48,6 +65,32 @@ MIME_PDF = "application/pdf"
 MIME_DOC = "application/msword"
 MIME_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document" # noqa
 DOC_TYPES = {MIME_DOC, MIME_DOCX}
+MIME_CSV = "text/csv"
+MIME_NDJSON = "application/x-ndjson"
+MIME_TEXT_UTF8 = "text/plain; charset=utf-8"
+
+# ======================
+# Выгрузка списка файлов
+# ======================
+EXPORT_FORMAT_NDJSON = "ndjson"
+EXPORT_FORMAT_CSV = "csv"
+EXPORT_FORMATS = {
+    EXPORT_FORMAT_NDJSON: MIME_NDJSON,
+    EXPORT_FORMAT_CSV: MIME_CSV,
+}
+# Строк за одну выборку из серверного курсора и один кусок ответа
+EXPORT_BATCH_SIZE = 5000
+
+# ======================
+# Предпросмотр текста
+# ======================
+# Ключ текста в результате извлекателя; в metadata он не сохраняется
+PREVIEW_META_KEY = "preview"
+# Текст лежит в шарде по умолчанию под этим префиксом + object_key
+PREVIEW_KEY_PREFIX = "previews/"
+PREVIEW_MAX_PAGES = 3
+PREVIEW_MAX_PARAGRAPHS = 50
+PREVIEW_MAX_CHARS = 20_000
 
 # ======================
 # Ограничения по ролям
@@ -58,6 +101,27 @@ ROLE_MAX_SIZE_MB = {
     Role.ADMIN: 100,
 }
 
+# Квота на суммарный объём файлов пользователя, None — без ограничений
+ROLE_QUOTA_MB = {
+    Role.USER: 1024,
+    Role.MANAGER: 10 * 1024,
+    Role.ADMIN: None,
+}
+
+# Одновременные загрузки и скачивания одного пользователя
+ROLE_MAX_TRANSFERS = {
+    Role.USER: 4,
+    Role.MANAGER: 8,
+    Role.ADMIN: 16,
+}
+
+# Скорость передачи одного пользователя, None — без ограничений
+ROLE_BANDWIDTH_MBPS = {
+    Role.USER: 10,
+    Role.MANAGER: 50,
+    Role.ADMIN: None,
+}
+
 ROLE_ALLOWED_TYPES = {
     Role.USER: {MIME_PDF},
     Role.MANAGER: {MIME_PDF, MIME_DOC, MIME_DOCX},
@@ -78,10 +142,241 @@ ROLE_ALLOWED_VISIBILITY = {
     },
 }
 
+# ======================
+# Учёт занятого места
+# ======================
+BACKFILL_BATCH_SIZE = 500
+BACKFILL_CONCURRENCY = 16
+
+# ======================
+# Изолированное извлечение метаданных
+# ======================
+# Увеличивается при изменении извлекателей, чтобы перезапуск
+# обновил только устаревшие записи
+EXTRACTOR_VERSION = 3
+EXTRACT_TIMEOUT_SECONDS = 60
+EXTRACT_CPU_SECONDS = 30
+EXTRACT_MAX_RSS_MB = 512
+EXTRACT_MAX_JOBS_PER_WORKER = 100
+EXTRACT_POOL_SIZE = 1
+EXTRACT_ERROR_TIMEOUT = "timeout"
+EXTRACT_ERROR_CRASHED = "crashed"
+EXTRACT_ERROR_FAILED = "failed"
+REEXTRACT_BATCH_SIZE = 200
+REEXTRACT_IO_CONCURRENCY = 16
+REEXTRACT_CHECKPOINT = ".reextract_checkpoint.json"
+
+# ======================
+# Допуск передач
+# ======================
+ADMISSION_KEY_PREFIX = "admission:"
+ADMISSION_LEASE_TTL_SECONDS = 60
+ADMISSION_LEASE_RENEW_SECONDS = 20
+ADMISSION_RETRY_AFTER_SECONDS = 1
+
+# ======================
+# Сжатие объектов
+# ======================
+CODEC_ZSTD = "zstd"
+CODEC_MAX_LENGTH = 16
+COMPRESSION_LEVEL = 3
+COMPRESSION_SAMPLE_SIZE = 64 * 1024
+COMPRESSION_MIN_RATIO = 1.2
+# Минимальный размер части multipart-загрузки при неизвестной длине
+UPLOAD_PART_SIZE = 5 * BYTES_IN_MB
+
+# ======================
+# Полнотекстовый поиск
+# ======================
+SEARCH_TS_CONFIG = "simple"
+SEARCH_QUERY_MIN_LENGTH = 2
+SEARCH_QUERY_MAX_LENGTH = 256
+SEARCH_TEXT_MAX_LENGTH = 100_000
+SEARCH_FILENAME_WEIGHT = "A"
+SEARCH_TEXT_KEY = "text"
+SEARCH_META_WEIGHTS = {
+    "title": "B",
+    "author": "C",
+    SEARCH_TEXT_KEY: "D",
+}
+
 # ======================
 # Celery
 # ======================
 CELERY_TASK_EXTRACT_METADATA = "extract_metadata_task"
+CELERY_TASK_PURGE_DELETED = "purge_deleted_files_task"
+CELERY_TASK_ROLLUP_DOWNLOADS = "rollup_downloads_task"
+CELERY_TASK_AUDIT_PARTITIONS = "audit_partitions_task"
+CELERY_TASK_PRUNE_VERSIONS = "prune_file_versions_task"
+
+# Очереди: мелкие и крупные документы обрабатываются разными воркерами
+QUEUE_METADATA_SMALL = "metadata_small"
+QUEUE_METADATA_LARGE = "metadata_large"
+QUEUE_MAINTENANCE = "maintenance"
+# Порог размера, после которого документ уходит в очередь крупных
+METADATA_LARGE_BYTES = {
+    MIME_PDF: 2 * BYTES_IN_MB,
+}
+METADATA_LARGE_BYTES_DEFAULT = 8 * BYTES_IN_MB
+
+# Приоритеты Redis-брокера: 0 — наивысший
+PRIORITY_STEPS = list(range(10))
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 9
+
+# Время, за которое брокер вернёт неподтверждённую задачу в очередь
+TASK_VISIBILITY_TIMEOUT = 60 * 60
+IDEMPOTENCY_KEY_PREFIX = "idempotency:"
+
+# ======================
+# Очистка удалённых файлов
+# ======================
+# Ограничение S3 на число ключей в одном multi-object delete
+PURGE_BATCH_SIZE = 1000
+PURGE_INTERVAL_SECONDS = 300
+
+# ======================
+# Версии файлов
+# ======================
+FIRST_FILE_VERSION = 1
+VERSIONS_PRUNE_BATCH_SIZE = 1000
+VERSIONS_PRUNE_INTERVAL_SECONDS = 3600
+
+# ======================
+# Сверка хранилища с БД
+# ======================
+RECONCILE_BATCH_SIZE = 1000
+RECONCILE_GRACE_MINUTES = 60
+
+# ======================
+# Профилирование запросов
+# ======================
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+PROFILE_REASON_HEADER = "header"
+PROFILE_REASON_SAMPLED = "sampled"
+PROFILE_REASON_SLOW = "slow"
+# Профили хранятся в памяти процесса, старые вытесняются
+PROFILE_RING_SIZE = 100
+PROFILE_SAMPLE_INTERVAL_SECONDS = 0.005
+PROFILE_SQL_MAX_LENGTH = 200
+
+# ======================
+# Уведомления о файлах
+# ======================
+MIME_EVENT_STREAM = "text/event-stream"
+FILE_EVENTS_CHANNEL = "file_events"
+FILE_EVENT_METADATA_READY = "metadata_ready"
+FILE_EVENT_METADATA_FAILED = "metadata_failed"
+FILE_EVENT_DELETED = "deleted"
+# Очередь одного подключения: медленный клиент теряет старые события
+FILE_EVENTS_QUEUE_SIZE = 16
+# Комментарий-пинг не даёт прокси закрыть простаивающее соединение
+FILE_EVENTS_HEARTBEAT_SECONDS = 25
+FILE_EVENTS_RECONNECT_SECONDS = 1
+
+# ======================
+# Контроль целостности
+# ======================
+SCRUB_BATCH_SIZE = 200
+SCRUB_CONCURRENCY = 2
+# Скорость чтения скраббера, чтобы не мешать пользователям
+SCRUB_RATE_MBPS = 20
+# Файл перепроверяется не чаще, чем раз в SCRUB_INTERVAL_DAYS
+SCRUB_INTERVAL_DAYS = 30
+SCRUB_IDLE_SECONDS = 600
+SCRUB_CHECKPOINT = "scrub_checkpoint.json"
+SCRUB_REPORT = "scrub_report.jsonl"
+SCRUB_ERROR_MISSING = "missing"
+SCRUB_ERROR_ETAG = "etag_mismatch"
+SCRUB_ERROR_SIZE = "size_mismatch"
+SCRUB_ERROR_CHECKSUM = "checksum_mismatch"
+SCRUB_ERROR_STORAGE = "storage_error"
+
+# ======================
+# Шардирование хранилища
+# ======================
+# Настройки HTTP-клиента MinIO по умолчанию
+MINIO_HTTP_TIMEOUT_SECONDS = 5 * 60
+MINIO_HTTP_RETRIES = 5
+DEFAULT_SHARD = "default"
+SHARD_VIRTUAL_NODES = 128
+REBALANCE_BATCH_SIZE = 500
+REBALANCE_CONCURRENCY = 8
+# Старая копия удаляется с задержкой, чтобы чтения, начатые
+# до переключения записи на новый шард, успели завершиться
+REBALANCE_DELETE_DELAY_SECONDS = 60
+
+# ======================
+# Перенос и резервное копирование
+# ======================
+MIRROR_BATCH_SIZE = 500
+MIRROR_CONCURRENCY = 16
+MIRROR_CHECKPOINT = "mirror_checkpoint.json"
+MIRROR_REPORT = "mirror_report.jsonl"
+# Объекты для tar буферизуются в памяти до этого размера, дальше — на диске
+MIRROR_SPOOL_BYTES = 8 * BYTES_IN_MB
+MIRROR_ERROR_MISSING = "missing"
+MIRROR_ERROR_SIZE = "size_mismatch"
+MIRROR_ERROR_CHECKSUM = "checksum_mismatch"
+MIRROR_ERROR_ETAG = "etag_mismatch"
+# Ключ выходит за пределы каталога-приёмника
+MIRROR_ERROR_KEY = "unsafe_key"
+
+# ======================
+# Аналитика скачиваний
+# ======================
+DOWNLOAD_EVENTS_TABLE = "download_events"
+DOWNLOAD_EVENT_COLUMNS = (
+    "occurred_at",
+    "file_id",
+    "user_id",
+    "department_id",
+    "bytes",
+)
+# Буфер событий в процессе: сброс по размеру или по таймеру
+DOWNLOAD_BUFFER_FLUSH_SIZE = 1000
+DOWNLOAD_BUFFER_MAX_SIZE = 100_000
+DOWNLOAD_FLUSH_INTERVAL_SECONDS = 5
+# Свёртка пересчитывает последние дни целиком, подхватывая
+# события, сброшенные с опозданием
+DOWNLOAD_ROLLUP_INTERVAL_SECONDS = 300
+DOWNLOAD_ROLLUP_LOOKBACK_DAYS = 2
+# Сколько месячных секций создаётся заранее
+DOWNLOAD_PARTITIONS_AHEAD = 1
+NO_DEPARTMENT = 0
+DOWNLOAD_STATS_DEFAULT_DAYS = 7
+DOWNLOAD_STATS_MAX_DAYS = 366
+DOWNLOAD_TOP_DEFAULT_LIMIT = 10
+DOWNLOAD_TOP_MAX_LIMIT = 100
+
+# ======================
+# Журнал доступа к файлам
+# ======================
+AUDIT_EVENTS_TABLE = "audit_events"
+AUDIT_EVENT_COLUMNS = ("occurred_at", "user_id", "file_id", "action")
+AUDIT_ACTION_READ = "read"
+AUDIT_ACTION_DOWNLOAD = "download"
+AUDIT_ACTION_DELETE = "delete"
+AUDIT_ACTIONS = (AUDIT_ACTION_READ, AUDIT_ACTION_DOWNLOAD, AUDIT_ACTION_DELETE)
+AUDIT_ACTION_MAX_LENGTH = 16
+AUDIT_BUFFER_FLUSH_SIZE = 1000
+AUDIT_BUFFER_MAX_SIZE = 100_000
+AUDIT_FLUSH_INTERVAL_SECONDS = 2
+AUDIT_PARTITIONS_AHEAD = 1
+AUDIT_PARTITIONS_INTERVAL_SECONDS = 24 * 60 * 60
+
+# ======================
+# Production-сервер
+# ======================
+# Асинхронному воркеру достаточно одного процесса на ядро
+SERVER_WORKERS_PER_CPU = 1
+SERVER_TIMEOUT_SECONDS = 60
+SERVER_KEEPALIVE_SECONDS = 5
+# Пульс воркеров в tmpfs: запись на overlayfs контейнера может залипать
+SERVER_WORKER_TMP_DIR = "/dev/shm"
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_MEMORY_MAX = "/sys/fs/cgroup/memory.max"
 
 # ======================
 # Ограничения моделей
@@ -89,8 +384,14 @@ CELERY_TASK_EXTRACT_METADATA = "extract_metadata_task"
 # Файлы
 FILENAME_MAX_LENGTH = 512
 OBJECT_KEY_MAX_LENGTH = 1024
+CONTENT_TYPE_MAX_LENGTH = 255
+SHARD_NAME_MAX_LENGTH = 64
+SHA256_HEX_LENGTH = 64
+ETAG_MAX_LENGTH = 80
 DEFAULT_DOWNLOADS_COUNT = 0
 
 # Пользователи
 EMAIL_MAX_LENGTH = 255
 PASSWORD_HASH_MAX_LENGTH = 255
+BULK_IMPORT_CHUNK_SIZE = 500
+BULK_IMPORT_MAX_ROWS = 10_000
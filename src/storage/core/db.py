@@ -1,5 +1,7 @@
-from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
-                                    create_async_engine)
+from typing import Any
+
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    async_sessionmaker, create_async_engine)
 from sqlalchemy.orm import DeclarativeBase
 
 from storage.core.config import settings
@@ -9,10 +11,49 @@ class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(settings.DATABASE_URL, future=True, echo=False)
-async_session_maker = async_sessionmaker(
-    engine, expire_on_commit=False, class_=AsyncSession
-)
+_engine: AsyncEngine | None = None
+_session_maker: async_sessionmaker[AsyncSession] | None = None
+_engine_options: dict[str, Any] = {}
+
+
+def configure_engine(**options: Any) -> None:
+    """
+    Параметры пула create_async_engine для этого процесса вместо
+    DATABASE_POOL_SIZE и DATABASE_MAX_OVERFLOW.
+
+    Вызывается до первого обращения к БД, например воркером Celery,
+    которому нужен NullPool.
+    """
+    if _engine is not None:
+        raise RuntimeError("database engine is already created")
+    _engine_options.update(options)
+
+
+def get_engine() -> AsyncEngine:
+    """
+    Движок БД процесса, создаваемый при первом обращении.
+
+    Создание при импорте отдало бы соединения пула процессу, который
+    загрузил приложение до fork, и все воркеры делили бы их сокеты.
+    """
+    global _engine, _session_maker
+    if _engine is None:
+        options = _engine_options or {
+            "pool_size": settings.DATABASE_POOL_SIZE,
+            "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        }
+        _engine = create_async_engine(
+            settings.DATABASE_URL, future=True, echo=False, **options
+        )
+        _session_maker = async_sessionmaker(
+            _engine, expire_on_commit=False, class_=AsyncSession
+        )
+    return _engine
+
+
+def async_session_maker() -> AsyncSession:
+    get_engine()
+    return _session_maker()
 
 
 async def get_session() -> AsyncSession:
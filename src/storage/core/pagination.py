@@ -0,0 +1,35 @@
+import base64
+import json
+from typing import Any
+
+from fastapi import HTTPException, status
+
+from storage.core.constants import ERR_INVALID_CURSOR
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Кодирование ключа последней строки страницы в непрозрачный курсор.
+    """
+    raw = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list[Any]:
+    """
+    Декодирование курсора, выданного encode_cursor.
+
+    Проверяет количество значений ключа и при ошибке
+    возвращает клиенту 400 вместо внутренней ошибки.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=ERR_INVALID_CURSOR,
+        )
+    return values
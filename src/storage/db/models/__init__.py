@@ -1,2 +1,5 @@
-from .file import File, FileVisibility
+from .audit import audit_events
+from .download import DownloadFileDaily, DownloadUserDaily, download_events
+from .file import File, FileVersion, FileVisibility
+from .usage import StorageUsage, UsageScope
 from .user import User, UserRole
@@ -0,0 +1,31 @@
+from sqlalchemy import (BigInteger, Column, DateTime, Index, Integer, Sequence,
+                        String, Table)
+
+from storage.core.constants import AUDIT_ACTION_MAX_LENGTH, AUDIT_EVENTS_TABLE
+from storage.core.db import Base
+
+audit_events_id_seq = Sequence(f"{AUDIT_EVENTS_TABLE}_id_seq")
+
+# Журнал чтения, скачивания и удаления файлов. Как и download_events,
+# секционирован по месяцам и пишется только через COPY; записи
+# не изменяются. id из последовательности нужен для пагинации:
+# у секционированной таблицы не может быть identity-колонки.
+audit_events = Table(
+    AUDIT_EVENTS_TABLE,
+    Base.metadata,
+    Column(
+        "id",
+        BigInteger,
+        audit_events_id_seq,
+        server_default=audit_events_id_seq.next_value(),
+        nullable=False,
+    ),
+    Column("occurred_at", DateTime(timezone=True), nullable=False),
+    Column("user_id", Integer, nullable=False),
+    Column("file_id", Integer, nullable=False),
+    Column("action", String(AUDIT_ACTION_MAX_LENGTH), nullable=False),
+    Index("ix_audit_events_occurred_at_id", "occurred_at", "id"),
+    Index("ix_audit_events_user_id_occurred_at", "user_id", "occurred_at"),
+    Index("ix_audit_events_file_id_occurred_at", "file_id", "occurred_at"),
+    postgresql_partition_by="RANGE (occurred_at)",
+)
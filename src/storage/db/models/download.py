@@ -0,0 +1,61 @@
+from datetime import date
+
+from sqlalchemy import (BigInteger, Column, Date, DateTime, Index, Integer,
+                        Table)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from storage.core.constants import DOWNLOAD_EVENTS_TABLE
+from storage.core.db import Base
+
+# Сырые события скачиваний. Таблица секционирована по месяцам
+# и пишется только через COPY, поэтому объявлена без ORM-класса
+# и без первичного ключа.
+download_events = Table(
+    DOWNLOAD_EVENTS_TABLE,
+    Base.metadata,
+    Column("occurred_at", DateTime(timezone=True), nullable=False),
+    Column("file_id", Integer, nullable=False),
+    Column("user_id", Integer, nullable=False),
+    Column("department_id", Integer, nullable=True),
+    Column("bytes", BigInteger, nullable=False),
+    postgresql_partition_by="RANGE (occurred_at)",
+)
+
+
+class DownloadFileDaily(Base):
+    """Скачивания файла за день по отделам скачавших.
+
+    Пересчитывается из download_events периодической задачей;
+    пользователи без отдела учитываются с department_id = 0.
+    """
+
+    __tablename__ = "download_file_daily"
+    __table_args__ = (
+        Index("ix_download_file_daily_department_day", "department_id", "day"),
+    )
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    file_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    department_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    downloads: Mapped[int] = mapped_column(Integer, nullable=False)
+    bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class DownloadUserDaily(Base):
+    """Скачивания пользователя за день.
+
+    Служит и для активности пользователя, и для динамики по отделам:
+    строк в ней на порядки меньше, чем в download_file_daily.
+    """
+
+    __tablename__ = "download_user_daily"
+    __table_args__ = (
+        Index("ix_download_user_daily_user_day", "user_id", "day"),
+        Index("ix_download_user_daily_department_day", "department_id", "day"),
+    )
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    department_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    downloads: Mapped[int] = mapped_column(Integer, nullable=False)
+    bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
@@ -1,10 +1,17 @@
 import enum
+from datetime import datetime
 
-from sqlalchemy import JSON, Enum, ForeignKey, Integer, String
+from sqlalchemy import (BigInteger, Computed, DateTime, Enum, ForeignKey,
+                        Index, Integer, String, Text, UniqueConstraint, func,
+                        text)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from storage.core.constants import (DEFAULT_DOWNLOADS_COUNT,
-                                    FILENAME_MAX_LENGTH, OBJECT_KEY_MAX_LENGTH)
+from storage.core.constants import (CODEC_MAX_LENGTH, CONTENT_TYPE_MAX_LENGTH,
+                                    DEFAULT_DOWNLOADS_COUNT, DEFAULT_SHARD,
+                                    ETAG_MAX_LENGTH, FILENAME_MAX_LENGTH,
+                                    FIRST_FILE_VERSION, OBJECT_KEY_MAX_LENGTH,
+                                    SHA256_HEX_LENGTH, SHARD_NAME_MAX_LENGTH)
 from storage.core.db import Base
 
 
@@ -20,10 +27,49 @@ class File(Base):
     """Модель файла в системе хранения.
 
     Содержит информацию о загруженных файлах, их владельце,
-    уровне видимости, метаданных и счётчике скачиваний.
+    уровне видимости, размере, метаданных и счётчике скачиваний.
+    shard — шард хранилища, в котором лежит объект.
+    Строка всегда описывает последнюю версию содержимого (version),
+    предыдущие версии хранятся в file_versions.
+    sha256 — контрольная сумма исходного содержимого, etag — ETag
+    объекта в S3; verified_at и corrupted_at заполняет скраббер.
+    Удалённые файлы помечаются deleted_at и очищаются фоновой задачей.
     """
 
     __tablename__ = "files"
+    __table_args__ = (
+        Index(
+            "ix_files_search_vector", "search_vector", postgresql_using="gin"
+        ),
+        Index(
+            "ix_files_filename_trgm",
+            "filename",
+            postgresql_using="gin",
+            postgresql_ops={"filename": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_files_metadata",
+            "metadata",
+            postgresql_using="gin",
+            postgresql_ops={"metadata": "jsonb_path_ops"},
+        ),
+        Index(
+            "ix_files_live_owner_id",
+            "owner_id",
+            "id",
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        Index(
+            "ix_files_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+        ),
+        Index(
+            "ix_files_corrupted_at",
+            "corrupted_at",
+            postgresql_where=text("corrupted_at IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     filename: Mapped[str] = mapped_column(
@@ -32,17 +78,125 @@ class File(Base):
     object_key: Mapped[str] = mapped_column(
         String(OBJECT_KEY_MAX_LENGTH), unique=True, nullable=False
     )
+    shard: Mapped[str] = mapped_column(
+        String(SHARD_NAME_MAX_LENGTH),
+        default=DEFAULT_SHARD,
+        server_default=DEFAULT_SHARD,
+        nullable=False,
+    )
     owner_id: Mapped[int] = mapped_column(
         ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False
     )
     visibility: Mapped[FileVisibility] = mapped_column(
         Enum(FileVisibility), nullable=False
     )
+    size_bytes: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    codec: Mapped[str | None] = mapped_column(
+        String(CODEC_MAX_LENGTH), nullable=True
+    )
+    content_type: Mapped[str | None] = mapped_column(
+        String(CONTENT_TYPE_MAX_LENGTH), index=True, nullable=True
+    )
+    sha256: Mapped[str | None] = mapped_column(
+        String(SHA256_HEX_LENGTH), nullable=True
+    )
+    etag: Mapped[str | None] = mapped_column(
+        String(ETAG_MAX_LENGTH), nullable=True
+    )
+    verified_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    corrupted_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
     metadata_: Mapped[dict | None] = mapped_column(
-        "metadata", JSON, nullable=True
+        "metadata", JSONB, nullable=True
+    )
+    meta_pages: Mapped[int | None] = mapped_column(
+        Integer,
+        Computed(
+            "CASE WHEN metadata->>'pages' ~ '^[0-9]+$' "
+            "THEN (metadata->>'pages')::integer END",
+            persisted=True,
+        ),
+        index=True,
+    )
+    meta_author: Mapped[str | None] = mapped_column(
+        Text, Computed("metadata->>'author'", persisted=True), index=True
+    )
+    meta_title: Mapped[str | None] = mapped_column(
+        Text, Computed("metadata->>'title'", persisted=True), index=True
+    )
+    meta_created: Mapped[str | None] = mapped_column(
+        Text, Computed("metadata->>'created'", persisted=True), index=True
     )
     downloads_count: Mapped[int] = mapped_column(
         Integer, default=DEFAULT_DOWNLOADS_COUNT, nullable=False
     )
+    version: Mapped[int] = mapped_column(
+        Integer,
+        default=FIRST_FILE_VERSION,
+        server_default=str(FIRST_FILE_VERSION),
+        nullable=False,
+    )
+    deleted_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR, nullable=True, deferred=True
+    )
 
     owner: Mapped["User"] = relationship(backref="files")  # noqa
+
+
+class FileVersion(Base):
+    """Предыдущая версия содержимого файла.
+
+    Строка создаётся, когда у файла публикуется новая версия:
+    в неё переносятся объект и метаданные, которые до этого
+    были в files. Старые версии удаляются фоновой задачей
+    по политике FILE_VERSIONS_KEEP и FILE_VERSIONS_RETENTION_DAYS.
+    """
+
+    __tablename__ = "file_versions"
+    __table_args__ = (
+        UniqueConstraint("file_id", "version", name="uq_file_versions"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    file_id: Mapped[int] = mapped_column(
+        ForeignKey("files.id", ondelete="CASCADE"), nullable=False
+    )
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    object_key: Mapped[str] = mapped_column(
+        String(OBJECT_KEY_MAX_LENGTH), unique=True, nullable=False
+    )
+    shard: Mapped[str] = mapped_column(
+        String(SHARD_NAME_MAX_LENGTH), nullable=False
+    )
+    size_bytes: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    codec: Mapped[str | None] = mapped_column(
+        String(CODEC_MAX_LENGTH), nullable=True
+    )
+    content_type: Mapped[str | None] = mapped_column(
+        String(CONTENT_TYPE_MAX_LENGTH), nullable=True
+    )
+    sha256: Mapped[str | None] = mapped_column(
+        String(SHA256_HEX_LENGTH), nullable=True
+    )
+    etag: Mapped[str | None] = mapped_column(
+        String(ETAG_MAX_LENGTH), nullable=True
+    )
+    metadata_: Mapped[dict | None] = mapped_column(
+        "metadata", JSONB, nullable=True
+    )
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+# Побайтовый порядок ключей совпадает с порядком листинга S3
+Index("ix_files_object_key_c", File.object_key.collate("C"))
+Index(
+    "ix_file_versions_object_key_c", FileVersion.object_key.collate("C")
+)
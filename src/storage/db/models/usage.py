@@ -0,0 +1,34 @@
+import enum
+
+from sqlalchemy import BigInteger, Enum, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from storage.core.db import Base
+
+
+class UsageScope(str, enum.Enum):
+    """Уровень агрегирования занятого места."""
+
+    USER = "USER"
+    DEPARTMENT = "DEPARTMENT"
+
+
+class StorageUsage(Base):
+    """Счётчик занятого места пользователя или отдела.
+
+    Обновляется в той же транзакции, что и запись о файле,
+    поэтому чтение квоты не требует агрегирования по files.
+    """
+
+    __tablename__ = "storage_usage"
+
+    scope: Mapped[UsageScope] = mapped_column(
+        Enum(UsageScope), primary_key=True
+    )
+    scope_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bytes_used: Mapped[int] = mapped_column(
+        BigInteger, default=0, nullable=False
+    )
+    files_count: Mapped[int] = mapped_column(
+        Integer, default=0, nullable=False
+    )
@@ -1,6 +1,6 @@
 import enum
 
-from sqlalchemy import Boolean, Enum, Integer, String
+from sqlalchemy import Boolean, Enum, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from storage.core.constants import EMAIL_MAX_LENGTH, PASSWORD_HASH_MAX_LENGTH
@@ -23,6 +23,13 @@ class User(Base):
     """
 
     __tablename__ = "users"
+    __table_args__ = (
+        Index(
+            "ix_users_email_pattern",
+            "email",
+            postgresql_ops={"email": "varchar_pattern_ops"},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     email: Mapped[str] = mapped_column(
@@ -1,12 +1,36 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from storage.api.routers import api_router
 from storage.core.config import settings
+from storage.services import analytics, audit
+from storage.services.profiling import ProfilingMiddleware, install_sql_hooks
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    flushers = [
+        asyncio.create_task(analytics.run_flusher()),
+        asyncio.create_task(audit.run_flusher()),
+    ]
+    yield
+    # При отмене каждый цикл сбрасывает остаток своего буфера
+    for flusher in flushers:
+        flusher.cancel()
+    await asyncio.gather(*flushers, return_exceptions=True)
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.DESCRIPTION,
     version=settings.VERSION,
+    lifespan=lifespan,
 )
 
+if settings.PROFILING_ENABLED:
+    install_sql_hooks()
+    app.add_middleware(ProfilingMiddleware)
+
 app.include_router(api_router)
@@ -0,0 +1,70 @@
+import asyncio
+
+from minio.error import S3Error
+from sqlalchemy import select, update
+
+from storage.core.constants import BACKFILL_BATCH_SIZE, BACKFILL_CONCURRENCY
+from storage.core.db import async_session_maker
+from storage.db.models.file import File
+from storage.services.s3 import get_shard
+from storage.services.usage import rebuild_usage
+
+
+async def _stat_size(
+    semaphore: asyncio.Semaphore, object_key: str, shard_name: str
+):
+    shard = get_shard(shard_name)
+    async with semaphore:
+        try:
+            stat = await asyncio.to_thread(
+                shard.client.stat_object, shard.bucket, object_key
+            )
+        except S3Error:
+            return None
+        return stat.size
+
+
+async def main():
+    """
+    Заполнение size_bytes для файлов, загруженных до учёта размера.
+
+    Обходит files пачками по id, запрашивает stat_object с ограниченной
+    параллельностью и затем пересчитывает счётчики занятого места.
+    """
+    semaphore = asyncio.Semaphore(BACKFILL_CONCURRENCY)
+    last_id = 0
+    while True:
+        async with async_session_maker() as session:
+            rows = (
+                await session.execute(
+                    select(File.id, File.object_key, File.shard)
+                    .where(File.size_bytes.is_(None), File.id > last_id)
+                    .order_by(File.id)
+                    .limit(BACKFILL_BATCH_SIZE)
+                )
+            ).all()
+            if not rows:
+                break
+            sizes = await asyncio.gather(
+                *(
+                    _stat_size(semaphore, row.object_key, row.shard)
+                    for row in rows
+                )
+            )
+            values = [
+                {"id": row.id, "size_bytes": size}
+                for row, size in zip(rows, sizes)
+                if size is not None
+            ]
+            if values:
+                await session.execute(update(File), values)
+                await session.commit()
+            last_id = rows[-1].id
+
+    async with async_session_maker() as session:
+        await rebuild_usage(session)
+        await session.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
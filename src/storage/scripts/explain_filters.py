@@ -0,0 +1,77 @@
+import asyncio
+import json
+import sys
+from datetime import date
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from storage.api.schemas.file import FileMetadataFilter
+from storage.core.db import async_session_maker
+from storage.db.models.file import File
+from storage.services.search import apply_metadata_filters
+
+# Фильтр списка файлов и индекс, которым он должен обслуживаться
+CASES = (
+    (FileMetadataFilter(author="author"), "ix_files_meta_author"),
+    (FileMetadataFilter(title="title"), "ix_files_meta_title"),
+    (FileMetadataFilter(pages_min=100), "ix_files_meta_pages"),
+    (
+        FileMetadataFilter(pages_min=10, pages_max=20),
+        "ix_files_meta_pages",
+    ),
+    (
+        FileMetadataFilter(
+            created_from=date(2020, 1, 1), created_to=date(2020, 12, 31)
+        ),
+        "ix_files_meta_created",
+    ),
+)
+
+
+def _index_names(plan: dict) -> set[str]:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", ()):
+        names |= _index_names(child)
+    return names
+
+
+async def main():
+    """
+    Проверка, что фильтры по метаданным списка файлов используют
+    свои индексы.
+
+    Для каждого фильтра выполняется EXPLAIN запроса, собранного
+    apply_metadata_filters, с выключенным последовательным
+    сканированием: на маленькой таблице планировщик и так выбрал бы
+    его, а здесь важно, что предикат вообще может идти по индексу.
+    Завершается с кодом 1, если хоть один план индекс не использует.
+    """
+    failed = 0
+    async with async_session_maker() as session:
+        await session.execute(text("SET enable_seqscan = off"))
+        for filters, index in CASES:
+            query = apply_metadata_filters(select(File.id), filters)
+            sql = query.compile(
+                dialect=postgresql.dialect(),
+                compile_kwargs={"literal_binds": True},
+            )
+            plan = (
+                await session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+            ).scalar_one()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            used = _index_names(plan[0]["Plan"])
+            ok = index in used
+            failed += not ok
+            print(
+                f"{'ok' if ok else 'FAIL'} "
+                f"{filters.model_dump(exclude_none=True)}: "
+                f"{', '.join(sorted(used)) or 'no index'}"
+            )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import time
+
+from minio.commonconfig import CopySource
+from minio.error import S3Error
+from sqlalchemy import select, tuple_, update
+
+from storage.core.constants import (REBALANCE_BATCH_SIZE,
+                                    REBALANCE_CONCURRENCY,
+                                    REBALANCE_DELETE_DELAY_SECONDS)
+from storage.core.db import async_session_maker
+from storage.db.models.file import File
+from storage.db.models.user import User
+from storage.services.purge import remove_objects
+from storage.services.s3 import Shard, ensure_bucket, get_shard, place
+
+
+def _copy_object(object_key: str, source: Shard, target: Shard) -> bool:
+    """
+    Копирование объекта между шардами; False, если исходного нет.
+
+    В пределах одного endpoint'а копия делается на стороне сервера,
+    между кластерами объект передаётся потоком через этот процесс.
+    """
+    ensure_bucket(target)
+    try:
+        if (source.endpoint, source.access_key) == (
+            target.endpoint,
+            target.access_key,
+        ):
+            target.client.copy_object(
+                target.bucket,
+                object_key,
+                CopySource(source.bucket, object_key),
+            )
+            return True
+        stat = source.client.stat_object(source.bucket, object_key)
+        response = source.client.get_object(source.bucket, object_key)
+    except S3Error as e:
+        if e.code == "NoSuchKey":
+            return False
+        raise
+    try:
+        target.client.put_object(
+            target.bucket,
+            object_key,
+            response,
+            length=stat.size,
+            content_type=stat.content_type,
+        )
+    finally:
+        response.close()
+        response.release_conn()
+    return True
+
+
+async def _flush_deletes(pending: list, force: bool = False) -> None:
+    """
+    Удаление старых копий, чья задержка уже истекла.
+    """
+    while pending and (force or pending[0][0] <= time.monotonic()):
+        deadline, shard_name, keys = pending.pop(0)
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await asyncio.to_thread(remove_objects, keys, shard_name)
+
+
+async def rebalance(
+    batch: int = REBALANCE_BATCH_SIZE,
+    concurrency: int = REBALANCE_CONCURRENCY,
+    delete_delay: float = REBALANCE_DELETE_DELAY_SECONDS,
+    dry_run: bool = False,
+) -> dict[str, int]:
+    """
+    Перенос объектов в шарды, которые им назначает текущая конфигурация.
+
+    Файлы обходятся пачками по id. Объект сначала копируется
+    в новый шард с ограниченной параллельностью, затем строка
+    переключается на него условным UPDATE, и только спустя
+    delete_delay старая копия удаляется. Поэтому чтения
+    в любой момент переноса находят объект по записанному шарду.
+    Если строку за это время изменили (удалили, перенесли или
+    заменили объект новой версией), удаляется новая копия, а старая
+    остаётся на месте.
+    ETag копии может отличаться от исходного, поэтому он сбрасывается
+    и заново запоминается скраббером.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    report = {"checked": 0, "moved": 0, "missing": 0, "skipped": 0}
+    pending: list[tuple[float, str, list[str]]] = []
+
+    async def _copy(row, target: str) -> bool:
+        async with semaphore:
+            return await asyncio.to_thread(
+                _copy_object,
+                row.object_key,
+                get_shard(row.shard),
+                get_shard(target),
+            )
+
+    last_id = 0
+    while True:
+        async with async_session_maker() as session:
+            rows = (
+                await session.execute(
+                    select(
+                        File.id,
+                        File.object_key,
+                        File.shard,
+                        User.department_id,
+                    )
+                    .join(User, User.id == File.owner_id)
+                    .where(File.id > last_id, File.deleted_at.is_(None))
+                    .order_by(File.id)
+                    .limit(batch)
+                )
+            ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        report["checked"] += len(rows)
+        moves = [
+            (row, target)
+            for row in rows
+            if (target := place(row.object_key, row.department_id))
+            != row.shard
+        ]
+        if dry_run:
+            report["moved"] += len(moves)
+            continue
+        copied = await asyncio.gather(
+            *(_copy(row, target) for row, target in moves)
+        )
+        groups: dict[tuple[str, str], list] = {}
+        for (row, target), ok in zip(moves, copied):
+            if not ok:
+                report["missing"] += 1
+                continue
+            groups.setdefault((row.shard, target), []).append(row)
+        for (source, target), group in groups.items():
+            async with async_session_maker() as session:
+                switched = set(
+                    (
+                        await session.execute(
+                            update(File)
+                            .where(
+                                # Ключ мог смениться новой версией файла:
+                                # тогда в новом шарде нет текущего объекта,
+                                # а старый ключ уже принадлежит версии
+                                tuple_(File.id, File.object_key).in_(
+                                    [(row.id, row.object_key) for row in group]
+                                ),
+                                File.shard == source,
+                                File.deleted_at.is_(None),
+                            )
+                            .values(shard=target, etag=None)
+                            .returning(File.id)
+                            .execution_options(synchronize_session=False)
+                        )
+                    ).scalars()
+                )
+                await session.commit()
+            moved = [r.object_key for r in group if r.id in switched]
+            stale = [r.object_key for r in group if r.id not in switched]
+            report["moved"] += len(moved)
+            report["skipped"] += len(stale)
+            if stale:
+                await asyncio.to_thread(remove_objects, stale, target)
+            if moved:
+                pending.append(
+                    (time.monotonic() + delete_delay, source, moved)
+                )
+        print(f"last_id={last_id} {report}")
+        await _flush_deletes(pending)
+    await _flush_deletes(pending, force=True)
+    return report
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Перенос объектов между шардами хранилища."
+    )
+    parser.add_argument("--batch", type=int, default=REBALANCE_BATCH_SIZE)
+    parser.add_argument(
+        "--concurrency", type=int, default=REBALANCE_CONCURRENCY
+    )
+    parser.add_argument(
+        "--delete-delay",
+        type=float,
+        default=REBALANCE_DELETE_DELAY_SECONDS,
+        help="пауза перед удалением старой копии, секунды",
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    report = await rebalance(
+        batch=args.batch,
+        concurrency=args.concurrency,
+        delete_delay=args.delete_delay,
+        dry_run=args.dry_run,
+    )
+    print(report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
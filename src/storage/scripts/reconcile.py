@@ -0,0 +1,285 @@
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from minio.error import S3Error
+from sqlalchemy import false, null, select, true, union_all
+from sqlalchemy.orm import selectinload
+
+from storage.core.constants import (PREVIEW_KEY_PREFIX, RECONCILE_BATCH_SIZE,
+                                    RECONCILE_GRACE_MINUTES)
+from storage.core.db import async_session_maker
+from storage.db.models.file import File, FileVersion
+from storage.services.purge import remove_objects
+from storage.services.s3 import Shard, get_shards
+from storage.services.usage import add_usage
+from storage.services.versions import versions_size
+
+
+async def _iter_objects(
+    shard: Shard, prefix: str, start_after: str | None, batch: int
+):
+    """
+    Объекты бакета шарда в порядке ключей, подгружаемые пачками в потоке.
+
+    Тексты предпросмотра пропускаются: записей в files у них нет.
+    """
+    objects = shard.client.list_objects(
+        shard.bucket,
+        prefix=prefix or None,
+        recursive=True,
+        start_after=start_after,
+    )
+    while True:
+        chunk = await asyncio.to_thread(list, islice(objects, batch))
+        if not chunk:
+            return
+        for obj in chunk:
+            if not obj.object_name.startswith(PREVIEW_KEY_PREFIX):
+                yield obj
+
+
+async def _iter_rows(
+    shard: Shard, prefix: str, start_after: str | None, batch: int
+):
+    """
+    Строки files и file_versions шарда в побайтовом порядке object_key,
+    как в S3. У строк версий archived = True.
+    """
+    last_key = start_after
+    while True:
+        parts = []
+        for model, deleted_at, archived in (
+            (File, File.deleted_at, false()),
+            (FileVersion, null(), true()),
+        ):
+            key = model.object_key.collate("C")
+            q = select(
+                model.id,
+                model.object_key,
+                deleted_at.label("deleted_at"),
+                archived.label("archived"),
+            ).where(model.shard == shard.name)
+            if prefix:
+                q = q.where(
+                    model.object_key.startswith(prefix, autoescape=True)
+                )
+            if last_key is not None:
+                q = q.where(key > last_key)
+            parts.append(q)
+        rows_q = union_all(*parts).subquery()
+        q = (
+            select(rows_q)
+            .order_by(rows_q.c.object_key.collate("C"))
+            .limit(batch)
+        )
+        async with async_session_maker() as session:
+            rows = (await session.execute(q)).all()
+        if not rows:
+            return
+        for row in rows:
+            yield row
+        last_key = rows[-1].object_key
+
+
+def _object_missing(shard: Shard, object_key: str) -> bool:
+    try:
+        shard.client.stat_object(shard.bucket, object_key)
+    except S3Error as e:
+        return e.code == "NoSuchKey"
+    return False
+
+
+async def _drop_dangling(shard: Shard, rows: list[tuple[int, str]]) -> None:
+    """
+    Пометка удалёнными записей без объекта с освобождением квоты.
+
+    Перед изменением отсутствие объекта перепроверяется: листинг мог
+    начаться раньше, чем объект был загружен.
+    """
+    ids = [
+        file_id
+        for file_id, key in rows
+        if await asyncio.to_thread(_object_missing, shard, key)
+    ]
+    if not ids:
+        return
+    async with async_session_maker() as session:
+        files = (
+            await session.execute(
+                select(File)
+                .options(selectinload(File.owner))
+                .where(File.id.in_(ids), File.deleted_at.is_(None))
+                .with_for_update(of=File)
+            )
+        ).scalars()
+        now = datetime.now(timezone.utc)
+        for f in files:
+            size = (f.size_bytes or 0) + await versions_size(session, f.id)
+            await add_usage(session, f.owner, -size, files=-1)
+            f.deleted_at = now
+        await session.commit()
+
+
+async def _drop_dangling_versions(
+    shard: Shard, rows: list[tuple[int, str]]
+) -> None:
+    """
+    Удаление строк версий без объекта с освобождением квоты.
+    """
+    ids = [
+        version_id
+        for version_id, key in rows
+        if await asyncio.to_thread(_object_missing, shard, key)
+    ]
+    if not ids:
+        return
+    async with async_session_maker() as session:
+        versions = (
+            await session.execute(
+                select(FileVersion, File)
+                .join(File, FileVersion.file_id == File.id)
+                .options(selectinload(File.owner))
+                .where(FileVersion.id.in_(ids))
+                .with_for_update(of=FileVersion)
+            )
+        ).all()
+        for version, f in versions:
+            if f.deleted_at is None:
+                await add_usage(
+                    session, f.owner, -(version.size_bytes or 0), files=0
+                )
+            await session.delete(version)
+        await session.commit()
+
+
+async def reconcile_shard(
+    shard: Shard,
+    prefix: str = "",
+    start_after: str | None = None,
+    grace_minutes: int = RECONCILE_GRACE_MINUTES,
+    repair: bool = False,
+    batch: int = RECONCILE_BATCH_SIZE,
+) -> dict[str, int]:
+    """
+    Сверка объектов шарда MinIO с его записями в files слиянием
+    двух потоков.
+
+    Оба источника читаются пачками в порядке ключей, поэтому память
+    не зависит от числа объектов. Объекты моложе grace_minutes
+    пропускаются: их загрузка может ещё не быть зафиксирована в БД.
+    При repair осиротевшие объекты удаляются, записи без объектов
+    помечаются удалёнными, а такие версии удаляются.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=grace_minutes)
+    report = {"objects": 0, "rows": 0, "orphans": 0, "dangling": 0}
+    orphans: list[str] = []
+    dangling: list[tuple[int, str]] = []
+    dangling_versions: list[tuple[int, str]] = []
+
+    async def _flush(force: bool = False) -> None:
+        if not repair:
+            orphans.clear()
+            dangling.clear()
+            dangling_versions.clear()
+            return
+        if orphans and (force or len(orphans) >= batch):
+            await asyncio.to_thread(
+                remove_objects, list(orphans), shard.name
+            )
+            orphans.clear()
+        if dangling and (force or len(dangling) >= batch):
+            await _drop_dangling(shard, list(dangling))
+            dangling.clear()
+        if dangling_versions and (force or len(dangling_versions) >= batch):
+            await _drop_dangling_versions(shard, list(dangling_versions))
+            dangling_versions.clear()
+
+    objects = _iter_objects(shard, prefix, start_after, batch)
+    rows = _iter_rows(shard, prefix, start_after, batch)
+    obj = await anext(objects, None)
+    row = await anext(rows, None)
+    while obj is not None or row is not None:
+        if row is None or (
+            obj is not None and obj.object_name < row.object_key
+        ):
+            report["objects"] += 1
+            if obj.last_modified is None or obj.last_modified < cutoff:
+                report["orphans"] += 1
+                print(f"orphan object: {shard.name} {obj.object_name}")
+                orphans.append(obj.object_name)
+            obj = await anext(objects, None)
+        elif obj is None or row.object_key < obj.object_name:
+            report["rows"] += 1
+            if row.archived:
+                report["dangling"] += 1
+                print(
+                    f"dangling version: {shard.name} {row.id} "
+                    f"{row.object_key}"
+                )
+                dangling_versions.append((row.id, row.object_key))
+            elif row.deleted_at is None:
+                report["dangling"] += 1
+                print(
+                    f"dangling row: {shard.name} {row.id} {row.object_key}"
+                )
+                dangling.append((row.id, row.object_key))
+            row = await anext(rows, None)
+        else:
+            report["objects"] += 1
+            report["rows"] += 1
+            obj = await anext(objects, None)
+            row = await anext(rows, None)
+        await _flush()
+    await _flush(force=True)
+    return report
+
+
+async def reconcile(
+    shard_names: list[str] | None = None, **kwargs
+) -> dict[str, dict[str, int]]:
+    """
+    Сверка по очереди всех шардов или только перечисленных.
+
+    Объект, лежащий не в том шарде, который записан в строке,
+    считается осиротевшим в своём шарде, а строка — висячей.
+    """
+    shards = get_shards()
+    return {
+        name: await reconcile_shard(shards[name], **kwargs)
+        for name in shard_names or list(shards)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Сверка объектов MinIO с таблицей files."
+    )
+    parser.add_argument(
+        "--shard",
+        action="append",
+        default=None,
+        help="шард для сверки, можно указать несколько раз",
+    )
+    parser.add_argument("--prefix", default="")
+    parser.add_argument("--start-after", default=None)
+    parser.add_argument(
+        "--grace-minutes", type=int, default=RECONCILE_GRACE_MINUTES
+    )
+    parser.add_argument("--batch", type=int, default=RECONCILE_BATCH_SIZE)
+    parser.add_argument("--repair", action="store_true")
+    args = parser.parse_args()
+    report = await reconcile(
+        args.shard,
+        prefix=args.prefix,
+        start_after=args.start_after,
+        grace_minutes=args.grace_minutes,
+        repair=args.repair,
+        batch=args.batch,
+    )
+    print(report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import os
+from pathlib import Path
+
+from minio.error import S3Error
+from sqlalchemy import Text, bindparam, func, or_, select, update
+
+from storage.core.constants import (EXTRACTOR_VERSION, REEXTRACT_BATCH_SIZE,
+                                    REEXTRACT_CHECKPOINT,
+                                    REEXTRACT_IO_CONCURRENCY)
+from storage.core.db import async_session_maker
+from storage.db.models.file import File
+from storage.services.checkpoint import load_checkpoint, save_checkpoint
+from storage.services.compression import decode_bytes
+from storage.services.preview import put_preview, split_preview
+from storage.services.s3 import get_shard
+from storage.services.sandbox import SandboxPool, extract_metadata
+from storage.services.search import search_vector_from_columns
+
+
+def _read_object(
+    object_key: str, codec: str | None, shard_name: str
+) -> bytes | None:
+    shard = get_shard(shard_name)
+    try:
+        response = shard.client.get_object(shard.bucket, object_key)
+    except S3Error:
+        return None
+    try:
+        return decode_bytes(response.read(), codec)
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def _target_filter(content_type: str | None, missing_only: bool):
+    """
+    Условие выбора файлов: без метаданных или с устаревшей версией.
+    """
+    version = func.coalesce(
+        File.metadata_["extractor_version"].as_integer(), 0
+    )
+    q = [File.deleted_at.is_(None)]
+    if missing_only:
+        q.append(File.metadata_.is_(None))
+    else:
+        q.append(or_(File.metadata_.is_(None), version < EXTRACTOR_VERSION))
+    if content_type is not None:
+        q.append(File.content_type == content_type)
+    return q
+
+
+async def _process(
+    rows, pool: SandboxPool, semaphore: asyncio.Semaphore
+) -> list[dict]:
+    async def _one(row):
+        # Слот держится до конца извлечения: иначе при медленном пуле
+        # в памяти копились бы прочитанные объекты всей пачки
+        async with semaphore:
+            data = await asyncio.to_thread(
+                _read_object, row.object_key, row.codec, row.shard
+            )
+            if data is None:
+                return None
+            meta = await asyncio.to_thread(
+                extract_metadata, row.content_type, data, pool
+            )
+            del data
+        text = split_preview(meta)
+        if text:
+            async with semaphore:
+                await asyncio.to_thread(put_preview, row.object_key, text)
+        return {
+            "id": row.id,
+            "object_key": row.object_key,
+            "shard": row.shard,
+            "metadata_": meta,
+            "text": text,
+        }
+
+    results = await asyncio.gather(*(_one(row) for row in rows))
+    return [r for r in results if r is not None]
+
+
+async def reextract(
+    content_type: str | None = None,
+    missing_only: bool = False,
+    batch: int = REEXTRACT_BATCH_SIZE,
+    io_concurrency: int = REEXTRACT_IO_CONCURRENCY,
+    workers: int | None = None,
+    checkpoint: Path = Path(REEXTRACT_CHECKPOINT),
+) -> int:
+    """
+    Повторное извлечение метаданных для существующих файлов.
+
+    Файлы выбираются пачками по id, объекты читаются с ограниченной
+    параллельностью (io_concurrency ограничивает и число объектов
+    в памяти), извлечение идёт в пуле изолированных процессов,
+    результат записывается одним пакетным UPDATE на пачку, тексты
+    предпросмотра — отдельными объектами.
+    Последний обработанный id сохраняется в checkpoint, поэтому
+    прерванный запуск продолжается с того же места.
+    """
+    pool = SandboxPool(size=workers or os.cpu_count() or 1)
+    semaphore = asyncio.Semaphore(io_concurrency)
+    last_id = load_checkpoint(checkpoint)
+    updated = 0
+    try:
+        while True:
+            async with async_session_maker() as session:
+                rows = (
+                    await session.execute(
+                        select(
+                            File.id,
+                            File.object_key,
+                            File.content_type,
+                            File.codec,
+                            File.shard,
+                        )
+                        .where(
+                            File.id > last_id,
+                            *_target_filter(content_type, missing_only),
+                        )
+                        .order_by(File.id)
+                        .limit(batch)
+                    )
+                ).all()
+                if not rows:
+                    break
+                values = await _process(rows, pool, semaphore)
+                if values:
+                    # Строка обновляется, только если её объект не
+                    # сменился за время извлечения (новая версия,
+                    # перенос между шардами)
+                    table = File.__table__
+                    same_object = (
+                        table.c.id == bindparam("row_id"),
+                        table.c.object_key == bindparam("read_key"),
+                        table.c.shard == bindparam("read_shard"),
+                    )
+                    params = [
+                        {
+                            "row_id": v["id"],
+                            "read_key": v["object_key"],
+                            "read_shard": v["shard"],
+                            "new_metadata": v["metadata_"],
+                            "preview_text": v["text"],
+                        }
+                        for v in values
+                    ]
+                    await session.execute(
+                        update(table)
+                        .where(*same_object)
+                        .values(
+                            metadata=bindparam(
+                                "new_metadata", type_=table.c.metadata.type
+                            )
+                        ),
+                        params,
+                    )
+                    # Текст документа есть только в результате
+                    # извлечения, поэтому вектор строится по строке
+                    # с текстом, переданным параметром
+                    await session.execute(
+                        update(table)
+                        .where(*same_object)
+                        .values(
+                            search_vector=search_vector_from_columns(
+                                bindparam("preview_text", type_=Text)
+                            )
+                        ),
+                        params,
+                    )
+                    await session.commit()
+                updated += len(values)
+                last_id = rows[-1].id
+                save_checkpoint(checkpoint, last_id)
+                print(f"last_id={last_id} updated={updated}")
+    finally:
+        pool.close()
+    checkpoint.unlink(missing_ok=True)
+    return updated
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Повторное извлечение метаданных файлов."
+    )
+    parser.add_argument("--content-type", default=None)
+    parser.add_argument(
+        "--missing-only",
+        action="store_true",
+        help="только файлы без метаданных",
+    )
+    parser.add_argument("--batch", type=int, default=REEXTRACT_BATCH_SIZE)
+    parser.add_argument(
+        "--io-concurrency", type=int, default=REEXTRACT_IO_CONCURRENCY
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--checkpoint", type=Path, default=Path(REEXTRACT_CHECKPOINT)
+    )
+    args = parser.parse_args()
+    updated = await reextract(
+        content_type=args.content_type,
+        missing_only=args.missing_only,
+        batch=args.batch,
+        io_concurrency=args.io_concurrency,
+        workers=args.workers,
+        checkpoint=args.checkpoint,
+    )
+    print(f"updated={updated}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
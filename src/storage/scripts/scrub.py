@@ -0,0 +1,226 @@
+import argparse
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from minio.error import S3Error
+from sqlalchemy import bindparam, or_, select, update
+
+from storage.core.constants import (BYTES_IN_MB, SCRUB_BATCH_SIZE,
+                                    SCRUB_CHECKPOINT, SCRUB_CONCURRENCY,
+                                    SCRUB_ERROR_CHECKSUM, SCRUB_ERROR_ETAG,
+                                    SCRUB_ERROR_MISSING, SCRUB_ERROR_SIZE,
+                                    SCRUB_ERROR_STORAGE, SCRUB_IDLE_SECONDS,
+                                    SCRUB_INTERVAL_DAYS, SCRUB_RATE_MBPS,
+                                    SCRUB_REPORT, STREAM_CHUNK_SIZE)
+from storage.core.db import async_session_maker
+from storage.db.models.file import File
+from storage.services.admission import ThrottledReader, TokenBucket
+from storage.services.checkpoint import load_checkpoint, save_checkpoint
+from storage.services.compression import decode_iter
+from storage.services.s3 import get_shard
+
+
+def _check_object(row, bucket: TokenBucket) -> dict:
+    """
+    Проверка одного объекта: ETag и размер по stat, затем SHA-256
+    распакованного содержимого при чтении с ограничением скорости.
+    """
+    shard = get_shard(row.shard)
+    try:
+        stat = shard.client.stat_object(shard.bucket, row.object_key)
+    except S3Error as e:
+        if e.code == "NoSuchKey":
+            return {"error": SCRUB_ERROR_MISSING}
+        raise
+    if row.etag is not None and stat.etag != row.etag:
+        return {"error": SCRUB_ERROR_ETAG, "etag": stat.etag}
+    response = shard.client.get_object(shard.bucket, row.object_key)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        stream = ThrottledReader(response, [bucket])
+        for chunk in decode_iter(stream, row.codec, STREAM_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    finally:
+        response.close()
+        response.release_conn()
+    sha256 = digest.hexdigest()
+    if row.size_bytes is not None and size != row.size_bytes:
+        return {"error": SCRUB_ERROR_SIZE, "etag": stat.etag}
+    if row.sha256 is not None and sha256 != row.sha256:
+        return {"error": SCRUB_ERROR_CHECKSUM, "etag": stat.etag}
+    return {"sha256": sha256, "etag": stat.etag}
+
+
+def _report(
+    path: Path, row, error: str, detail: str | None = None
+) -> None:
+    entry = {
+        "id": row.id,
+        "object_key": row.object_key,
+        "shard": row.shard,
+        "error": error,
+        "checked_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if detail is not None:
+        entry["detail"] = detail
+    print(f"mismatch: {entry}")
+    with path.open("a") as report:
+        report.write(json.dumps(entry) + "\n")
+
+
+async def scrub_pass(
+    batch: int = SCRUB_BATCH_SIZE,
+    concurrency: int = SCRUB_CONCURRENCY,
+    rate_mbps: float = SCRUB_RATE_MBPS,
+    interval_days: int = SCRUB_INTERVAL_DAYS,
+    checkpoint: Path = Path(SCRUB_CHECKPOINT),
+    report: Path = Path(SCRUB_REPORT),
+) -> dict[str, int]:
+    """
+    Один проход проверки целостности по всем живым файлам.
+
+    Проверяются файлы, не проверявшиеся дольше interval_days.
+    Общая скорость чтения ограничена rate_mbps, параллельность —
+    concurrency. Файлы без контрольной суммы получают её при первой
+    проверке. Расхождения записываются в corrupted_at и в report,
+    прогресс — в checkpoint после каждой пачки.
+
+    Ошибки хранилища при проверке объекта попадают в report как
+    storage_error и не прерывают проход; такой файл не отмечается
+    проверенным и будет проверен снова. Строка обновляется, только
+    если её объект не сменился за время проверки.
+    """
+    bucket = TokenBucket(rate_mbps * BYTES_IN_MB)
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"checked": 0, "corrupted": 0, "failed": 0}
+    last_id = load_checkpoint(checkpoint)
+
+    async def _one(row):
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(_check_object, row, bucket)
+            except S3Error as e:
+                return {"failure": f"{e.code}: {e.message}"}
+
+    table = File.__table__
+    stmt = (
+        update(table)
+        .where(
+            table.c.id == bindparam("row_id"),
+            table.c.object_key == bindparam("checked_key"),
+            table.c.shard == bindparam("checked_shard"),
+        )
+        .values(
+            verified_at=bindparam("new_verified_at"),
+            corrupted_at=bindparam("new_corrupted_at"),
+            sha256=bindparam("new_sha256"),
+            etag=bindparam("new_etag"),
+        )
+    )
+
+    while True:
+        now = datetime.now(timezone.utc)
+        async with async_session_maker() as session:
+            rows = (
+                await session.execute(
+                    select(
+                        File.id,
+                        File.object_key,
+                        File.shard,
+                        File.codec,
+                        File.size_bytes,
+                        File.sha256,
+                        File.etag,
+                    )
+                    .where(
+                        File.id > last_id,
+                        File.deleted_at.is_(None),
+                        or_(
+                            File.verified_at.is_(None),
+                            File.verified_at
+                            < now - timedelta(days=interval_days),
+                        ),
+                    )
+                    .order_by(File.id)
+                    .limit(batch)
+                )
+            ).all()
+        if not rows:
+            break
+        results = await asyncio.gather(*(_one(row) for row in rows))
+        values = []
+        for row, result in zip(rows, results):
+            failure = result.get("failure")
+            if failure is not None:
+                _report(report, row, SCRUB_ERROR_STORAGE, failure)
+                stats["failed"] += 1
+                continue
+            error = result.get("error")
+            if error is not None:
+                _report(report, row, error)
+                stats["corrupted"] += 1
+            values.append(
+                {
+                    "row_id": row.id,
+                    "checked_key": row.object_key,
+                    "checked_shard": row.shard,
+                    "new_verified_at": now,
+                    "new_corrupted_at": now if error else None,
+                    "new_sha256": row.sha256 or result.get("sha256"),
+                    "new_etag": row.etag or result.get("etag"),
+                }
+            )
+        if values:
+            async with async_session_maker() as session:
+                await session.execute(stmt, values)
+                await session.commit()
+        stats["checked"] += len(values)
+        last_id = rows[-1].id
+        save_checkpoint(checkpoint, last_id)
+        print(f"last_id={last_id} {stats}")
+    checkpoint.unlink(missing_ok=True)
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Фоновая проверка целостности объектов хранилища."
+    )
+    parser.add_argument("--batch", type=int, default=SCRUB_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=SCRUB_CONCURRENCY)
+    parser.add_argument("--rate-mbps", type=float, default=SCRUB_RATE_MBPS)
+    parser.add_argument(
+        "--interval-days", type=int, default=SCRUB_INTERVAL_DAYS
+    )
+    parser.add_argument(
+        "--checkpoint", type=Path, default=Path(SCRUB_CHECKPOINT)
+    )
+    parser.add_argument("--report", type=Path, default=Path(SCRUB_REPORT))
+    parser.add_argument(
+        "--loop",
+        action="store_true",
+        help="повторять проходы с паузой SCRUB_IDLE_SECONDS",
+    )
+    args = parser.parse_args()
+    while True:
+        stats = await scrub_pass(
+            batch=args.batch,
+            concurrency=args.concurrency,
+            rate_mbps=args.rate_mbps,
+            interval_days=args.interval_days,
+            checkpoint=args.checkpoint,
+            report=args.report,
+        )
+        print(stats)
+        if not args.loop:
+            break
+        await asyncio.sleep(SCRUB_IDLE_SECONDS)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
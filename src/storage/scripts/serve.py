@@ -0,0 +1,146 @@
+import argparse
+import math
+import os
+from pathlib import Path
+
+from gunicorn.app.base import BaseApplication
+from uvicorn_worker import UvicornWorker
+
+from storage.core.config import settings
+from storage.core.constants import (BYTES_IN_MB, CGROUP_CPU_MAX,
+                                    CGROUP_MEMORY_MAX,
+                                    SERVER_KEEPALIVE_SECONDS,
+                                    SERVER_TIMEOUT_SECONDS,
+                                    SERVER_WORKER_TMP_DIR,
+                                    SERVER_WORKERS_PER_CPU)
+
+
+class StorageWorker(UvicornWorker):
+    """Воркер uvicorn с uvloop и httptools вместо автовыбора."""
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+
+class StorageServer(BaseApplication):
+    """
+    Gunicorn как менеджер процессов для воркеров uvicorn.
+
+    Gunicorn перезапускает упавшие воркеры и воркеры, обработавшие
+    max_requests запросов, а по SIGHUP плавно заменяет все воркеры.
+    """
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from storage.main import app
+
+        return app
+
+
+def _read_cgroup(path: str) -> str | None:
+    try:
+        return Path(path).read_text().strip()
+    except OSError:
+        return None
+
+
+def cpu_count() -> int:
+    """
+    Доступные процессу ядра с учётом привязки к CPU и квоты cgroup
+    (docker --cpus); os.cpu_count видит все ядра хоста.
+    """
+    count = len(os.sched_getaffinity(0))
+    quota = _read_cgroup(CGROUP_CPU_MAX)
+    if quota is not None:
+        limit, _, period = quota.partition(" ")
+        if limit != "max":
+            count = min(count, math.ceil(int(limit) / int(period)))
+    return max(count, 1)
+
+
+def memory_budget_mb() -> int | None:
+    """Память для воркеров: SERVER_MEMORY_BUDGET_MB или лимит cgroup."""
+    if settings.SERVER_MEMORY_BUDGET_MB is not None:
+        return settings.SERVER_MEMORY_BUDGET_MB
+    limit = _read_cgroup(CGROUP_MEMORY_MAX)
+    if limit is None or limit == "max":
+        return None
+    return int(limit) // BYTES_IN_MB
+
+
+def worker_count() -> int:
+    """
+    Число воркеров: SERVER_WORKERS либо по числу ядер, но не больше,
+    чем помещается в бюджет памяти по SERVER_WORKER_MEMORY_MB.
+    """
+    if settings.SERVER_WORKERS:
+        return settings.SERVER_WORKERS
+    workers = cpu_count() * SERVER_WORKERS_PER_CPU
+    budget = memory_budget_mb()
+    if budget is not None:
+        workers = min(workers, budget // settings.SERVER_WORKER_MEMORY_MB)
+    return max(workers, 1)
+
+
+def server_options(
+    bind: str, workers: int, preload: bool
+) -> dict[str, object]:
+    options = {
+        "bind": bind,
+        "workers": workers,
+        "worker_class": StorageWorker,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+        "timeout": SERVER_TIMEOUT_SECONDS,
+        "keepalive": SERVER_KEEPALIVE_SECONDS,
+        # Загрузка до fork: воркеры делят страницы кода с мастером
+        # и стартуют быстрее. Безопасно, пока при импорте не
+        # открываются соединения: движок БД и клиенты MinIO и Redis
+        # создаются при первом обращении уже в воркере.
+        "preload_app": preload,
+        "accesslog": "-",
+    }
+    if os.path.isdir(SERVER_WORKER_TMP_DIR):
+        options["worker_tmp_dir"] = SERVER_WORKER_TMP_DIR
+    return options
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Production-запуск API: несколько воркеров uvicorn (uvloop, "
+            "httptools) под управлением gunicorn. SIGHUP — плавный "
+            "перезапуск воркеров, SIGTERM — плавная остановка."
+        )
+    )
+    parser.add_argument("--bind", default=settings.SERVER_BIND)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="по умолчанию SERVER_WORKERS или по числу ядер и памяти",
+    )
+    parser.add_argument(
+        "--no-preload",
+        dest="preload",
+        action="store_false",
+        default=settings.SERVER_PRELOAD,
+        help="загружать приложение в каждом воркере: тогда SIGHUP "
+        "подхватывает и новый код",
+    )
+    args = parser.parse_args()
+    options = server_options(
+        args.bind, args.workers or worker_count(), args.preload
+    )
+    StorageServer(options).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+import weakref
+from typing import BinaryIO, Iterable, Iterator
+
+from fastapi import HTTPException, status
+from redis.asyncio import Redis
+
+from storage.core.config import settings
+from storage.core.constants import (ADMISSION_KEY_PREFIX,
+                                    ADMISSION_LEASE_RENEW_SECONDS,
+                                    ADMISSION_LEASE_TTL_SECONDS,
+                                    ADMISSION_RETRY_AFTER_SECONDS, BYTES_IN_MB,
+                                    ERR_TOO_MANY_TRANSFERS,
+                                    ROLE_BANDWIDTH_MBPS, ROLE_MAX_TRANSFERS,
+                                    Role)
+from storage.db.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class LocalAdmissionBackend:
+    """
+    Счётчики допуска в памяти процесса.
+
+    Подходит для одного воркера и тестов; при нескольких воркерах
+    каждый из них считает лимиты отдельно.
+    """
+
+    def __init__(self):
+        self._leases: dict[str, dict[str, int]] = {}
+
+    async def acquire(
+        self, key: str, lease: str, amount: int, limit: int
+    ) -> bool:
+        leases = self._leases.setdefault(key, {})
+        if sum(leases.values()) + amount > limit:
+            return False
+        leases[lease] = amount
+        return True
+
+    async def renew(self, key: str, lease: str) -> None:
+        pass
+
+    async def release(self, key: str, lease: str) -> None:
+        leases = self._leases.get(key, {})
+        leases.pop(lease, None)
+        if not leases:
+            self._leases.pop(key, None)
+
+
+class RedisAdmissionBackend:
+    """
+    Счётчики допуска в Redis, общие для всех воркеров.
+
+    Каждый слот — отдельная аренда: член ZSET с временем истечения
+    и его объём в парном HASH. Захват одним Lua-скриптом убирает
+    истёкшие аренды, суммирует оставшиеся и добавляет новую.
+    Живой слот продлевает аренду каждые ADMISSION_LEASE_RENEW_SECONDS,
+    поэтому объём слотов упавшего воркера возвращается в бюджет через
+    ADMISSION_LEASE_TTL_SECONDS, даже если ключ постоянно в работе.
+    """
+
+    _ACQUIRE = """
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local ttl = tonumber(ARGV[4])
+    local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now)
+    for _, lease in ipairs(expired) do
+        redis.call('HDEL', KEYS[2], lease)
+    end
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+    local held = 0
+    for _, amount in ipairs(redis.call('HVALS', KEYS[2])) do
+        held = held + tonumber(amount)
+    end
+    if held + tonumber(ARGV[2]) > tonumber(ARGV[3]) then
+        return 0
+    end
+    redis.call('ZADD', KEYS[1], now + ttl, ARGV[1])
+    redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+    redis.call('EXPIRE', KEYS[1], ttl)
+    redis.call('EXPIRE', KEYS[2], ttl)
+    return 1
+    """
+    _RENEW = """
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local ttl = tonumber(ARGV[2])
+    redis.call('ZADD', KEYS[1], 'XX', now + ttl, ARGV[1])
+    redis.call('EXPIRE', KEYS[1], ttl)
+    redis.call('EXPIRE', KEYS[2], ttl)
+    """
+    _RELEASE = """
+    redis.call('ZREM', KEYS[1], ARGV[1])
+    redis.call('HDEL', KEYS[2], ARGV[1])
+    """
+
+    def __init__(self, url: str):
+        self._redis = Redis.from_url(url)
+        self._acquire = self._redis.register_script(self._ACQUIRE)
+        self._renew = self._redis.register_script(self._RENEW)
+        self._release = self._redis.register_script(self._RELEASE)
+
+    @staticmethod
+    def _keys(key: str) -> list[str]:
+        return [
+            f"{ADMISSION_KEY_PREFIX}{key}:leases",
+            f"{ADMISSION_KEY_PREFIX}{key}:amounts",
+        ]
+
+    async def acquire(
+        self, key: str, lease: str, amount: int, limit: int
+    ) -> bool:
+        return bool(
+            await self._acquire(
+                keys=self._keys(key),
+                args=[lease, amount, limit, ADMISSION_LEASE_TTL_SECONDS],
+            )
+        )
+
+    async def renew(self, key: str, lease: str) -> None:
+        await self._renew(
+            keys=self._keys(key), args=[lease, ADMISSION_LEASE_TTL_SECONDS]
+        )
+
+    async def release(self, key: str, lease: str) -> None:
+        await self._release(keys=self._keys(key), args=[lease])
+
+
+class TokenBucket:
+    """
+    Ограничитель скорости передачи в байтах в секунду.
+
+    Допускает «долг»: кусок больше ёмкости проходит сразу,
+    а следующий ждёт, пока долг не будет погашен.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+_backend = None
+_user_buckets: "weakref.WeakValueDictionary[int, TokenBucket]" = (
+    weakref.WeakValueDictionary()
+)
+_node_bucket: TokenBucket | None = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if settings.ADMISSION_BACKEND == "redis":
+            _backend = RedisAdmissionBackend(
+                settings.REDIS_URL or settings.CELERY_BROKER_URL
+            )
+        else:
+            _backend = LocalAdmissionBackend()
+    return _backend
+
+
+def _buckets(user: User) -> list[TokenBucket]:
+    global _node_bucket
+    buckets = []
+    rate = ROLE_BANDWIDTH_MBPS[Role(user.role.value)]
+    if rate is not None:
+        bucket = _user_buckets.get(user.id)
+        if bucket is None:
+            bucket = TokenBucket(rate * BYTES_IN_MB)
+            _user_buckets[user.id] = bucket
+        buckets.append(bucket)
+    if settings.ADMISSION_NODE_BANDWIDTH_MBPS is not None:
+        if _node_bucket is None:
+            _node_bucket = TokenBucket(
+                settings.ADMISSION_NODE_BANDWIDTH_MBPS * BYTES_IN_MB
+            )
+        buckets.append(_node_bucket)
+    return buckets
+
+
+class TransferSlot:
+    """
+    Допуск на одну передачу; release идемпотентен.
+
+    Пока слот не освобождён, фоновая задача продлевает его аренды.
+    """
+
+    def __init__(self, backend, user: User, lease: str, keys: list[str]):
+        self._backend = backend
+        self._lease = lease
+        self._keys = keys
+        self._released = False
+        self.buckets = _buckets(user)
+        self._renewal = asyncio.get_running_loop().create_task(
+            self._keep_alive()
+        )
+
+    async def _keep_alive(self) -> None:
+        while True:
+            await asyncio.sleep(ADMISSION_LEASE_RENEW_SECONDS)
+            for key in self._keys:
+                try:
+                    await self._backend.renew(key, self._lease)
+                except Exception:
+                    logger.exception("admission lease renewal failed")
+
+    async def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._renewal.cancel()
+        for key in self._keys:
+            await self._backend.release(key, self._lease)
+
+    def throttle(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            for bucket in self.buckets:
+                bucket.consume(len(chunk))
+            yield chunk
+
+    def reader(self, stream: BinaryIO) -> BinaryIO:
+        return ThrottledReader(stream, self.buckets)
+
+
+class ThrottledReader:
+    """Поток, чтение из которого ограничено token bucket'ами."""
+
+    def __init__(self, stream: BinaryIO, buckets: list[TokenBucket]):
+        self._stream = stream
+        self._buckets = buckets
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        for bucket in self._buckets:
+            bucket.consume(len(data))
+        return data
+
+
+def _too_many() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=ERR_TOO_MANY_TRANSFERS,
+        headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)},
+    )
+
+
+async def admit(user: User, size: int) -> TransferSlot:
+    """
+    Допуск передачи по лимитам роли и общему бюджету байт в полёте.
+
+    При превышении любого лимита возвращает 429 с Retry-After.
+    Слот нужно освободить через release по окончании передачи.
+    """
+    backend = get_backend()
+    lease = uuid.uuid4().hex
+    user_key = f"user:{user.id}"
+    if not await backend.acquire(
+        user_key, lease, 1, ROLE_MAX_TRANSFERS[Role(user.role.value)]
+    ):
+        raise _too_many()
+    budget = settings.ADMISSION_MAX_INFLIGHT_MB * BYTES_IN_MB
+    if not await backend.acquire("bytes", lease, size, max(budget, size)):
+        await backend.release(user_key, lease)
+        raise _too_many()
+    return TransferSlot(backend, user, lease, [user_key, "bytes"])
@@ -0,0 +1,133 @@
+from datetime import datetime, time, timedelta, timezone
+
+from sqlalchemy import Date, cast, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from storage.core.config import settings
+from storage.core.constants import (DOWNLOAD_BUFFER_FLUSH_SIZE,
+                                    DOWNLOAD_BUFFER_MAX_SIZE,
+                                    DOWNLOAD_EVENT_COLUMNS,
+                                    DOWNLOAD_EVENTS_TABLE,
+                                    DOWNLOAD_FLUSH_INTERVAL_SECONDS,
+                                    DOWNLOAD_PARTITIONS_AHEAD,
+                                    DOWNLOAD_ROLLUP_LOOKBACK_DAYS,
+                                    NO_DEPARTMENT)
+from storage.core.db import async_session_maker
+from storage.db.models.download import (DownloadFileDaily, DownloadUserDaily,
+                                        download_events)
+from storage.db.models.file import File
+from storage.db.models.user import User
+from storage.services.eventlog import EventBuffer
+
+_events = EventBuffer(
+    DOWNLOAD_EVENTS_TABLE,
+    DOWNLOAD_EVENT_COLUMNS,
+    flush_size=DOWNLOAD_BUFFER_FLUSH_SIZE,
+    max_size=DOWNLOAD_BUFFER_MAX_SIZE,
+)
+
+
+def record_download(file: File, user: User) -> None:
+    """
+    Добавление события скачивания в буфер процесса.
+
+    Буфер сбрасывается в БД фоновым циклом или сразу по достижении
+    DOWNLOAD_BUFFER_FLUSH_SIZE событий. Если БД недоступна,
+    сохраняются только последние DOWNLOAD_BUFFER_MAX_SIZE событий.
+    """
+    _events.add(
+        (
+            datetime.now(timezone.utc),
+            file.id,
+            user.id,
+            user.department_id,
+            file.size_bytes or 0,
+        )
+    )
+
+
+async def flush_downloads() -> int:
+    """Сброс буфера событий в download_events одним COPY."""
+    return await _events.flush()
+
+
+async def run_flusher(
+    interval: float = DOWNLOAD_FLUSH_INTERVAL_SECONDS,
+) -> None:
+    """
+    Фоновый цикл сброса буфера; при отмене сбрасывает остаток.
+    """
+    await _events.run(interval)
+
+
+async def rollup_downloads(
+    lookback_days: int = DOWNLOAD_ROLLUP_LOOKBACK_DAYS,
+) -> None:
+    """
+    Пересчёт дневных свёрток за последние lookback_days дней.
+
+    Дни пересчитываются целиком и перезаписываются, поэтому
+    повторный запуск безопасен, а события, сброшенные с опозданием,
+    попадают в свёртку при следующем запуске. Заодно создаются
+    секции на следующие месяцы и удаляются устаревшие.
+    """
+    since = datetime.combine(
+        datetime.now(timezone.utc).date()
+        - timedelta(days=lookback_days - 1),
+        time.min,
+        tzinfo=timezone.utc,
+    )
+    ev = download_events.c
+    day = cast(func.timezone("UTC", ev.occurred_at), Date)
+    department = func.coalesce(ev.department_id, NO_DEPARTMENT)
+    async with async_session_maker() as session:
+        await _events.partitions.ensure(session, DOWNLOAD_PARTITIONS_AHEAD)
+        await _events.partitions.drop_expired(
+            session, settings.DOWNLOAD_EVENTS_RETENTION_DAYS
+        )
+
+        files = insert(DownloadFileDaily).from_select(
+            ["day", "file_id", "department_id", "downloads", "bytes"],
+            select(
+                day,
+                ev.file_id,
+                department,
+                func.count(),
+                func.sum(ev.bytes),
+            )
+            .where(ev.occurred_at >= since)
+            .group_by(day, ev.file_id, department),
+        )
+        await session.execute(
+            files.on_conflict_do_update(
+                index_elements=["day", "file_id", "department_id"],
+                set_={
+                    "downloads": files.excluded.downloads,
+                    "bytes": files.excluded.bytes,
+                },
+            )
+        )
+
+        users = insert(DownloadUserDaily).from_select(
+            ["day", "user_id", "department_id", "downloads", "bytes"],
+            select(
+                day,
+                ev.user_id,
+                func.max(department),
+                func.count(),
+                func.sum(ev.bytes),
+            )
+            .where(ev.occurred_at >= since)
+            .group_by(day, ev.user_id),
+        )
+        await session.execute(
+            users.on_conflict_do_update(
+                index_elements=["day", "user_id"],
+                set_={
+                    "department_id": users.excluded.department_id,
+                    "downloads": users.excluded.downloads,
+                    "bytes": users.excluded.bytes,
+                },
+            )
+        )
+        await session.commit()
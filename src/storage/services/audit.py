@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+
+from storage.core.config import settings
+from storage.core.constants import (AUDIT_BUFFER_FLUSH_SIZE,
+                                    AUDIT_BUFFER_MAX_SIZE, AUDIT_EVENT_COLUMNS,
+                                    AUDIT_EVENTS_TABLE,
+                                    AUDIT_FLUSH_INTERVAL_SECONDS,
+                                    AUDIT_PARTITIONS_AHEAD)
+from storage.core.db import async_session_maker
+from storage.db.models.user import User
+from storage.services.eventlog import EventBuffer
+
+_events = EventBuffer(
+    AUDIT_EVENTS_TABLE,
+    AUDIT_EVENT_COLUMNS,
+    flush_size=AUDIT_BUFFER_FLUSH_SIZE,
+    max_size=AUDIT_BUFFER_MAX_SIZE,
+)
+
+
+def record(action: str, file_id: int, user: User) -> None:
+    """
+    Запись обращения к файлу в журнал доступа.
+
+    Событие только добавляется в буфер процесса; в audit_events
+    оно попадает при следующем сбросе, пачкой через COPY.
+    """
+    _events.add((datetime.now(timezone.utc), user.id, file_id, action))
+
+
+async def run_flusher(
+    interval: float = AUDIT_FLUSH_INTERVAL_SECONDS,
+) -> None:
+    """
+    Фоновый цикл сброса журнала; при отмене сбрасывает остаток.
+    """
+    await _events.run(interval)
+
+
+def buffer_stats() -> dict[str, int]:
+    """
+    Состояние буфера этого процесса: ожидают сброса, записано
+    и потеряно при переполнении с момента запуска.
+    """
+    return _events.stats()
+
+
+async def maintain_partitions() -> list[str]:
+    """
+    Создание секций на следующие месяцы и удаление секций старше
+    AUDIT_EVENTS_RETENTION_DAYS. Возвращает удалённые секции.
+    """
+    async with async_session_maker() as session:
+        await _events.partitions.ensure(session, AUDIT_PARTITIONS_AHEAD)
+        dropped = await _events.partitions.drop_expired(
+            session, settings.AUDIT_EVENTS_RETENTION_DAYS
+        )
+        await session.commit()
+    return dropped
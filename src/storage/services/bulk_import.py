@@ -0,0 +1,96 @@
+import asyncio
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator
+
+from storage.core.constants import MIME_CSV
+from storage.core.security import get_password_hash
+
+_hash_pool: ProcessPoolExecutor | None = None
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor()
+    return _hash_pool
+
+
+async def hash_passwords(passwords: list[str]) -> list[str]:
+    """
+    Хэширование паролей параллельно в пуле процессов.
+
+    bcrypt намеренно медленный, поэтому при массовом импорте
+    хэширование вынесено из цикла событий на все ядра.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_hash_pool()
+    return await asyncio.gather(
+        *(loop.run_in_executor(pool, get_password_hash, p) for p in passwords)
+    )
+
+
+def _decode_line(line: bytes) -> str | ValueError:
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError as e:
+        return ValueError(f"строка не в кодировке UTF-8: {e.reason}")
+
+
+async def _iter_lines(
+    stream: AsyncIterator[bytes],
+) -> AsyncIterator[str | ValueError]:
+    """
+    Строки тела запроса; каждая декодируется отдельно, поэтому
+    байты не в UTF-8 портят только свою строку. Байт перевода
+    строки не встречается внутри многобайтных символов UTF-8.
+    """
+    tail = b""
+    async for chunk in stream:
+        tail += chunk
+        *lines, tail = tail.split(b"\n")
+        for line in lines:
+            yield _decode_line(line)
+    if tail:
+        yield _decode_line(tail)
+
+
+async def iter_records(
+    stream: AsyncIterator[bytes], content_type: str
+) -> AsyncIterator[dict[str, Any] | ValueError]:
+    """
+    Потоковый разбор тела запроса в CSV (с заголовком) или NDJSON.
+
+    Пустые строки пропускаются. Строка, которую не удалось
+    декодировать или разобрать, возвращается как ValueError, чтобы
+    не прерывать весь импорт.
+    Поля CSV с переводами строк внутри кавычек не поддерживаются.
+    """
+    is_csv = content_type.split(";")[0].strip() == MIME_CSV
+    header = None
+    async for line in _iter_lines(stream):
+        if isinstance(line, ValueError):
+            yield line
+            continue
+        if not line.strip():
+            continue
+        if not is_csv:
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield e
+                continue
+            if not isinstance(record, dict):
+                yield ValueError("ожидался JSON-объект")
+                continue
+            yield record
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield ValueError("число полей не совпадает с заголовком")
+            continue
+        yield {k: v for k, v in zip(header, values) if v != ""}
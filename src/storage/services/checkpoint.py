@@ -0,0 +1,16 @@
+import json
+from pathlib import Path
+
+
+def load_checkpoint(path: Path) -> int:
+    """Последний обработанный id из файла контрольной точки или 0."""
+    if not path.exists():
+        return 0
+    return json.loads(path.read_text())["last_id"]
+
+
+def save_checkpoint(path: Path, last_id: int) -> None:
+    """Атомарная запись контрольной точки через временный файл."""
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"last_id": last_id}))
+    tmp.replace(path)
@@ -0,0 +1,91 @@
+from typing import BinaryIO, Callable, Iterator
+
+import zstandard
+
+from storage.core.constants import (CODEC_ZSTD, COMPRESSION_LEVEL,
+                                    COMPRESSION_MIN_RATIO,
+                                    COMPRESSION_SAMPLE_SIZE)
+
+
+def choose_codec(sample: bytes) -> str | None:
+    """
+    Выбор кодека по образцу начала файла.
+
+    Если образец сжимается хуже COMPRESSION_MIN_RATIO (уже сжатые
+    PDF, изображения), файл сохраняется без сжатия.
+    """
+    sample = sample[:COMPRESSION_SAMPLE_SIZE]
+    if not sample:
+        return None
+    compressed = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(
+        sample
+    )
+    if len(sample) / len(compressed) < COMPRESSION_MIN_RATIO:
+        return None
+    return CODEC_ZSTD
+
+
+def encode_stream(data: BinaryIO, codec: str | None) -> BinaryIO:
+    """
+    Поток для put_object, сжимающий данные по мере чтения.
+    """
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).stream_reader(
+            data
+        )
+    return data
+
+
+def decode_iter(
+    stream: BinaryIO, codec: str | None, chunk_size: int
+) -> Iterator[bytes]:
+    """
+    Итератор по распакованным кускам объекта из хранилища.
+    """
+    if codec == CODEC_ZSTD:
+        yield from zstandard.ZstdDecompressor().read_to_iter(
+            stream, read_size=chunk_size, write_size=chunk_size
+        )
+        return
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def decoder(codec: str | None) -> Callable[[bytes], bytes] | None:
+    """
+    Потоковый распаковщик кусков объекта; None, если сжатия нет.
+    """
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdDecompressor().decompressobj().decompress
+    return None
+
+
+def encode_bytes(data: bytes, codec: str | None) -> bytes:
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(
+            data
+        )
+    return data
+
+
+def decode_bytes(data: bytes, codec: str | None) -> bytes:
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+def accepts_encoding(accept_encoding: str | None, codec: str | None) -> bool:
+    """
+    Проверка, может ли клиент принять объект в сжатом виде как есть.
+    """
+    if codec is None or not accept_encoding:
+        return False
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() != codec:
+            continue
+        return params.replace(" ", "").lower() not in {"q=0", "q=0.0"}
+    return False
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from storage.core.db import get_engine
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class MonthlyPartitions:
+    """
+    Месячные секции таблицы, секционированной по RANGE (occurred_at).
+
+    Секции, уже созданные этим процессом, запоминаются, чтобы сброс
+    буфера не выполнял DDL на каждую пачку.
+    """
+
+    def __init__(self, table: str):
+        self.table = table
+        self._ready: set[date] = set()
+
+    def name(self, month: date) -> str:
+        return f"{self.table}_p{month:%Y%m}"
+
+    async def create(
+        self, conn: AsyncConnection | AsyncSession, month: date
+    ) -> None:
+        await conn.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {self.name(month)} "
+                f"PARTITION OF {self.table} "
+                f"FOR VALUES FROM ('{month} 00:00+00') "
+                f"TO ('{next_month(month)} 00:00+00')"
+            )
+        )
+        self._ready.add(month)
+
+    async def ensure_for(
+        self, conn: AsyncConnection | AsyncSession, moments: Iterable[datetime]
+    ) -> None:
+        """Секции для всех месяцев, в которые попадают moments."""
+        months = {month_start(moment.date()) for moment in moments}
+        for month in months - self._ready:
+            await self.create(conn, month)
+
+    async def ensure(
+        self, conn: AsyncConnection | AsyncSession, ahead: int
+    ) -> None:
+        """Секции на текущий и ahead следующих месяцев."""
+        month = month_start(datetime.now(timezone.utc).date())
+        for _ in range(ahead + 1):
+            await self.create(conn, month)
+            month = next_month(month)
+
+    async def drop_expired(
+        self, session: AsyncSession, retention_days: int
+    ) -> list[str]:
+        """
+        Удаление секций, целиком вышедших за срок хранения.
+        """
+        cutoff = datetime.now(timezone.utc).date() - timedelta(
+            days=retention_days
+        )
+        names = (
+            await session.execute(
+                text(
+                    "SELECT c.relname FROM pg_inherits i "
+                    "JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = CAST(:parent AS regclass)"
+                ),
+                {"parent": self.table},
+            )
+        ).scalars()
+        dropped = []
+        prefix = f"{self.table}_p"
+        for name in names:
+            if not name.startswith(prefix):
+                continue
+            month = datetime.strptime(name[len(prefix):], "%Y%m").date()
+            if next_month(month) <= cutoff:
+                await session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                self._ready.discard(month)
+                dropped.append(name)
+        return dropped
+
+
+class EventBuffer:
+    """
+    Буфер событий процесса с пакетной записью через COPY.
+
+    add только добавляет кортеж в список и не обращается к БД,
+    поэтому почти ничего не добавляет ко времени запроса. Буфер
+    сбрасывается фоновым циклом run или сразу по достижении
+    flush_size событий. Если БД недоступна, хранятся последние
+    max_size событий, вытесненные считаются в dropped.
+    Первым элементом события должно быть occurred_at.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        columns: tuple[str, ...],
+        flush_size: int,
+        max_size: int,
+    ):
+        self.table = table
+        self.columns = columns
+        self.flush_size = flush_size
+        self.max_size = max_size
+        self.partitions = MonthlyPartitions(table)
+        self.flushed = 0
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._events: deque[tuple] = deque(maxlen=max_size)
+        self._flush_tasks: set[asyncio.Task] = set()
+
+    def add(self, event: tuple) -> None:
+        if len(self._events) == self.max_size:
+            # deque вытеснит самое старое событие
+            self.dropped += 1
+        self._events.append(event)
+        if len(self._events) >= self.flush_size and not self._flush_tasks:
+            task = asyncio.get_running_loop().create_task(
+                self._flush_quietly()
+            )
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self) -> int:
+        """
+        Сброс буфера одним COPY; при ошибке события возвращаются
+        в начало буфера.
+        """
+        if not self._events:
+            return 0
+        events = self._events
+        self._events = deque(maxlen=self.max_size)
+        try:
+            async with get_engine().connect() as conn:
+                await self.partitions.ensure_for(
+                    conn, (event[0] for event in events)
+                )
+                await conn.commit()
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(
+                    self.table, records=events, columns=self.columns
+                )
+        except BaseException:
+            self.dropped += max(
+                len(events) + len(self._events) - self.max_size, 0
+            )
+            events.extend(self._events)
+            self._events = events
+            raise
+        self.flushed += len(events)
+        return len(events)
+
+    async def _flush_quietly(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("%s flush failed", self.table)
+        if self.dropped > self._reported_dropped:
+            logger.warning(
+                "%s buffer overflow: %d events dropped",
+                self.table,
+                self.dropped - self._reported_dropped,
+            )
+            self._reported_dropped = self.dropped
+
+    async def run(self, interval: float) -> None:
+        """
+        Фоновый цикл сброса буфера; при отмене сбрасывает остаток.
+        """
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self._flush_quietly()
+        finally:
+            await self._flush_quietly()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self._events),
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+        }
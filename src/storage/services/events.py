@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
+
+from redis.asyncio import Redis
+
+from storage.core.config import settings
+from storage.core.constants import (FILE_EVENTS_CHANNEL,
+                                    FILE_EVENTS_QUEUE_SIZE,
+                                    FILE_EVENTS_RECONNECT_SECONDS)
+from storage.services import idempotency
+
+logger = logging.getLogger(__name__)
+
+
+class _Hub:
+    """
+    Раздача событий подписчикам процесса по id владельца файла.
+
+    На одно соединение приходится одна маленькая очередь; если клиент
+    не успевает читать, самые старые события вытесняются.
+    """
+
+    def __init__(self):
+        self._queues: dict[int, set[asyncio.Queue]] = {}
+
+    def add(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=FILE_EVENTS_QUEUE_SIZE)
+        self._queues.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def remove(self, user_id: int, queue: asyncio.Queue) -> None:
+        queues = self._queues.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._queues[user_id]
+
+    def dispatch(self, event: dict[str, Any]) -> None:
+        for queue in self._queues.get(event["user_id"], ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+class LocalEventBus:
+    """
+    Шина событий внутри процесса для тестов и запуска без Redis.
+
+    События из других процессов (воркеров Celery) сюда не попадают.
+    """
+
+    def __init__(self, hub: _Hub):
+        self._hub = hub
+
+    async def start(self) -> None:
+        pass
+
+    async def publish(self, event: dict[str, Any]) -> None:
+        self._hub.dispatch(event)
+
+    def publish_sync(self, event: dict[str, Any]) -> None:
+        self._hub.dispatch(event)
+
+
+class RedisEventBus:
+    """
+    Шина событий через Redis pub/sub.
+
+    Процесс API держит одну подписку на канал и раздаёт сообщения
+    локальным очередям, поэтому число клиентов не увеличивает
+    число соединений с Redis.
+    """
+
+    def __init__(self, hub: _Hub, url: str):
+        self._hub = hub
+        self._redis = Redis.from_url(url)
+        self._listener: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(FILE_EVENTS_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._hub.dispatch(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await asyncio.sleep(FILE_EVENTS_RECONNECT_SECONDS)
+
+    async def publish(self, event: dict[str, Any]) -> None:
+        await self._redis.publish(FILE_EVENTS_CHANNEL, json.dumps(event))
+
+    def publish_sync(self, event: dict[str, Any]) -> None:
+        idempotency.get_redis().publish(FILE_EVENTS_CHANNEL, json.dumps(event))
+
+
+_hub = _Hub()
+_bus = None
+
+
+def get_bus():
+    global _bus
+    if _bus is None:
+        if settings.EVENTS_BACKEND == "redis":
+            _bus = RedisEventBus(
+                _hub, settings.REDIS_URL or settings.CELERY_BROKER_URL
+            )
+        else:
+            _bus = LocalEventBus(_hub)
+    return _bus
+
+
+def file_event(user_id: int, file_id: int, event: str) -> dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "file_id": file_id,
+        "event": event,
+        "at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+async def publish(user_id: int, file_id: int, event: str) -> None:
+    """
+    Публикация изменения статуса файла из процесса API.
+
+    Уведомления не гарантируются: ошибка шины не должна ломать
+    уже выполненную операцию.
+    """
+    try:
+        await get_bus().publish(file_event(user_id, file_id, event))
+    except Exception:
+        logger.exception("file event publish failed")
+
+
+def publish_sync(user_id: int, file_id: int, event: str) -> None:
+    """Публикация изменения статуса файла из воркера Celery."""
+    try:
+        get_bus().publish_sync(file_event(user_id, file_id, event))
+    except Exception:
+        logger.exception("file event publish failed")
+
+
+@asynccontextmanager
+async def subscribe(user_id: int) -> AsyncIterator[asyncio.Queue]:
+    """
+    Очередь событий по файлам пользователя на время подключения.
+    """
+    await get_bus().start()
+    queue = _hub.add(user_id)
+    try:
+        yield queue
+    finally:
+        _hub.remove(user_id, queue)
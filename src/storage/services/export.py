@@ -0,0 +1,84 @@
+import csv
+import io
+from typing import AsyncIterator
+
+import orjson
+from sqlalchemy import Select, select
+
+from storage.core.constants import EXPORT_BATCH_SIZE, EXPORT_FORMAT_CSV
+from storage.core.db import async_session_maker
+from storage.db.models.file import File
+from storage.db.models.user import User
+
+_COLUMNS = (
+    ("id", File.id),
+    ("filename", File.filename),
+    ("visibility", File.visibility),
+    ("content_type", File.content_type),
+    ("size_bytes", File.size_bytes),
+    ("owner_id", File.owner_id),
+    ("owner_email", User.email),
+    ("department_id", User.department_id),
+    ("downloads_count", File.downloads_count),
+    ("version", File.version),
+    ("sha256", File.sha256),
+    ("metadata", File.metadata_),
+)
+
+
+def export_select() -> Select:
+    """
+    Выборка колонок выгрузки: files, соединённая с владельцем.
+    """
+    return select(*(column.label(name) for name, column in _COLUMNS)).join(
+        User, File.owner_id == User.id
+    )
+
+
+def _encode_ndjson(names: list[str], rows) -> bytes:
+    return b"".join(
+        orjson.dumps(dict(zip(names, row)), option=orjson.OPT_APPEND_NEWLINE)
+        for row in rows
+    )
+
+
+def _encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _csv_rows(rows):
+    # Порядок колонок — как в _COLUMNS: видимость третья,
+    # метаданные последние
+    for row in rows:
+        metadata = row[-1]
+        yield (
+            *row[:2],
+            row[2].value,
+            *row[3:-1],
+            orjson.dumps(metadata).decode() if metadata is not None else None,
+        )
+
+
+async def stream_export(stmt: Select, fmt: str) -> AsyncIterator[bytes]:
+    """
+    Строки выгрузки пачками из серверного курсора.
+
+    Каждая пачка в EXPORT_BATCH_SIZE строк кодируется целиком
+    (NDJSON через orjson или CSV с метаданными в JSON) и отдаётся
+    одним куском, поэтому память не зависит от числа файлов.
+    Сессия открывается на время потока, а не запроса.
+    """
+    async with async_session_maker() as session:
+        result = await session.stream(
+            stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        names = list(result.keys())
+        if fmt == EXPORT_FORMAT_CSV:
+            yield _encode_csv([names])
+        async for rows in result.partitions():
+            if fmt == EXPORT_FORMAT_CSV:
+                yield _encode_csv(_csv_rows(rows))
+            else:
+                yield _encode_ndjson(names, rows)
@@ -0,0 +1,31 @@
+from redis import Redis
+
+from storage.core.config import settings
+from storage.core.constants import IDEMPOTENCY_KEY_PREFIX
+
+_redis: Redis | None = None
+
+
+def get_redis() -> Redis:
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(
+            settings.REDIS_URL or settings.CELERY_BROKER_URL
+        )
+    return _redis
+
+
+def acquire(key: str, ttl: int) -> bool:
+    """
+    Захват ключа идемпотентности; False, если он уже занят.
+
+    TTL ограничивает время жизни ключа, если воркер упал,
+    не успев его освободить.
+    """
+    return bool(
+        get_redis().set(f"{IDEMPOTENCY_KEY_PREFIX}{key}", 1, nx=True, ex=ttl)
+    )
+
+
+def release(key: str) -> None:
+    get_redis().delete(f"{IDEMPOTENCY_KEY_PREFIX}{key}")
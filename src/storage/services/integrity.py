@@ -0,0 +1,76 @@
+import hashlib
+from typing import BinaryIO, Callable
+
+from minio.helpers import get_part_info
+
+
+class ChecksumReader:
+    """
+    Обёртка потока, считающая SHA-256 и размер по мере чтения.
+
+    Если передан decode, хэш считается по распакованным данным,
+    а size — по прочитанным байтам: так сжатый объект из хранилища
+    сверяется с контрольной суммой исходного содержимого.
+    """
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        decode: Callable[[bytes], bytes] | None = None,
+    ):
+        self._stream = stream
+        self._decode = decode
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        if not data:
+            return data
+        self._hash.update(self._decode(data) if self._decode else data)
+        self.size += len(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+class EtagReader:
+    """
+    Обёртка потока, вычисляющая ETag, который S3 вернёт после put_object.
+
+    Для загрузки одной частью ETag — MD5 объекта, для multipart —
+    MD5 от MD5 частей с суффиксом числа частей. Размер части берётся
+    тот же, что выберет клиент MinIO для этих length и part_size.
+    """
+
+    def __init__(self, stream: BinaryIO, length: int, part_size: int = 0):
+        self._stream = stream
+        self._part_size, _ = get_part_info(length, part_size)
+        self._part = hashlib.md5()
+        self._filled = 0
+        self._digests: list[bytes] = []
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self.size += len(data)
+        view = memoryview(data)
+        while view:
+            take = min(len(view), self._part_size - self._filled)
+            self._part.update(view[:take])
+            self._filled += take
+            view = view[take:]
+            if self._filled == self._part_size:
+                self._digests.append(self._part.digest())
+                self._part = hashlib.md5()
+                self._filled = 0
+        return data
+
+    def etag(self) -> str:
+        digests = list(self._digests)
+        if self._filled or not digests:
+            digests.append(self._part.digest())
+        if len(digests) == 1:
+            return digests[0].hex()
+        return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
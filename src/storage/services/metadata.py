@@ -1,25 +1,106 @@
+import re
+from datetime import datetime, timedelta, timezone
 from io import BytesIO
 from typing import Any
 
 from docx import Document
 from PyPDF2 import PdfReader
 
+from storage.core.constants import (MIME_DOC, MIME_DOCX, MIME_PDF,
+                                    PREVIEW_MAX_CHARS, PREVIEW_MAX_PAGES,
+                                    PREVIEW_MAX_PARAGRAPHS, PREVIEW_META_KEY)
+
+_PDF_DATE = re.compile(
+    r"(?:D:)?(\d{4})(\d{2})?(\d{2})?(\d{2})?(\d{2})?(\d{2})?"
+    r"(?:([Zz+-])(?:(\d{2})'?(?:(\d{2})'?)?)?)?"
+)
+
+
+def _pdf_field(info, key: str) -> str | None:
+    """Строковое поле словаря /Info; None, если его нет или оно пустое."""
+    value = info.get(key)
+    if value is None:
+        return None
+    return str(value).strip() or None
+
+
+def _pdf_created(info) -> str | None:
+    """
+    Дата создания PDF из строки вида D:YYYYMMDDHHmmSS+HH'mm'
+    в ISO 8601, чтобы её можно было сравнивать с датами DOCX.
+    Недостающие части даты считаются минимальными, без часового
+    пояса возвращается локальное время. Отсутствующая или
+    нераспознанная дата даёт None.
+    """
+    raw = info.get("/CreationDate")
+    if raw is None:
+        return None
+    match = _PDF_DATE.match(str(raw).strip())
+    if match is None:
+        return None
+    year, month, day, hour, minute, second, sign, tz_hour, tz_minute = (
+        match.groups()
+    )
+    tz = None
+    if sign in ("Z", "z"):
+        tz = timezone.utc
+    elif sign is not None:
+        offset = timedelta(
+            hours=int(tz_hour or 0), minutes=int(tz_minute or 0)
+        )
+        tz = timezone(-offset if sign == "-" else offset)
+    try:
+        created = datetime(
+            int(year),
+            int(month or 1),
+            int(day or 1),
+            int(hour or 0),
+            int(minute or 0),
+            int(second or 0),
+            tzinfo=tz,
+        )
+    except ValueError:
+        return None
+    return created.isoformat()
+
+
+def _preview_text(parts) -> str:
+    """
+    Начало текста документа для предпросмотра, не длиннее
+    PREVIEW_MAX_CHARS; части берутся, пока лимит не набран.
+    """
+    text = []
+    length = 0
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        text.append(part)
+        length += len(part) + 1
+        if length >= PREVIEW_MAX_CHARS:
+            break
+    return "\n".join(text)[:PREVIEW_MAX_CHARS]
+
 
 def extract_pdf_meta(data: bytes) -> dict[str, Any]:
     stream = BytesIO(data)
     reader = PdfReader(stream)
     info = reader.metadata or {}
     pages = len(reader.pages)
-    author = str(info.get("/Author")) if info else None
-    title = str(info.get("/Title")) if info else None
-    producer = str(info.get("/Producer")) if info else None
-    created = str(info.get("/CreationDate")) if info else None
+    author = _pdf_field(info, "/Author") if info else None
+    title = _pdf_field(info, "/Title") if info else None
+    producer = _pdf_field(info, "/Producer") if info else None
+    created = _pdf_created(info) if info else None
     return {
         "pages": pages,
         "author": author,
         "title": title,
         "producer": producer,
         "created": created,
+        PREVIEW_META_KEY: _preview_text(
+            page.extract_text() or ""
+            for page in reader.pages[:PREVIEW_MAX_PAGES]
+        ),
     }
 
 
@@ -32,7 +113,17 @@ def extract_docx_meta(data: bytes) -> dict[str, Any]:
     return {
         "paragraphs": paragraphs,
         "tables": tables,
-        "title": core.title,
-        "author": core.author,
-        "created": str(core.created),
+        "title": core.title or None,
+        "author": core.author or None,
+        "created": core.created.isoformat() if core.created else None,
+        PREVIEW_META_KEY: _preview_text(
+            p.text for p in doc.paragraphs[:PREVIEW_MAX_PARAGRAPHS]
+        ),
     }
+
+
+EXTRACTORS = {
+    MIME_PDF: extract_pdf_meta,
+    MIME_DOC: extract_docx_meta,
+    MIME_DOCX: extract_docx_meta,
+}
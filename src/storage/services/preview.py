@@ -0,0 +1,57 @@
+from io import BytesIO
+from typing import Any
+
+from minio.commonconfig import CopySource
+from minio.error import S3Error
+
+from storage.core.constants import (CODEC_ZSTD, MIME_TEXT_UTF8,
+                                    PREVIEW_KEY_PREFIX, PREVIEW_META_KEY)
+from storage.services.compression import encode_bytes
+from storage.services.s3 import ensure_bucket, get_shard
+
+
+def preview_key(object_key: str) -> str:
+    """
+    Ключ объекта с текстом предпросмотра.
+
+    Все тексты лежат в шарде по умолчанию, поэтому перенос
+    самих файлов между шардами их не затрагивает.
+    """
+    return f"{PREVIEW_KEY_PREFIX}{object_key}"
+
+
+def split_preview(meta: dict[str, Any]) -> str | None:
+    """Извлечение текста предпросмотра из результата извлекателя."""
+    return meta.pop(PREVIEW_META_KEY, None) or None
+
+
+def put_preview(object_key: str, text: str) -> None:
+    """Сохранение текста предпросмотра, сжатого zstd."""
+    data = encode_bytes(text.encode(), CODEC_ZSTD)
+    shard = get_shard()
+    ensure_bucket(shard)
+    shard.client.put_object(
+        shard.bucket,
+        preview_key(object_key),
+        BytesIO(data),
+        len(data),
+        content_type=MIME_TEXT_UTF8,
+    )
+
+
+def copy_preview(source_key: str, object_key: str) -> None:
+    """
+    Копирование предпросмотра вместе с объектом, метаданные которого
+    переносятся без повторного извлечения. Отсутствие текста
+    у исходного объекта не ошибка.
+    """
+    shard = get_shard()
+    try:
+        shard.client.copy_object(
+            shard.bucket,
+            preview_key(object_key),
+            CopySource(shard.bucket, preview_key(source_key)),
+        )
+    except S3Error as e:
+        if e.code != "NoSuchKey":
+            raise
@@ -0,0 +1,355 @@
+import asyncio
+import itertools
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import urllib3
+from jose import JWTError, jwt
+from sqlalchemy import Engine, event, select
+
+from storage.core.config import settings
+from storage.core.constants import (PROFILE_HEADER, PROFILE_ID_HEADER,
+                                    PROFILE_REASON_HEADER,
+                                    PROFILE_REASON_SAMPLED,
+                                    PROFILE_REASON_SLOW, PROFILE_RING_SIZE,
+                                    PROFILE_SAMPLE_INTERVAL_SECONDS,
+                                    PROFILE_SQL_MAX_LENGTH)
+from storage.core.db import async_session_maker
+from storage.db.models.user import User, UserRole
+
+_trace: ContextVar["Trace | None"] = ContextVar("profile_trace", default=None)
+_span: ContextVar[int] = ContextVar("profile_span", default=0)
+_profiles: deque["Trace"] = deque(maxlen=PROFILE_RING_SIZE)
+
+
+class Trace:
+    """
+    Профиль одного запроса: дерево интервалов и статистические сэмплы.
+
+    Интервалы (SQL, MinIO, ручные span) пишутся всегда, пока профиль
+    активен; сэмплы стека — только если профилирование запрошено
+    заголовком или выпало по PROFILE_SAMPLE_RATE.
+    """
+
+    def __init__(self, method: str, path: str, reason: str | None):
+        self.id = secrets.token_hex(8)
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.at = datetime.now(timezone.utc)
+        self.status = 0
+        self.duration_ms = 0.0
+        self.spans: list[tuple[int, int, str, str, float, float]] = []
+        self.samples: Counter[str] = Counter()
+        self._started = time.perf_counter()
+        self._ids = itertools.count(1)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add_span(
+        self,
+        span_id: int,
+        parent_id: int,
+        kind: str,
+        name: str,
+        start: float,
+        end: float,
+    ) -> None:
+        self.spans.append(
+            (
+                span_id,
+                parent_id,
+                kind,
+                name,
+                (start - self._started) * 1000,
+                (end - start) * 1000,
+            )
+        )
+
+    def finish(self, status: int) -> None:
+        self.status = status
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "status": self.status,
+            "at": self.at,
+            "duration_ms": round(self.duration_ms, 3),
+        }
+
+    def tree(self) -> list[dict]:
+        """Интервалы, вложенные по родителю, в порядке начала."""
+        nodes = {
+            span_id: {
+                "kind": kind,
+                "name": name,
+                "start_ms": round(start, 3),
+                "duration_ms": round(duration, 3),
+                "children": [],
+            }
+            for span_id, _, kind, name, start, duration in self.spans
+        }
+        roots = []
+        for span_id, parent_id, *_ in sorted(self.spans, key=lambda s: s[4]):
+            parent = nodes.get(parent_id)
+            (parent["children"] if parent else roots).append(nodes[span_id])
+        return roots
+
+    def folded(self) -> str:
+        """
+        Стеки в свёрнутом формате flamegraph.pl / speedscope.
+
+        Если стек не сэмплировался, строится из интервалов
+        с весом в микросекундах собственного времени.
+        """
+        if self.samples:
+            stacks = self.samples
+        else:
+            stacks = Counter()
+            names = {s[0]: f"{s[2]}:{s[3]}" for s in self.spans}
+            parents = {s[0]: s[1] for s in self.spans}
+            children = Counter()
+            for _, parent_id, _, _, _, duration in self.spans:
+                children[parent_id] += duration
+            root = f"{self.method} {self.path}"
+            for span_id, _, _, _, _, duration in self.spans:
+                path = []
+                node = span_id
+                while node in names:
+                    path.append(names[node].replace(";", ","))
+                    node = parents[node]
+                own = max(duration - children[span_id], 0)
+                stacks[";".join([root, *reversed(path)])] += int(own * 1000)
+            stacks[root] += int(
+                max(self.duration_ms - children[0], 0) * 1000
+            )
+        return "".join(
+            f"{stack} {count}\n" for stack, count in stacks.items() if count
+        )
+
+
+@contextmanager
+def span(kind: str, name: str):
+    """
+    Интервал в профиле текущего запроса; без профиля ничего не делает.
+    """
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    parent_id = _span.get()
+    span_id = trace.next_id()
+    token = _span.set(span_id)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _span.reset(token)
+        trace.add_span(
+            span_id, parent_id, kind, name, start, time.perf_counter()
+        )
+
+
+def _statement_name(statement: str) -> str:
+    return re.sub(r"\s+", " ", statement).strip()[:PROFILE_SQL_MAX_LENGTH]
+
+
+def _before_cursor_execute(conn, cursor, statement, *args):
+    if _trace.get() is not None:
+        conn.info.setdefault("profile_starts", []).append(
+            time.perf_counter()
+        )
+
+
+def _after_cursor_execute(conn, cursor, statement, *args):
+    trace = _trace.get()
+    starts = conn.info.get("profile_starts")
+    if trace is None or not starts:
+        return
+    trace.add_span(
+        trace.next_id(),
+        _span.get(),
+        "sql",
+        _statement_name(statement),
+        starts.pop(),
+        time.perf_counter(),
+    )
+
+
+def install_sql_hooks() -> None:
+    # Слушатели на классе: движок создаётся позже, уже в воркере
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class TracedPoolManager(urllib3.PoolManager):
+    """HTTP-клиент MinIO, записывающий каждый запрос в профиль."""
+
+    def urlopen(self, method, url, *args, **kwargs):
+        with span("minio", f"{method} {urlsplit(url).path}"):
+            return super().urlopen(method, url, *args, **kwargs)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_qualname}"
+
+
+def _thread_stack(frame) -> list[str]:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return names[::-1]
+
+
+def _await_stack(coro) -> list[str]:
+    names = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(
+            coro, "gi_frame", None
+        )
+        if frame is None:
+            break
+        names.append(_frame_name(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(
+            coro, "gi_yieldfrom", None
+        )
+    return names
+
+
+class _Sampler(threading.Thread):
+    """
+    Сэмплер стека запроса из отдельного потока.
+
+    Если задача запроса сейчас выполняется, берётся стек потока цикла
+    событий; если она ждёт — цепочка await её корутины с пометкой
+    (await). Так видно и процессорное время, и ожидание I/O.
+    """
+
+    def __init__(self, trace: Trace, interval: float):
+        super().__init__(daemon=True)
+        self._trace = trace
+        self._interval = interval
+        self._task = asyncio.current_task()
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        # _current_tasks — словарь задач, выполняемых в каждом цикле
+        current_tasks = asyncio.tasks._current_tasks
+        while not self._stopped.wait(self._interval):
+            if current_tasks.get(self._loop) is self._task:
+                frame = sys._current_frames().get(self._thread_id)
+                stack = _thread_stack(frame)
+            else:
+                stack = ["(await)", *_await_stack(self._task.get_coro())]
+            self._trace.samples[";".join(stack)] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+async def _is_admin(headers: dict[bytes, bytes]) -> bool:
+    scheme, _, token = (
+        headers.get(b"authorization", b"").decode().partition(" ")
+    )
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+        user_id = int(payload["sub"])
+    except (JWTError, KeyError, ValueError):
+        return False
+    async with async_session_maker() as session:
+        role = (
+            await session.execute(select(User.role).where(User.id == user_id))
+        ).scalar_one_or_none()
+    return role == UserRole.ADMIN
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware профилирования запросов.
+
+    Сэмплирование стека включается заголовком X-Profile (только для
+    ADMIN) или случайно с вероятностью PROFILE_SAMPLE_RATE. Интервалы
+    SQL и MinIO пишутся для всех запросов, и запросы дольше
+    PROFILE_SLOW_MS попадают в кольцевой буфер без сэмплов.
+    Время считается до отправки последнего куска тела ответа.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        reason = None
+        if PROFILE_HEADER in headers and await _is_admin(headers):
+            reason = PROFILE_REASON_HEADER
+        elif random.random() < settings.PROFILE_SAMPLE_RATE:
+            reason = PROFILE_REASON_SAMPLED
+        trace = Trace(scope["method"], scope["path"], reason)
+        token = _trace.set(trace)
+        sampler = None
+        if reason is not None:
+            sampler = _Sampler(trace, PROFILE_SAMPLE_INTERVAL_SECONDS)
+            sampler.start()
+        status = 0
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if reason is not None:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (PROFILE_ID_HEADER, trace.id.encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            if sampler is not None:
+                sampler.stop()
+            _trace.reset(token)
+            trace.finish(status)
+            slow = trace.duration_ms >= settings.PROFILE_SLOW_MS
+            if reason is None and slow:
+                trace.reason = PROFILE_REASON_SLOW
+            if trace.reason is not None:
+                _profiles.append(trace)
+
+
+def list_profiles() -> list[dict]:
+    return [trace.summary() for trace in reversed(_profiles)]
+
+
+def get_profile(profile_id: str) -> Trace | None:
+    for trace in _profiles:
+        if trace.id == profile_id:
+            return trace
+    return None
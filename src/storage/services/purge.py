@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from minio.deleteobjects import DeleteObject
+from sqlalchemy import delete, select
+
+from storage.core.config import settings
+from storage.core.constants import DEFAULT_SHARD, PURGE_BATCH_SIZE
+from storage.core.db import async_session_maker
+from storage.db.models.file import File, FileVersion
+from storage.services.preview import preview_key
+from storage.services.s3 import get_shard
+
+
+def remove_objects(
+    object_keys: list[str], shard_name: str = DEFAULT_SHARD
+) -> set[str]:
+    """
+    Удаление объектов шарда одним multi-object delete.
+
+    Возвращает ключи, которые удалить не удалось.
+    Отсутствующие объекты S3 считает удалёнными.
+    """
+    shard = get_shard(shard_name)
+    errors = shard.client.remove_objects(
+        shard.bucket,
+        [DeleteObject(key) for key in object_keys],
+    )
+    return {error.name for error in errors}
+
+
+async def purge_deleted_files() -> int:
+    """
+    Окончательная очистка файлов, удалённых раньше срока хранения.
+
+    Обходит помеченные записи пачками по id, удаляет объекты
+    файлов, их предыдущих версий и тексты предпросмотра из шардов
+    хранилища и затем строки из files одним DELETE на пачку
+    (версии удаляются каскадно).
+    Записи, чьи объекты удалить не удалось, остаются до следующего
+    запуска.
+
+    Пачка выбирается FOR UPDATE SKIP LOCKED и остаётся заблокированной
+    до DELETE: восстановление, начатое в это время, дождётся конца
+    очистки и не вернёт запись без объекта, а строки, которые
+    восстанавливаются прямо сейчас, пропускаются.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(
+        hours=settings.DELETED_RETENTION_HOURS
+    )
+    purged = 0
+    last_id = 0
+    while True:
+        async with async_session_maker() as session:
+            rows = (
+                await session.execute(
+                    select(File.id, File.object_key, File.shard)
+                    .where(File.deleted_at < cutoff, File.id > last_id)
+                    .order_by(File.id)
+                    .limit(PURGE_BATCH_SIZE)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            if not rows:
+                break
+            versions = (
+                await session.execute(
+                    select(
+                        FileVersion.file_id,
+                        FileVersion.object_key,
+                        FileVersion.shard,
+                    ).where(FileVersion.file_id.in_([row.id for row in rows]))
+                )
+            ).all()
+            by_shard: dict[str, list[str]] = {}
+            for row in [*rows, *versions]:
+                by_shard.setdefault(row.shard, []).append(row.object_key)
+            failed = set()
+            for shard_name, keys in by_shard.items():
+                failed |= await asyncio.to_thread(
+                    remove_objects, keys, shard_name
+                )
+            # Тексты предпросмотра удаляются без проверки: их потеря
+            # не мешает очистке
+            await asyncio.to_thread(
+                remove_objects,
+                [
+                    preview_key(row.object_key)
+                    for row in [*rows, *versions]
+                    if row.object_key not in failed
+                ],
+            )
+            kept = {
+                row.file_id for row in versions if row.object_key in failed
+            }
+            ids = [
+                row.id
+                for row in rows
+                if row.object_key not in failed and row.id not in kept
+            ]
+            if ids:
+                await session.execute(
+                    delete(File)
+                    .where(File.id.in_(ids), File.deleted_at < cutoff)
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+            purged += len(ids)
+            last_id = rows[-1].id
+    return purged
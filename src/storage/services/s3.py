@@ -1,20 +1,168 @@
+import bisect
+import hashlib
+import secrets
+from dataclasses import dataclass
+
+import urllib3
 from minio import Minio
+from urllib3.util import Retry, Timeout
 
 from storage.core.config import settings
+from storage.core.constants import (DEFAULT_SHARD, MINIO_HTTP_RETRIES,
+                                    MINIO_HTTP_TIMEOUT_SECONDS,
+                                    OBJECT_KEY_RANDOM_BYTES,
+                                    SHARD_VIRTUAL_NODES)
+from storage.services.profiling import TracedPoolManager
+
+
+@dataclass(frozen=True)
+class Shard:
+    """Бакет на одном из endpoint'ов MinIO."""
+
+    name: str
+    endpoint: str
+    access_key: str
+    bucket: str
+    client: Minio
+
+
+def make_http_client(maxsize: int | None = None) -> urllib3.PoolManager:
+    """
+    Пул соединений клиента MinIO с его настройками по умолчанию.
+
+    Размер пула на endpoint — MINIO_POOL_SIZE: при большем числе
+    параллельных передач лишние соединения не переиспользуются.
+    При включённом профилировании запросы пишутся в профиль.
+    """
+    pool_class = urllib3.PoolManager
+    if settings.PROFILING_ENABLED:
+        pool_class = TracedPoolManager
+    return pool_class(
+        timeout=Timeout(
+            connect=MINIO_HTTP_TIMEOUT_SECONDS,
+            read=MINIO_HTTP_TIMEOUT_SECONDS,
+        ),
+        maxsize=maxsize or settings.MINIO_POOL_SIZE,
+        retries=Retry(
+            total=MINIO_HTTP_RETRIES,
+            backoff_factor=0.2,
+            status_forcelist=[500, 502, 503, 504],
+        ),
+    )
+
+
+def _make_shard(config: dict[str, str]) -> Shard:
+    access_key = config.get("access_key", settings.MINIO_ROOT_USER)
+    return Shard(
+        name=config["name"],
+        endpoint=config["endpoint"],
+        access_key=access_key,
+        bucket=config["bucket"],
+        client=Minio(
+            config["endpoint"],
+            access_key=access_key,
+            secret_key=config.get("secret_key", settings.MINIO_ROOT_PASSWORD),
+            secure=False,
+            http_client=make_http_client(),
+        ),
+    )
+
+
+class HashRing:
+    """
+    Консистентное хеширование ключей объектов по шардам.
+
+    Каждый шард занимает vnodes точек на кольце, поэтому при
+    добавлении шарда переезжает примерно 1/N объектов.
+    """
+
+    def __init__(self, names: list[str], vnodes: int = SHARD_VIRTUAL_NODES):
+        points = sorted(
+            (self._hash(f"{name}#{i}"), name)
+            for name in names
+            for i in range(vnodes)
+        )
+        self._points = [point for point, _ in points]
+        self._names = [name for _, name in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    def get(self, key: str) -> str:
+        i = bisect.bisect(self._points, self._hash(key))
+        return self._names[i % len(self._names)]
+
+
+_shards: dict[str, Shard] | None = None
+_ring: HashRing | None = None
+_ensured: set[str] = set()
+
+
+def get_shards() -> dict[str, Shard]:
+    """
+    Все настроенные шарды по имени.
+
+    Шард DEFAULT_SHARD всегда собирается из MINIO_ENDPOINT
+    и MINIO_BUCKET_NAME: в нём лежат объекты, загруженные
+    до шардирования. Остальные задаются в MINIO_SHARDS.
+    """
+    global _shards
+    if _shards is None:
+        default = {
+            "name": DEFAULT_SHARD,
+            "endpoint": settings.MINIO_ENDPOINT,
+            "bucket": settings.MINIO_BUCKET_NAME,
+        }
+        shards = {}
+        for config in [default, *settings.MINIO_SHARDS]:
+            shards[config["name"]] = _make_shard(config)
+        _shards = shards
+    return _shards
+
+
+def get_shard(name: str = DEFAULT_SHARD) -> Shard:
+    return get_shards()[name]
+
+
+def _get_ring() -> HashRing:
+    global _ring
+    if _ring is None:
+        names = settings.MINIO_RING or list(get_shards())
+        unknown = set(names) - set(get_shards())
+        if unknown:
+            raise ValueError(f"unknown shards in MINIO_RING: {unknown}")
+        _ring = HashRing(names)
+    return _ring
+
+
+def place(object_key: str, department_id: int | None = None) -> str:
+    """
+    Имя шарда для нового объекта.
+
+    Отдел может быть закреплён за шардом в MINIO_DEPARTMENT_SHARDS,
+    остальные объекты распределяются по кольцу MINIO_RING
+    (по умолчанию — все шарды).
+    """
+    pinned = settings.MINIO_DEPARTMENT_SHARDS.get(department_id)
+    if pinned is not None:
+        return pinned
+    return _get_ring().get(object_key)
+
 
-_client_internal = Minio(
-    settings.MINIO_ENDPOINT,
-    access_key=settings.MINIO_ROOT_USER,
-    secret_key=settings.MINIO_ROOT_PASSWORD,
-    secure=False,
-)
+def make_object_key(user_id: int, filename: str) -> str:
+    token = secrets.token_urlsafe(OBJECT_KEY_RANDOM_BYTES)
+    return f"{user_id}/{token}_{filename}"
 
 
 def get_client() -> Minio:
-    return _client_internal
+    return get_shard().client
 
 
-def ensure_bucket() -> None:
-    client = get_client()
-    if not client.bucket_exists(settings.MINIO_BUCKET_NAME):
-        client.make_bucket(settings.MINIO_BUCKET_NAME)
+def ensure_bucket(shard: Shard | None = None) -> None:
+    shard = shard or get_shard()
+    if shard.name in _ensured:
+        return
+    if not shard.client.bucket_exists(shard.bucket):
+        shard.client.make_bucket(shard.bucket)
+    _ensured.add(shard.name)
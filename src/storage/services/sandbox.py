@@ -0,0 +1,237 @@
+import json
+import os
+import queue
+import resource
+import select
+import struct
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from storage.core.constants import (BYTES_IN_MB, EXTRACT_CPU_SECONDS,
+                                    EXTRACT_ERROR_CRASHED,
+                                    EXTRACT_ERROR_FAILED,
+                                    EXTRACT_ERROR_TIMEOUT,
+                                    EXTRACT_MAX_JOBS_PER_WORKER,
+                                    EXTRACT_MAX_RSS_MB, EXTRACT_POOL_SIZE,
+                                    EXTRACT_TIMEOUT_SECONDS, EXTRACTOR_VERSION)
+from storage.services.metadata import EXTRACTORS
+
+_HEADER = struct.Struct("!I")
+_SRC_DIR = Path(__file__).resolve().parents[2]
+
+
+class ExtractionError(Exception):
+    """Извлечение метаданных не удалось; reason — код для metadata_."""
+
+    def __init__(self, reason: str, detail: str = ""):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+        self.detail = detail
+
+
+def _write_frame(stream: BinaryIO, header: dict, payload: bytes = b""):
+    raw = json.dumps(header, default=str).encode()
+    stream.write(_HEADER.pack(len(raw)) + raw + payload)
+    stream.flush()
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes | None:
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+class _Worker:
+    """Дочерний процесс-извлекатель и протокол обмена с ним."""
+
+    def __init__(self, max_rss_mb: int, cpu_seconds: int):
+        self.jobs = 0
+        self.proc = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "storage.services.sandbox",
+                str(max_rss_mb * BYTES_IN_MB),
+                str(cpu_seconds),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=_SRC_DIR,
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def kill(self) -> None:
+        if self.alive:
+            self.proc.kill()
+        self.proc.wait()
+
+    def close(self) -> None:
+        self.proc.stdin.close()
+        try:
+            self.proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.kill()
+
+    def _read(self, size: int, deadline: float) -> bytes:
+        fd = self.proc.stdout.fileno()
+        data = b""
+        while len(data) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise ExtractionError(EXTRACT_ERROR_TIMEOUT)
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                raise ExtractionError(
+                    EXTRACT_ERROR_CRASHED, f"exit code {self.proc.wait()}"
+                )
+            data += chunk
+        return data
+
+    def run(self, content_type: str, data: bytes, timeout: float) -> dict:
+        deadline = time.monotonic() + timeout
+        self.jobs += 1
+        try:
+            _write_frame(
+                self.proc.stdin,
+                {"content_type": content_type, "size": len(data)},
+                data,
+            )
+        except BrokenPipeError:
+            raise ExtractionError(EXTRACT_ERROR_CRASHED, "broken pipe")
+        (size,) = _HEADER.unpack(self._read(_HEADER.size, deadline))
+        result = json.loads(self._read(size, deadline))
+        if not result["ok"]:
+            raise ExtractionError(EXTRACT_ERROR_FAILED, result["error"])
+        return result["meta"]
+
+
+class SandboxPool:
+    """
+    Пул изолированных процессов для извлечения метаданных.
+
+    Каждое задание выполняется в отдельном интерпретаторе с лимитами
+    памяти и процессорного времени. При превышении времени ожидания
+    процесс убивается, а после max_jobs заданий перезапускается,
+    чтобы не накапливать утечки парсеров.
+    """
+
+    def __init__(
+        self,
+        size: int = EXTRACT_POOL_SIZE,
+        max_jobs: int = EXTRACT_MAX_JOBS_PER_WORKER,
+        timeout: float = EXTRACT_TIMEOUT_SECONDS,
+        cpu_seconds: int = EXTRACT_CPU_SECONDS,
+        max_rss_mb: int = EXTRACT_MAX_RSS_MB,
+    ):
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.max_rss_mb = max_rss_mb
+        self._idle: queue.LifoQueue[_Worker | None] = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(None)
+
+    def extract(self, content_type: str, data: bytes) -> dict[str, Any]:
+        worker = self._idle.get()
+        try:
+            if worker is not None and (
+                worker.jobs >= self.max_jobs or not worker.alive
+            ):
+                worker.close()
+                worker = None
+            if worker is None:
+                worker = _Worker(self.max_rss_mb, self.cpu_seconds)
+            try:
+                return worker.run(content_type, data, self.timeout)
+            except ExtractionError as e:
+                if e.reason != EXTRACT_ERROR_FAILED:
+                    worker.kill()
+                    worker = None
+                raise
+            except BaseException:
+                worker.kill()
+                worker = None
+                raise
+        finally:
+            self._idle.put(worker)
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            worker = self._idle.get_nowait()
+            if worker is not None:
+                worker.close()
+
+
+_pool: SandboxPool | None = None
+
+
+def get_pool() -> SandboxPool:
+    global _pool
+    if _pool is None:
+        _pool = SandboxPool()
+    return _pool
+
+
+def extract_metadata(
+    content_type: str, data: bytes, pool: SandboxPool | None = None
+) -> dict[str, Any]:
+    """
+    Метаданные файла с отметкой версии извлекателя.
+
+    Ошибка извлечения возвращается в самих метаданных, чтобы
+    повторный запуск не обрабатывал файл, пока версия не изменится.
+    """
+    meta = {}
+    if content_type in EXTRACTORS:
+        try:
+            meta = (pool or get_pool()).extract(content_type, data)
+        except ExtractionError as e:
+            meta = {"error": e.reason, "detail": e.detail}
+    meta["extractor_version"] = EXTRACTOR_VERSION
+    return meta
+
+
+def _serve(max_rss: int, cpu_seconds: int) -> None:
+    """
+    Цикл дочернего процесса: читает задания из stdin, пишет в stdout.
+
+    Лимит процессорного времени накопительный, поэтому перед каждым
+    заданием мягкий лимит сдвигается на cpu_seconds от текущего
+    потребления. При превышении ядро завершает процесс SIGXCPU.
+    """
+    resource.setrlimit(resource.RLIMIT_AS, (max_rss, max_rss))
+    _, cpu_hard = resource.getrlimit(resource.RLIMIT_CPU)
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    sys.stdout = sys.stderr
+    while True:
+        raw_size = _read_exact(stdin, _HEADER.size)
+        if raw_size is None:
+            return
+        (size,) = _HEADER.unpack(raw_size)
+        header = json.loads(_read_exact(stdin, size))
+        data = _read_exact(stdin, header["size"]) or b""
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        resource.setrlimit(
+            resource.RLIMIT_CPU,
+            (int(usage.ru_utime + usage.ru_stime) + cpu_seconds, cpu_hard),
+        )
+        try:
+            meta = EXTRACTORS[header["content_type"]](data)
+            result = {"ok": True, "meta": meta}
+        except Exception as e:
+            result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        _write_frame(stdout, result)
+
+
+if __name__ == "__main__":
+    _serve(int(sys.argv[1]), int(sys.argv[2]))
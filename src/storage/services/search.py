@@ -0,0 +1,99 @@
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy import cast, func, literal_column
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.sql.elements import ColumnElement
+
+from storage.api.schemas.file import FileMetadataFilter
+from storage.core.constants import (SEARCH_FILENAME_WEIGHT,
+                                    SEARCH_META_WEIGHTS, SEARCH_TEXT_KEY,
+                                    SEARCH_TEXT_MAX_LENGTH, SEARCH_TS_CONFIG)
+
+
+def ts_config() -> ColumnElement:
+    return cast(SEARCH_TS_CONFIG, REGCONFIG)
+
+
+def _weighted(value: str, weight: str) -> ColumnElement:
+    return func.setweight(
+        func.to_tsvector(ts_config(), value), literal_column(f"'{weight}'")
+    )
+
+
+def build_search_vector(
+    filename: str, meta: dict[str, Any] | None, text: str | None = None
+) -> ColumnElement:
+    """
+    SQL-выражение tsvector для колонки files.search_vector.
+
+    Имя файла получает наивысший вес, затем заголовок, автор
+    и извлечённый текст документа, если он уже доступен. Текст
+    в metadata не хранится и передаётся отдельно.
+    """
+    values = {**(meta or {}), SEARCH_TEXT_KEY: text}
+    vector = _weighted(filename, SEARCH_FILENAME_WEIGHT)
+    for key, weight in SEARCH_META_WEIGHTS.items():
+        value = values.get(key)
+        if value:
+            text = str(value)[:SEARCH_TEXT_MAX_LENGTH]
+            vector = vector.op("||")(_weighted(text, weight))
+    return vector
+
+
+def search_vector_from_columns(
+    text: ColumnElement | None = None,
+) -> ColumnElement:
+    """
+    То же выражение, что build_search_vector, но по колонкам строки.
+
+    Нужно для пакетных UPDATE, где метаданные уже записаны в files.
+    Текст документа передаётся в text, например через bindparam
+    для executemany.
+    """
+    from storage.db.models.file import File
+
+    vector = _weighted(File.filename, SEARCH_FILENAME_WEIGHT)
+    for key, weight in SEARCH_META_WEIGHTS.items():
+        value = File.metadata_[key].astext
+        if key == SEARCH_TEXT_KEY:
+            value = text
+        if value is None:
+            continue
+        value = func.left(func.coalesce(value, ""), SEARCH_TEXT_MAX_LENGTH)
+        vector = vector.op("||")(_weighted(value, weight))
+    return vector
+
+
+def apply_metadata_filters(q, filters: FileMetadataFilter):
+    """
+    Фильтры по метаданным через индексируемые генерируемые колонки.
+
+    Даты создания хранятся в ISO 8601, поэтому границы диапазона
+    сравниваются как строки и используют B-tree индекс.
+    Планы проверяет storage.scripts.explain_filters.
+    """
+    from storage.db.models.file import File
+
+    if filters.content_type is not None:
+        q = q.where(File.content_type == filters.content_type)
+    if filters.author is not None:
+        q = q.where(File.meta_author == filters.author)
+    if filters.title is not None:
+        q = q.where(File.meta_title == filters.title)
+    if filters.pages_min is not None:
+        q = q.where(File.meta_pages >= filters.pages_min)
+    if filters.pages_max is not None:
+        q = q.where(File.meta_pages <= filters.pages_max)
+    if filters.created_from is not None:
+        q = q.where(File.meta_created >= filters.created_from.isoformat())
+    if filters.created_to is not None:
+        q = q.where(
+            File.meta_created
+            < (filters.created_to + timedelta(days=1)).isoformat()
+        )
+    return q
+
+
+def build_search_query(query: str) -> ColumnElement:
+    return func.websearch_to_tsquery(ts_config(), query)
@@ -1,48 +1,193 @@
-from celery import Celery
+import asyncio
+
+from celery import Celery, signals
 from minio.error import S3Error
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.pool import NullPool
 
 from storage.core.config import settings
-from storage.core.constants import (CELERY_TASK_EXTRACT_METADATA, DOC_TYPES,
-                                    MIME_PDF)
-from storage.core.db import async_session_maker
-from storage.db.models.file import File
-from storage.services.metadata import extract_docx_meta, extract_pdf_meta
-from storage.services.s3 import get_client
+from storage.core.constants import (AUDIT_PARTITIONS_INTERVAL_SECONDS,
+                                    CELERY_TASK_AUDIT_PARTITIONS,
+                                    CELERY_TASK_EXTRACT_METADATA,
+                                    CELERY_TASK_PRUNE_VERSIONS,
+                                    CELERY_TASK_PURGE_DELETED,
+                                    CELERY_TASK_ROLLUP_DOWNLOADS,
+                                    DEFAULT_SHARD,
+                                    DOWNLOAD_ROLLUP_INTERVAL_SECONDS,
+                                    FILE_EVENT_METADATA_FAILED,
+                                    FILE_EVENT_METADATA_READY,
+                                    METADATA_LARGE_BYTES,
+                                    METADATA_LARGE_BYTES_DEFAULT,
+                                    PRIORITY_BULK, PRIORITY_INTERACTIVE,
+                                    PRIORITY_STEPS, PURGE_INTERVAL_SECONDS,
+                                    QUEUE_MAINTENANCE, QUEUE_METADATA_LARGE,
+                                    QUEUE_METADATA_SMALL,
+                                    TASK_VISIBILITY_TIMEOUT,
+                                    VERSIONS_PRUNE_INTERVAL_SECONDS)
+from storage.core.db import async_session_maker, configure_engine
+from storage.db.models.file import File, FileVersion
+from storage.services import audit, events, idempotency
+from storage.services.analytics import rollup_downloads
+from storage.services.compression import decode_bytes
+from storage.services.preview import put_preview, split_preview
+from storage.services.purge import purge_deleted_files
+from storage.services.s3 import get_shard
+from storage.services.sandbox import extract_metadata
+from storage.services.search import build_search_vector
+from storage.services.versions import prune_versions
 
 celery_app = Celery(
     __name__,
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
 )
+celery_app.conf.update(
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    task_default_priority=PRIORITY_INTERACTIVE,
+    broker_transport_options={
+        "visibility_timeout": TASK_VISIBILITY_TIMEOUT,
+        "priority_steps": PRIORITY_STEPS,
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
+    task_routes={
+        CELERY_TASK_PURGE_DELETED: {"queue": QUEUE_MAINTENANCE},
+        CELERY_TASK_ROLLUP_DOWNLOADS: {"queue": QUEUE_MAINTENANCE},
+        CELERY_TASK_PRUNE_VERSIONS: {"queue": QUEUE_MAINTENANCE},
+        CELERY_TASK_AUDIT_PARTITIONS: {"queue": QUEUE_MAINTENANCE},
+    },
+)
+celery_app.conf.beat_schedule = {
+    CELERY_TASK_PURGE_DELETED: {
+        "task": CELERY_TASK_PURGE_DELETED,
+        "schedule": PURGE_INTERVAL_SECONDS,
+    },
+    CELERY_TASK_ROLLUP_DOWNLOADS: {
+        "task": CELERY_TASK_ROLLUP_DOWNLOADS,
+        "schedule": DOWNLOAD_ROLLUP_INTERVAL_SECONDS,
+    },
+    CELERY_TASK_PRUNE_VERSIONS: {
+        "task": CELERY_TASK_PRUNE_VERSIONS,
+        "schedule": VERSIONS_PRUNE_INTERVAL_SECONDS,
+    },
+    CELERY_TASK_AUDIT_PARTITIONS: {
+        "task": CELERY_TASK_AUDIT_PARTITIONS,
+        "schedule": AUDIT_PARTITIONS_INTERVAL_SECONDS,
+    },
+}
+
+
+@signals.worker_init.connect
+def _configure_worker(**kwargs):
+    """
+    Соединения с БД без пула в воркерах Celery.
+
+    Каждая задача выполняет корутины в своём asyncio.run, а соединения
+    asyncpg привязаны к циклу, в котором открыты: взятое из пула
+    соединение прошлой задачи было бы уже непригодно.
+    """
+    configure_engine(poolclass=NullPool)
+
+
+def metadata_queue(content_type: str, size: int | None) -> str:
+    """
+    Очередь извлечения метаданных по типу и размеру файла.
+    """
+    threshold = METADATA_LARGE_BYTES.get(
+        content_type, METADATA_LARGE_BYTES_DEFAULT
+    )
+    if size is not None and size > threshold:
+        return QUEUE_METADATA_LARGE
+    return QUEUE_METADATA_SMALL
+
+
+def enqueue_metadata_task(
+    object_key: str,
+    content_type: str,
+    codec: str | None = None,
+    size: int | None = None,
+    bulk: bool = False,
+    shard: str = DEFAULT_SHARD,
+) -> bool:
+    """
+    Постановка извлечения метаданных в очередь с дедупликацией.
+
+    Интерактивные загрузки получают наивысший приоритет,
+    массовые операции (bulk) — наименьший. Повторная постановка
+    для ключа, задача по которому ещё не завершилась, пропускается.
+    Если постановка не удалась, ключ освобождается.
+    """
+    key = f"{CELERY_TASK_EXTRACT_METADATA}:{object_key}"
+    if not idempotency.acquire(key, TASK_VISIBILITY_TIMEOUT):
+        return False
+    try:
+        extract_metadata_task.apply_async(
+            args=(object_key, content_type),
+            kwargs={"codec": codec, "shard": shard},
+            queue=metadata_queue(content_type, size),
+            priority=PRIORITY_BULK if bulk else PRIORITY_INTERACTIVE,
+        )
+    except BaseException:
+        # Иначе ключ до истечения TTL блокировал бы повторную постановку
+        idempotency.release(key)
+        raise
+    return True
 
 
 @celery_app.task(name=CELERY_TASK_EXTRACT_METADATA)
-def extract_metadata_task(object_key: str, content_type: str):
+def extract_metadata_task(
+    object_key: str,
+    content_type: str,
+    codec: str | None = None,
+    shard: str = DEFAULT_SHARD,
+):
     """
     Фоновая задача для извлечения метаданных из файлов.
 
     Загружает файл из MinIO по object_key, определяет тип по content_type
-    (PDF или DOC/DOCX), извлекает основные метаданные и сохраняет их в БД.
+    (PDF или DOC/DOCX), извлекает основные метаданные в изолированном
+    процессе с лимитами времени и памяти и сохраняет их в БД вместе
+    с обновлённым поисковым вектором. Начало текста документа
+    сохраняется сжатым отдельным объектом для предпросмотра.
+    Ошибка извлечения записывается в метаданные вместо повторных
+    попыток. Владельцу файла публикуется уведомление о готовности
+    или ошибке.
 
     :param object_key: Ключ объекта в хранилище MinIO
     :param content_type: MIME-тип файла
+    :param codec: Кодек сжатия объекта в хранилище, None — без сжатия
+    :param shard: Шард хранилища, в котором лежит объект
     """
-    client = get_client()
     try:
-        response = client.get_object(settings.MINIO_BUCKET_NAME, object_key)
-        data = response.read()
+        _extract_metadata(object_key, content_type, codec, shard)
+    finally:
+        idempotency.release(f"{CELERY_TASK_EXTRACT_METADATA}:{object_key}")
+
+
+def _extract_metadata(
+    object_key: str, content_type: str, codec: str | None, shard_name: str
+):
+    shard = get_shard(shard_name)
+    try:
+        response = shard.client.get_object(shard.bucket, object_key)
+        data = decode_bytes(response.read(), codec)
         response.close()
         response.release_conn()
     except S3Error:
         return
 
-    meta = {}
-    if content_type == MIME_PDF:
-        meta = extract_pdf_meta(data)
-    elif content_type in DOC_TYPES:
-        meta = extract_docx_meta(data)
+    meta = extract_metadata(content_type, data)
+    text = split_preview(meta)
+    if text:
+        # Текст пишется до метаданных: по событию готовности
+        # предпросмотр уже доступен
+        try:
+            put_preview(object_key, text)
+        except S3Error:
+            pass
 
     async def _save():
         async with async_session_maker() as session:
@@ -51,10 +196,73 @@ def extract_metadata_task(object_key: str, content_type: str):
             )
             file = q.scalar_one_or_none()
             if not file:
+                # Пока шло извлечение, у файла могла выйти новая версия
+                version = (
+                    await session.execute(
+                        select(FileVersion).where(
+                            FileVersion.object_key == object_key
+                        )
+                    )
+                ).scalar_one_or_none()
+                if version is not None:
+                    version.metadata_ = meta
+                    await session.commit()
                 return
             file.metadata_ = meta
+            file.search_vector = build_search_vector(
+                file.filename, meta, text
+            )
             await session.commit()
-
-    import asyncio
+            events.publish_sync(
+                file.owner_id,
+                file.id,
+                FILE_EVENT_METADATA_FAILED
+                if "error" in meta
+                else FILE_EVENT_METADATA_READY,
+            )
 
     asyncio.run(_save())
+
+
+@celery_app.task(name=CELERY_TASK_PURGE_DELETED)
+def purge_deleted_files_task():
+    """
+    Периодическая очистка файлов, помеченных удалёнными.
+
+    Запускается celery beat; срок хранения задаётся
+    DELETED_RETENTION_HOURS.
+    """
+    return asyncio.run(purge_deleted_files())
+
+
+@celery_app.task(name=CELERY_TASK_ROLLUP_DOWNLOADS)
+def rollup_downloads_task():
+    """
+    Периодический пересчёт дневных свёрток скачиваний.
+
+    Запускается celery beat; сырые события старше
+    DOWNLOAD_EVENTS_RETENTION_DAYS удаляются посекционно.
+    """
+    asyncio.run(rollup_downloads())
+
+
+@celery_app.task(name=CELERY_TASK_PRUNE_VERSIONS)
+def prune_file_versions_task():
+    """
+    Периодическое удаление старых версий файлов.
+
+    Запускается celery beat; политика задаётся FILE_VERSIONS_KEEP
+    и FILE_VERSIONS_RETENTION_DAYS.
+    """
+    return asyncio.run(prune_versions())
+
+
+@celery_app.task(name=CELERY_TASK_AUDIT_PARTITIONS)
+def audit_partitions_task():
+    """
+    Периодическое обслуживание секций журнала доступа.
+
+    Запускается celery beat; секции старше
+    AUDIT_EVENTS_RETENTION_DAYS удаляются.
+    """
+    return asyncio.run(audit.maintain_partitions())
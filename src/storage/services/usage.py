@@ -0,0 +1,153 @@
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage.core.config import settings
+from storage.core.constants import BYTES_IN_MB, ROLE_QUOTA_MB, Role
+from storage.db.models.file import File, FileVersion
+from storage.db.models.usage import StorageUsage, UsageScope
+from storage.db.models.user import User
+
+
+def quotas(user: User) -> list[tuple[UsageScope, int, int | None]]:
+    """
+    Счётчики, которые затрагивает файл пользователя, и их лимиты.
+    """
+    user_quota = ROLE_QUOTA_MB[Role(user.role.value)]
+    scopes = [
+        (
+            UsageScope.USER,
+            user.id,
+            user_quota * BYTES_IN_MB if user_quota is not None else None,
+        )
+    ]
+    if user.department_id is not None:
+        department_quota = settings.DEPARTMENT_QUOTA_MB
+        scopes.append(
+            (
+                UsageScope.DEPARTMENT,
+                user.department_id,
+                (
+                    department_quota * BYTES_IN_MB
+                    if department_quota is not None
+                    else None
+                ),
+            )
+        )
+    return scopes
+
+
+async def get_usage(
+    session: AsyncSession, scope: UsageScope, scope_id: int
+) -> StorageUsage | None:
+    q = await session.execute(
+        select(StorageUsage).where(
+            StorageUsage.scope == scope, StorageUsage.scope_id == scope_id
+        )
+    )
+    return q.scalar_one_or_none()
+
+
+async def has_quota(session: AsyncSession, user: User, size: int) -> bool:
+    """
+    Предварительная проверка квоты по счётчикам без блокировок.
+
+    Позволяет отказать до загрузки объекта в хранилище;
+    окончательная проверка выполняется в add_usage.
+    """
+    for scope, scope_id, limit in quotas(user):
+        if limit is None:
+            continue
+        usage = await get_usage(session, scope, scope_id)
+        used = usage.bytes_used if usage else 0
+        if used + size > limit:
+            return False
+    return True
+
+
+async def add_usage(
+    session: AsyncSession, user: User, size: int, files: int = 1
+) -> bool:
+    """
+    Изменение счётчиков пользователя и отдела в текущей транзакции.
+
+    Для положительного приращения условие квоты проверяется атомарно
+    в UPSERT. Возвращает False, если квота превышена; в этом случае
+    вызывающий код должен откатить транзакцию.
+    """
+    for scope, scope_id, limit in quotas(user):
+        if size <= 0:
+            limit = None
+        if limit is not None and size > limit:
+            return False
+        stmt = insert(StorageUsage).values(
+            scope=scope, scope_id=scope_id, bytes_used=size, files_count=files
+        )
+        new_bytes = StorageUsage.bytes_used + stmt.excluded.bytes_used
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StorageUsage.scope, StorageUsage.scope_id],
+            set_={
+                "bytes_used": new_bytes,
+                "files_count": (
+                    StorageUsage.files_count + stmt.excluded.files_count
+                ),
+            },
+            where=new_bytes <= limit if limit is not None else None,
+        ).returning(StorageUsage.bytes_used)
+        if (await session.execute(stmt)).first() is None:
+            return False
+    return True
+
+
+async def rebuild_usage(session: AsyncSession) -> None:
+    """
+    Пересчёт всех счётчиков по таблице files.
+
+    Предыдущие версии файла учитываются в занятом месте владельца,
+    но не в числе файлов. Удалённые файлы не учитываются: их место
+    освобождается при удалении и возвращается при восстановлении.
+
+    Используется после заполнения size_bytes для старых файлов.
+    Загрузки, завершившиеся во время пересчёта, могут быть учтены
+    неточно, поэтому запускать его лучше в период низкой нагрузки.
+    """
+    version_bytes = (
+        select(func.coalesce(func.sum(FileVersion.size_bytes), 0))
+        .where(FileVersion.file_id == File.id)
+        .correlate(File)
+        .scalar_subquery()
+    )
+    size = func.coalesce(
+        func.sum(func.coalesce(File.size_bytes, 0) + version_bytes), 0
+    )
+    per_user = (
+        select(File.owner_id, size, func.count(File.id))
+        .where(File.deleted_at.is_(None))
+        .group_by(File.owner_id)
+    )
+    per_department = (
+        select(User.department_id, size, func.count(File.id))
+        .select_from(File)
+        .join(User, File.owner_id == User.id)
+        .where(User.department_id.is_not(None), File.deleted_at.is_(None))
+        .group_by(User.department_id)
+    )
+    await session.execute(StorageUsage.__table__.delete())
+    for scope, source in (
+        (UsageScope.USER, per_user),
+        (UsageScope.DEPARTMENT, per_department),
+    ):
+        rows = (await session.execute(source)).all()
+        if rows:
+            await session.execute(
+                insert(StorageUsage),
+                [
+                    {
+                        "scope": scope,
+                        "scope_id": scope_id,
+                        "bytes_used": bytes_used,
+                        "files_count": files_count,
+                    }
+                    for scope_id, bytes_used, files_count in rows
+                ],
+            )
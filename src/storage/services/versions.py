@@ -0,0 +1,158 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from minio.commonconfig import CopySource
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage.core.config import settings
+from storage.core.constants import VERSIONS_PRUNE_BATCH_SIZE
+from storage.core.db import async_session_maker
+from storage.db.models.file import File, FileVersion
+from storage.db.models.user import User
+from storage.services.preview import preview_key
+from storage.services.purge import remove_objects
+from storage.services.s3 import Shard
+from storage.services.usage import add_usage
+
+
+def copy_object(shard: Shard, source_key: str, object_key: str) -> str:
+    """
+    Копирование объекта внутри шарда без передачи байт через API.
+
+    Объекты больше 5 ГиБ клиент MinIO собирает через compose_object
+    из частей исходного. Возвращает ETag копии.
+    """
+    result = shard.client.copy_object(
+        shard.bucket, object_key, CopySource(shard.bucket, source_key)
+    )
+    return result.etag
+
+
+def archive_current(f: File) -> FileVersion:
+    """
+    Строка версии с текущим содержимым файла перед его заменой.
+    """
+    return FileVersion(
+        file_id=f.id,
+        version=f.version,
+        object_key=f.object_key,
+        shard=f.shard,
+        size_bytes=f.size_bytes,
+        codec=f.codec,
+        content_type=f.content_type,
+        sha256=f.sha256,
+        etag=f.etag,
+        metadata_=f.metadata_,
+    )
+
+
+async def versions_size(session: AsyncSession, file_id: int) -> int:
+    """Место, занятое предыдущими версиями файла."""
+    return (
+        await session.execute(
+            select(func.coalesce(func.sum(FileVersion.size_bytes), 0)).where(
+                FileVersion.file_id == file_id
+            )
+        )
+    ).scalar_one()
+
+
+async def prune_versions() -> int:
+    """
+    Удаление старых версий по политике хранения.
+
+    У каждого файла остаются FILE_VERSIONS_KEEP последних версий
+    не старше FILE_VERSIONS_RETENTION_DAYS. Версии удалённых файлов
+    не трогаются: их очищает purge вместе с файлом. Файлы обходятся
+    пачками по file_id, и версии ранжируются только внутри пачки,
+    а не по всей таблице на каждом шаге; объекты удаляются
+    из шардов, затем строки и место в квоте владельцев
+    освобождаются в одной транзакции.
+    """
+    cutoff = None
+    if settings.FILE_VERSIONS_RETENTION_DAYS is not None:
+        cutoff = datetime.now(timezone.utc) - timedelta(
+            days=settings.FILE_VERSIONS_RETENTION_DAYS
+        )
+    pruned = 0
+    last_file_id = 0
+    while True:
+        async with async_session_maker() as session:
+            file_ids = (
+                (
+                    await session.execute(
+                        select(FileVersion.file_id)
+                        .where(FileVersion.file_id > last_file_id)
+                        .group_by(FileVersion.file_id)
+                        .order_by(FileVersion.file_id)
+                        .limit(VERSIONS_PRUNE_BATCH_SIZE)
+                    )
+                )
+                .scalars()
+                .all()
+            )
+            if not file_ids:
+                break
+            rank = (
+                func.row_number()
+                .over(
+                    partition_by=FileVersion.file_id,
+                    order_by=FileVersion.version.desc(),
+                )
+                .label("rank")
+            )
+            ranked = (
+                select(
+                    FileVersion.id,
+                    FileVersion.object_key,
+                    FileVersion.shard,
+                    FileVersion.size_bytes,
+                    FileVersion.archived_at,
+                    File.owner_id,
+                    rank,
+                )
+                .join(File, FileVersion.file_id == File.id)
+                .where(
+                    FileVersion.file_id.in_(file_ids),
+                    File.deleted_at.is_(None),
+                )
+                .subquery()
+            )
+            expired = ranked.c.rank > settings.FILE_VERSIONS_KEEP
+            if cutoff is not None:
+                expired = or_(expired, ranked.c.archived_at < cutoff)
+            rows = (await session.execute(select(ranked).where(expired))).all()
+            last_file_id = file_ids[-1]
+            if not rows:
+                continue
+            by_shard: dict[str, list[str]] = {}
+            for row in rows:
+                by_shard.setdefault(row.shard, []).append(row.object_key)
+            failed = set()
+            for shard_name, keys in by_shard.items():
+                failed |= await asyncio.to_thread(
+                    remove_objects, keys, shard_name
+                )
+            removed = [row for row in rows if row.object_key not in failed]
+            await asyncio.to_thread(
+                remove_objects,
+                [preview_key(row.object_key) for row in removed],
+            )
+            if removed:
+                freed: dict[int, int] = {}
+                for row in removed:
+                    freed[row.owner_id] = freed.get(row.owner_id, 0) + (
+                        row.size_bytes or 0
+                    )
+                await session.execute(
+                    delete(FileVersion)
+                    .where(FileVersion.id.in_([row.id for row in removed]))
+                    .execution_options(synchronize_session=False)
+                )
+                for owner_id, size in freed.items():
+                    owner = await session.get(User, owner_id)
+                    await add_usage(session, owner, -size, files=0)
+                await session.commit()
+            pruned += len(removed)
+    return pruned